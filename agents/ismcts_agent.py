@@ -0,0 +1,63 @@
+from copy import deepcopy
+
+from backend.trader import Trader
+from backend.mcts import ISMCTS
+from backend.tracker import CardTracker
+
+class ISMCTSAgent(Trader):
+    """
+    An information-set Monte Carlo tree search agent.
+
+    Each move, it samples complete games consistent with what it has seen,
+    searches them with a shared tree and plays the most visited action.
+    Searches are limited by `time_limit` seconds and/or `iterations`; under a
+    time control, the time allotted by the move's budget replaces
+    `time_limit`; with neither limit, the agent only plays under a time
+    control. With `workers` > 1, that many processes search independent
+    trees in parallel.
+
+    Its own moves are recorded when the game reports them to
+    `calculate_reward`, so a move that was replaced (e.g. by the best action
+    offered to a budget that ran out) is never taken for the one played.
+    """
+
+    def __init__(self, seed, name, iterations=None, time_limit=1.0, workers=1, verbose=True):
+        super().__init__(seed, name)
+        self.search = ISMCTS(iterations=iterations, time_limit=time_limit, seed=seed, workers=workers)
+        self.verbose = verbose
+        self.tracker = CardTracker(self)
+        self.last_result = None
+
+    def select_action(self, actions, observation, simulate_action_fnc, budget=None):
+        """Search from the current information set and pick the most visited action"""
+        self.tracker.observe(observation)
+
+        time_limit, progress = None, None
+        if budget is not None:
+            # about one card is drawn per turn, and every other turn is ours
+            moves_left = observation.market_reserved_goods_count // 2 + 2
+            time_limit = budget.allocate(moves_left)
+            progress = budget.offer
+        result = self.search.search(actions, observation, self.tracker, time_limit, progress)
+        self.last_result = result
+
+        if self.verbose:
+            trees = f" over {result.trees} trees" if result.trees > 1 else ""
+            print(f"🌲 {self.name}: {result.iterations} iterations{trees} in {result.elapsed:.2f}s "
+                  f"({result.iterations_per_second:.0f}/s)")
+        return result.action
+
+    def calculate_reward(self, old_observation, new_observation, has_acted, environment_reward):
+        """Record the move the game actually played for us"""
+        if has_acted:
+            self.tracker.record(new_observation.action)
+
+    def __deepcopy__(self, memo):
+        # Markets deep-copy their players on every move, and the copy in the
+        # state is the one asked to move, while the game reports moves to its
+        # own player: all copies share the tracker (and the search).
+        memo[id(self.tracker)] = self.tracker
+        clone = memo[id(self)] = type(self).__new__(type(self))
+        for name, value in self.__dict__.items():
+            setattr(clone, name, deepcopy(value, memo))
+        return clone
@@ -12,7 +12,3 @@ class RandomAgent(Trader):
     def select_action(self, actions, observation, simulate_action_fnc):
         """Randomly select an action from available options"""
         return self.rng.choice(actions)
-    
-    def calculate_reward(self, old_observation, new_observation, has_acted, environment_reward):
-        """No reward calculation needed for random agent"""
-        pass
@@ -1,5 +1,17 @@
-from backend.trader import Trader, TraderAction, SellAction, TakeAction, TradeAction
+import numpy as np
+
+from backend.trader import Trader
 from backend.goods import GoodType
+from backend.actionarrays import ActionArrays, GOOD_TYPES, SELL, TAKE
+
+CAMEL = GOOD_TYPES.index(GoodType.CAMEL)
+PREMIUM = np.array([gt in (GoodType.DIAMOND, GoodType.GOLD, GoodType.SILVER) for gt in GOOD_TYPES])
+
+
+def _set_bonus(counts, five, four, three):
+    """Bonus for holding (or reaching) sets of 5, 4 or 3 cards"""
+    return np.array([0, 0, 0, three, four, five])[np.minimum(counts, 5)]
+
 
 class SmartAgent(Trader):
     """
@@ -8,11 +20,13 @@ class SmartAgent(Trader):
     2. Collecting bonus tokens (3+, 4+, 5+ cards)
     3. Taking valuable goods from market
     4. Trading efficiently to maintain hand size
+
+    Actions are scored all at once on their `ActionArrays` columns.
     """
-    
+
     def __init__(self, seed, name):
         super().__init__(seed, name)
-        
+
         # Good value priorities (higher = more valuable)
         self.good_values = {
             GoodType.DIAMOND: 7,
@@ -23,162 +37,79 @@ class SmartAgent(Trader):
             GoodType.LEATHER: 3,
             GoodType.CAMEL: 1
         }
-    
+        # The same values, indexed like the goods columns
+        self.value_vector = np.array([self.good_values[gt] for gt in GOOD_TYPES])
+
     def select_action(self, actions, observation, simulate_action_fnc):
         """Select the best action based on strategic evaluation"""
-        
-        # Separate actions by type
-        sell_actions = [a for a in actions if isinstance(a, SellAction)]
-        take_actions = [a for a in actions if isinstance(a, TakeAction)]
-        trade_actions = [a for a in actions if isinstance(a, TradeAction)]
-        
-        # Evaluate all actions and pick the best
-        best_action = None
-        best_score = float('-inf')
-        
-        # 1. Evaluate selling actions (highest priority if we can get bonus)
-        for action in sell_actions:
-            score = self._evaluate_sell_action(action, observation)
-            if score > best_score:
-                best_score = score
-                best_action = action
-        
-        # 2. Evaluate taking actions
-        for action in take_actions:
-            score = self._evaluate_take_action(action, observation)
-            if score > best_score:
-                best_score = score
-                best_action = action
-        
-        # 3. Evaluate trading actions (lower priority)
-        for action in trade_actions:
-            score = self._evaluate_trade_action(action, observation)
-            if score > best_score:
-                best_score = score
-                best_action = action
-        
-        return best_action if best_action else self.rng.choice(actions)
-    
-    def _evaluate_sell_action(self, action, observation):
-        """Evaluate the value of a sell action"""
-        good_type = action._sell
-        count = action._count
-        
-        # Get the coin values we'd receive
-        available_coins = observation.market_goods_coins.get(good_type, [])
-        if len(available_coins) < count:
-            return -1000  # Can't sell if not enough coins
-        
-        # Calculate immediate coin value
-        coins_to_receive = available_coins[-count:]
-        coin_value = sum(coins_to_receive)
-        
+        arrays = ActionArrays.from_actions(actions, observation)
+        if not len(arrays):
+            return self.rng.choice(actions)
+
+        # Goods and coins, indexed like the goods columns
+        actor_goods = np.array([observation.actor_goods[gt] for gt in GOOD_TYPES])
+        coins_left = np.array([len(observation.market_goods_coins.get(gt, [])) for gt in GOOD_TYPES])
+
+        # Each formula is evaluated on every row; rows keep the score of their own type
+        scores = np.select(
+            [arrays.action_type == SELL, arrays.action_type == TAKE],
+            [self._evaluate_sell_actions(arrays, observation, actor_goods, coins_left),
+             self._evaluate_take_actions(arrays, observation, actor_goods, coins_left)],
+            self._evaluate_trade_actions(arrays, observation, actor_goods, coins_left)
+        )
+
+        # Pick the best; on ties prefer selling, then taking, then trading
+        order = np.argsort(arrays.action_type, kind='stable')
+        return arrays.actions[int(order[np.argmax(scores[order])])]
+
+    def _evaluate_sell_actions(self, arrays, observation, actor_goods, coins_left):
+        """Evaluate the value of sell actions"""
+        available = coins_left[arrays.good]
+
         # Bonus for selling 3+, 4+, or 5+ cards (bonus tokens)
-        bonus_multiplier = 1.0
-        if count >= 5:
-            bonus_multiplier = 3.0  # Highest priority for 5-card bonus
-        elif count >= 4:
-            bonus_multiplier = 2.5
-        elif count >= 3:
-            bonus_multiplier = 2.0
-        
+        bonus_multiplier = _set_bonus(arrays.count, 3.0, 2.5, 2.0)
+        bonus_multiplier[arrays.count < 3] = 1.0
+
         # Premium goods (diamond, gold, silver) should be sold quickly
         # as their coins deplete fast
-        scarcity_bonus = 0
-        if good_type in [GoodType.DIAMOND, GoodType.GOLD, GoodType.SILVER]:
-            scarcity_bonus = len(available_coins) * 2  # More valuable when more coins left
-        
-        # Calculate total score
-        score = (coin_value * bonus_multiplier) + scarcity_bonus
-        
-        return score
-    
-    def _evaluate_take_action(self, action, observation):
-        """Evaluate the value of a take action"""
-        good_type = action._take
-        count = action._count
-        
-        # Taking camels
-        if good_type == GoodType.CAMEL:
-            # Camels are useful but low priority unless we're close to end
-            camel_value = 5 if observation.market_reserved_goods_count < 15 else 2
-            return camel_value
-        
+        scarcity_bonus = np.where(PREMIUM[arrays.good], available * 2, 0)
+
+        score = (arrays.coin_value * bonus_multiplier) + scarcity_bonus
+
+        # Can't sell if not enough coins
+        return np.where(available < arrays.count, -1000, score)
+
+    def _evaluate_take_actions(self, arrays, observation, actor_goods, coins_left):
+        """Evaluate the value of take actions"""
+        # Higher value if we're close to having enough to sell for bonus
+        bonus_potential = _set_bonus(actor_goods[arrays.good] + arrays.count, 30, 20, 15)
+
+        # High-value goods with many coins left are prioritized
+        coin_availability_bonus = coins_left[arrays.good] * 2
+
+        score = (self.value_vector[arrays.good] * 5) + bonus_potential + coin_availability_bonus
+
         # Don't take if hand is too full (need room for selling later)
         hand_space = observation.max_player_goods_count - observation.actor_non_camel_goods_count
         if hand_space <= 2:
-            return -500  # Avoid filling hand completely
-        
-        # Value based on good type
-        good_value = self.good_values.get(good_type, 1)
-        
-        # Check how many coins are left in market for this good
-        available_coins = observation.market_goods_coins.get(good_type, [])
-        coins_remaining = len(available_coins)
-        
-        # Higher value if we're close to having enough to sell for bonus
-        actor_goods = observation.actor_goods
-        cards_of_type = actor_goods[good_type]
-        
-        bonus_potential = 0
-        if cards_of_type + count >= 5:
-            bonus_potential = 30
-        elif cards_of_type + count >= 4:
-            bonus_potential = 20
-        elif cards_of_type + count >= 3:
-            bonus_potential = 15
-        
-        # High-value goods with many coins left are prioritized
-        coin_availability_bonus = coins_remaining * 2
-        
-        score = (good_value * 5) + bonus_potential + coin_availability_bonus
-        return score
-    
-    def _evaluate_trade_action(self, action, observation):
-        """Evaluate the value of a trade action"""
-        requested = action.requested_goods
-        offered = action.offered_goods
-        
+            score = np.full(len(arrays), -500)
+
+        # Camels are useful but low priority unless we're close to end
+        camel_value = 5 if observation.market_reserved_goods_count < 15 else 2
+        return np.where(arrays.good == CAMEL, camel_value, score)
+
+    def _evaluate_trade_actions(self, arrays, observation, actor_goods, coins_left):
+        """Evaluate the value of trade actions"""
         # Calculate value difference
-        value_gained = sum(
-            self.good_values.get(good_type, 0) * requested[good_type]
-            for good_type in GoodType
-        )
-        
-        value_lost = sum(
-            self.good_values.get(good_type, 0) * offered[good_type]
-            for good_type in GoodType
-        )
-        
-        net_value = value_gained - value_lost
-        
+        net_value = (arrays.requested - arrays.offered) @ self.value_vector
+
         # Penalize trades that give away camels (we need them for end bonus)
-        if offered[GoodType.CAMEL] > 0:
-            net_value -= offered[GoodType.CAMEL] * 3
-        
+        net_value = net_value - arrays.offered[:, CAMEL] * 3
+
         # Bonus for getting closer to a set for selling
-        actor_goods = observation.actor_goods
-        set_bonus = 0
-        
-        for good_type in GoodType:
-            if good_type == GoodType.CAMEL:
-                continue
-            
-            new_count = actor_goods[good_type] - offered[good_type] + requested[good_type]
-            
-            # Reward if we get closer to 3, 4, or 5 cards
-            if new_count >= 5:
-                set_bonus += 15
-            elif new_count >= 4:
-                set_bonus += 10
-            elif new_count >= 3:
-                set_bonus += 5
-        
+        new_counts = actor_goods - arrays.offered + arrays.requested
+        new_counts[:, CAMEL] = 0
+        set_bonus = _set_bonus(new_counts, 15, 10, 5).sum(axis=1)
+
         # Trades are generally lower priority than direct takes or sells
-        score = (net_value * 3) + set_bonus - 5  # Small penalty for trading complexity
-        
-        return score
-    
-    def calculate_reward(self, old_observation, new_observation, has_acted, environment_reward):
-        """Calculate reward (not used in this greedy agent, but required by interface)"""
-        pass
\ No newline at end of file
+        return (net_value * 3) + set_bonus - 5  # Small penalty for trading complexity
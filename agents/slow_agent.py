@@ -14,7 +14,3 @@ class SlowAgent(Trader):
         """Randomly select an action from available options"""
         sleep(5)  # Simulate slow decision-making
         return self.rng.choice(actions)
-    
-    def calculate_reward(self, old_observation, new_observation, has_acted, environment_reward):
-        """No reward calculation needed for random agent"""
-        pass
@@ -6,10 +6,14 @@ designed for training and evaluating AI agents.
 """
 
 from .bazaar import Bazaar, BasicBazaar
-from .trader import Trader, TraderAction, TraderActionType, SellAction, TakeAction, TradeAction
+from .trader import Trader, TraderAction, TraderActionType, SellAction, TakeAction, TradeAction, ActionSequence
 from .market import Market, MarketObservation
 from .goods import GoodType, Goods
 from .coins import BonusType, Coins
+from .record import GameRecord, replay
+from .determinization import Determinizer, PublicHistory
+from .tracker import CardTracker
+from .clock import TimeControl, GameClock, MoveBudget
 
 __version__ = "0.3.0"
 __all__ = [
@@ -21,10 +25,19 @@ __all__ = [
     'SellAction',
     'TakeAction',
     'TradeAction',
+    'ActionSequence',
     'Market',
     'MarketObservation',
     'GoodType',
     'Goods',
     'BonusType',
     'Coins',
+    'GameRecord',
+    'replay',
+    'Determinizer',
+    'PublicHistory',
+    'CardTracker',
+    'TimeControl',
+    'GameClock',
+    'MoveBudget',
 ]
@@ -0,0 +1,184 @@
+"""
+Struct-of-arrays view of a list of actions.
+
+`ActionArrays` lays a list of actions out as NumPy columns (action type,
+requested and offered goods counts, sold or taken good, count, coin value of
+a sale) so that an agent can score every candidate with a few array
+operations instead of a Python loop over actions and good types:
+
+    arrays = ActionArrays.from_actions(actions, observation)
+    gained = arrays.requested @ values - arrays.offered @ values
+    best = arrays.actions[int(np.argmax(gained))]
+
+`Bazaar.all_actions(actor, state, as_arrays=True)` returns the same view for
+a state. Goods columns follow the order of `GOOD_TYPES` (`list(GoodType)`).
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+from .market import MarketObservation
+from .trader import TraderAction, TraderActionType, ActionSequence, _action_table
+from .goods import GoodType
+
+
+GOOD_TYPES = list(GoodType)
+"""Good type of each goods column."""
+
+SELL, TAKE, TRADE = 0, 1, 2
+"""Values of `ActionArrays.action_type`."""
+
+_TYPE_INDEX = {
+    TraderActionType.SELL: SELL,
+    TraderActionType.TAKE: TAKE,
+    TraderActionType.TRADE: TRADE,
+}
+
+# Columns of every canonical action code, built on first use
+_CODE_COLUMNS = None
+
+
+class ActionArrays:
+    """
+    Columns describing a list of actions, one row per action.
+
+    Attributes
+    ----------
+    actions : list of TraderAction
+        The actions, in row order.
+    action_type : numpy.ndarray
+        int8 vector of `SELL`, `TAKE` or `TRADE`.
+    requested : numpy.ndarray
+        N x 7 int8 matrix of the goods each action takes from the market.
+    offered : numpy.ndarray
+        N x 7 int8 matrix of the goods each action gives away (sold goods
+        for a sale).
+    good : numpy.ndarray
+        int8 vector of the column of the good sold or taken, -1 for trades.
+    count : numpy.ndarray
+        int8 vector of the number of goods sold or taken, 0 for trades.
+    coin_value : numpy.ndarray
+        int32 vector of the goods coins a sale earns (the top coins of the
+        good's stack, fewer if the stack runs out), 0 for takes and trades.
+        Bonus coins are drawn at random and are not included.
+    """
+
+    __slots__ = ('actions', 'action_type', 'requested', 'offered', 'good', 'count', 'coin_value')
+
+    def __init__(self,
+                 actions: list[TraderAction],
+                 action_type: np.ndarray,
+                 requested: np.ndarray,
+                 offered: np.ndarray,
+                 good: np.ndarray,
+                 count: np.ndarray,
+                 coin_value: np.ndarray):
+        self.actions = actions
+        self.action_type = action_type
+        self.requested = requested
+        self.offered = offered
+        self.good = good
+        self.count = count
+        self.coin_value = coin_value
+
+    def __len__(self):
+        return len(self.actions)
+
+    @classmethod
+    def from_actions(cls,
+                     actions: list[TraderAction],
+                     observation: Optional[MarketObservation] = None) -> 'ActionArrays':
+        """
+        Lay out a list of actions as columns.
+
+        Parameters
+        ----------
+        actions : sequence of TraderAction
+            The actions, typically the legal actions given to `select_action`
+            (an `ActionSequence` is enumerated in full).
+        observation : MarketObservation, optional
+            The observation the actions were generated from, used for the
+            coin values of sales. Without it `coin_value` is all zeros.
+
+        Returns
+        -------
+        ActionArrays
+            The columns, with rows in the order of `actions`.
+        """
+        if not isinstance(actions, list):
+            actions = actions.to_list() if isinstance(actions, ActionSequence) else list(actions)
+        try:
+            codes = np.fromiter((action.code for action in actions), dtype=np.int32, count=len(actions))
+        except ValueError:
+            # actions outside the canonical table (custom limits)
+            columns = _columns([action._shape.key for action in actions])
+        else:
+            columns = tuple(column[codes] for column in _code_columns())
+        action_type, requested, offered, good, count = columns
+
+        coin_value = np.zeros(len(actions), dtype=np.int32)
+        if observation is not None:
+            sales = np.flatnonzero(action_type == SELL)
+            if len(sales):
+                sums = top_coin_sums(observation, int(count[sales].max()) + 1)
+                coin_value[sales] = sums[good[sales], count[sales]]
+
+        return cls(actions, action_type, requested, offered, good, count, coin_value)
+
+    def __getitem__(self, index) -> 'ActionArrays':
+        """Rows selected by a slice, an index array or a boolean mask."""
+        rows = np.arange(len(self.actions))[index]
+        return ActionArrays(
+            [self.actions[i] for i in rows],
+            self.action_type[index],
+            self.requested[index],
+            self.offered[index],
+            self.good[index],
+            self.count[index],
+            self.coin_value[index],
+        )
+
+
+def top_coin_sums(observation: MarketObservation, max_count: int = 8) -> np.ndarray:
+    """
+    Coins earned by selling goods, per good and count.
+
+    Returns
+    -------
+    numpy.ndarray
+        7 x `max_count` int32 matrix whose entry [g, c] is the sum of the top
+        `c` coins left on the market stack of good `GOOD_TYPES[g]`.
+    """
+    sums = []
+    for good_type in GOOD_TYPES:
+        row = [0]
+        for coin in reversed(observation.market_goods_coins.get(good_type, ())):
+            if len(row) == max_count:
+                break
+            row.append(row[-1] + coin)
+        sums.append(row + [row[-1]] * (max_count - len(row)))
+    return np.array(sums, dtype=np.int32)
+
+
+def _code_columns() -> tuple:
+    global _CODE_COLUMNS
+    if _CODE_COLUMNS is None:
+        _CODE_COLUMNS = _columns(_action_table()[0])
+    return _CODE_COLUMNS
+
+
+def _columns(keys: list[tuple]) -> tuple:
+    """Type, requested, offered, good and count columns of (type, requested, offered) keys."""
+    n = len(keys)
+    action_type = np.fromiter((_TYPE_INDEX[key[0]] for key in keys), dtype=np.int8, count=n)
+    requested = np.array([key[1] for key in keys], dtype=np.int8).reshape(n, len(GOOD_TYPES))
+    offered = np.array([key[2] for key in keys], dtype=np.int8).reshape(n, len(GOOD_TYPES))
+
+    # a sale moves one good type out of the hand, a take one into it
+    moved = np.where((action_type == SELL)[:, None], offered, requested)
+    count = np.where(action_type == TRADE, 0, moved.sum(axis=1)).astype(np.int8)
+    good = np.where(action_type == TRADE, -1, moved.argmax(axis=1)).astype(np.int8)
+    return action_type, requested, offered, good, count
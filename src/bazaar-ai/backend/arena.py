@@ -0,0 +1,201 @@
+"""
+Shared-memory arena of packed Markets.
+
+A `StateArena` is a block of `multiprocessing.shared_memory` divided into
+fixed-size slots, each holding one Market in the layout of `Market.to_bytes`.
+The process that creates the arena allocates and frees slots by index;
+other processes attach to it by name (or receive it pickled) and read or
+write slots in place. `StateArena.records` views the whole buffer as a NumPy
+structured array (`MARKET_RECORD`), so batch code can read fields of every
+slot at once without unpacking any Market:
+
+    arena = StateArena(1024)
+    index = arena.put(game.state)
+    ...                                            # in a worker process
+    state = arena.get(index, players)              # an independent Market
+    deck_sizes = arena.records['deck_size']        # no copy
+"""
+
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .market import Market
+from .trader import Trader
+from .goods import Goods
+from .coins import Coins
+
+
+_GOODS_COUNT = len(Goods()._goods)
+_BONUSES_COUNT = len(Coins().bonus_coins)
+
+_STACK = np.dtype([
+    ('size', 'u1'),
+    ('coins', 'u1', (Market.MAX_STACK_SIZE,)),
+])
+
+# Goods counts and coins of the market or of one player, indexed in the key
+# order of a fresh Goods / Coins (camels first)
+_SIDE = np.dtype([
+    ('goods', 'u1', (_GOODS_COUNT,)),
+    ('goods_coins', _STACK, (_GOODS_COUNT,)),
+    ('bonus_coins', _STACK, (_BONUSES_COUNT,)),
+])
+
+MARKET_RECORD = np.dtype([
+    ('version', 'u1'),
+    ('flags', 'u1'),
+    ('actor', 'u1'),
+    ('action_seat', 'u1'),
+    ('action_code', '<u2'),
+    ('camel_bonus', 'u1'),
+    ('max_goods_count', 'u1'),
+    ('max_player_goods_count', 'u1'),
+    ('initial_player_goods_count', 'u1'),
+    ('deck_size', 'u1'),
+    ('sold_size', 'u1'),
+    ('seed', '<i8'),
+    ('deck', 'u1', (Market.MAX_CARDS,)),
+    ('sold', 'u1', (Market.MAX_CARDS,)),
+    ('market', _SIDE),
+    ('players', _SIDE, (2,)),
+])
+"""NumPy view of one `Market.to_bytes` record (without RNG state)."""
+
+assert MARKET_RECORD.itemsize == Market.packed_size()
+
+
+class StateArena:
+    """
+    Fixed-size Market slots in shared memory.
+
+    Parameters
+    ----------
+    slots : int
+        Number of slots.
+    name : str, optional
+        Attach to the existing arena of that name instead of creating one.
+        Attached arenas can read and write slots but not allocate them.
+
+    Attributes
+    ----------
+    name : str
+        Name of the shared memory block, to attach from other processes.
+    slots : int
+        Number of slots.
+    records : numpy.ndarray
+        Structured array of `MARKET_RECORD` over the shared buffer. Slots
+        that were never written are all zeros.
+    """
+
+    def __init__(self, slots: int, name: Optional[str] = None):
+        self.slots = slots
+        self.slot_size = MARKET_RECORD.itemsize
+        self.owner = name is None
+        if self.owner:
+            self._memory = shared_memory.SharedMemory(create=True, size=max(1, slots * self.slot_size))
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.name = self._memory.name
+        self.records = np.ndarray((slots,), dtype=MARKET_RECORD, buffer=self._memory.buf)
+        self._free = list(range(slots - 1, -1, -1)) if self.owner else None
+
+    def allocate(self) -> int:
+        """
+        Reserve a free slot.
+
+        Returns
+        -------
+        int
+            The slot index.
+
+        Raises
+        ------
+        RuntimeError
+            If the arena is full or was attached rather than created.
+        """
+        if not self.owner:
+            raise RuntimeError("Only the process that created the arena allocates slots")
+        if not self._free:
+            raise RuntimeError(f"All {self.slots} arena slots are in use")
+        return self._free.pop()
+
+    def free(self, index: int):
+        """Release a slot allocated with `allocate` or `put`."""
+        if not self.owner:
+            raise RuntimeError("Only the process that created the arena frees slots")
+        self._free.append(index)
+
+    @property
+    def free_slots(self) -> int:
+        """Number of slots that can still be allocated."""
+        return len(self._free) if self.owner else 0
+
+    def write(self, index: int, state: Market):
+        """Pack `state` into slot `index`."""
+        start = index * self.slot_size
+        self._memory.buf[start:start + self.slot_size] = state.to_bytes()
+
+    def put(self, state: Market) -> int:
+        """
+        Allocate a slot and pack `state` into it.
+
+        Returns
+        -------
+        int
+            The slot index.
+        """
+        index = self.allocate()
+        self.write(index, state)
+        return index
+
+    def put_many(self, states: Iterable[Market]) -> list[int]:
+        """Allocate slots for several states and pack them; returns their indices in order."""
+        return [self.put(state) for state in states]
+
+    def get(self, index: int, players: list[Trader]) -> Market:
+        """
+        Unpack the Market in slot `index`.
+
+        Parameters
+        ----------
+        index : int
+            The slot.
+        players : list of Trader
+            The players, in the seat order of the packed state.
+
+        Returns
+        -------
+        Market
+            An independent state (see `Market.from_bytes`).
+        """
+        start = index * self.slot_size
+        return Market.from_bytes(self._memory.buf[start:start + self.slot_size], players)
+
+    def view(self, index: int) -> np.void:
+        """The record of slot `index`, as a view into shared memory."""
+        return self.records[index]
+
+    def close(self):
+        """Detach from the shared memory, and release it if this process created it."""
+        if self._memory is None:
+            return
+        # NumPy views must go before the buffer can be closed
+        del self.records
+        self._memory.close()
+        if self.owner:
+            self._memory.unlink()
+        self._memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __reduce__(self):
+        # Other processes attach to the same block
+        return (StateArena, (self.slots, self.name))
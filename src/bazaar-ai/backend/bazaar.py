@@ -1,14 +1,51 @@
+import random
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
 from uuid import UUID
 
 from arelai.game import Game
 
-from .market import Market, MarketObservation
+from .market import Market, MarketFactory, MarketObservation
+from .simulator import ActionSimulator
 from .trader import (
     Trader, TraderActionType, TraderAction,
-    TradeAction, TakeAction, SellAction
+    TradeAction, TakeAction, SellAction, ActionSequence
 )
 from .goods import GoodType
-from .coins import BonusType
+from .coins import BonusType, Coins
+from .rewards import RewardFunction, final_score
+
+
+@dataclass
+class Transition:
+    """
+    One turn of a game, as played by `Bazaar.step`.
+
+    Attributes
+    ----------
+    action : TraderAction
+        The action played.
+    actor : Trader
+        The trader who played it.
+    coins_gained : int
+        Value of the coins (goods and bonus) the actor won.
+    cards_drawn : int
+        Number of cards drawn from the deck to refill the market.
+    terminal : bool
+        Whether the game is over after the turn.
+    old_state, new_state : Market
+        The states before and after the turn. Neither is modified afterwards.
+    rewards : dict[Trader, float]
+        Every player's reward, from the game's reward function.
+    """
+    action: TraderAction
+    actor: Trader
+    coins_gained: int
+    cards_drawn: int
+    terminal: bool
+    old_state: Market
+    new_state: Market
+    rewards: dict = field(default_factory=dict)
 
 
 class Bazaar(Game):
@@ -25,12 +62,17 @@ class Bazaar(Game):
         A dictionary mapping player UUIDs to Trader instances.
     state : Market
         The current game state represented by a Market instance.
+    rules : dict or None
+        The Market keyword arguments the initial state was created with, if known.
+    reward_function : RewardFunction
+        Computes the players' rewards once per turn in `step` (see `backend.rewards`).
     """
 
     def __init__(self,
                  players: dict[UUID, Trader],
                  state: Market,
-                 max_rounds: int = 500):
+                 max_rounds: int = 500,
+                 rules: Optional[dict] = None):
         """
         Initialize the Bazaar game with players and an initial state.
 
@@ -40,9 +82,15 @@ class Bazaar(Game):
             Mapping from UUIDs to Trader objects.
         state : Market
             The initial state of the market.
+        max_rounds : int
+            Round limit after which the game ends.
+        rules : dict, optional
+            The Market keyword arguments used to create `state`; needed to record the game.
         """
         super().__init__(players, state)
         self.max_rounds = max_rounds
+        self.rules = rules
+        self.reward_function: RewardFunction = final_score
 
     def terminal(self, state: Market) -> bool:
         """
@@ -76,10 +124,8 @@ class Bazaar(Game):
 
         # If deck is empty, check if current player has any valid actions
         if len(state.reserved_goods) == 0:
-            # Get all legal actions for the current actor
-            legal_actions = self.all_actions(state.actor, state)
-            # Game ends only if there are no valid actions
-            return len(legal_actions) == 0
+            # Game ends only if the current actor has no valid actions
+            return self.count_actions(state.actor, state) == 0
 
         return False
 
@@ -97,39 +143,146 @@ class Bazaar(Game):
         Returns
         -------
         MarketObservation
-            The observable view of the market for the observer.
+            A read-only view of the market for the observer (see
+            `MarketObservation.from_state`).
         """
-        trader_goods = state.player_goods[observer]
-        trader_goods_coins = state.player_coins[observer].goods_coins
+        return MarketObservation.from_state(state, observer)
+
+    def all_actions(self,
+                    actor: Trader,
+                    state: Market,
+                    as_arrays: bool = False,
+                    pruned: bool = False,
+                    kinds: Optional[Iterable] = None):
+        """
+        Get all possible actions available to a trader.
 
-        trader_bonus_counts = {
-            bonus: len(state.player_coins[observer].bonus_coins[bonus])
-            for bonus in BonusType
-        }
+        Parameters
+        ----------
+        actor : Trader
+            The trader taking the action.
+        state : Market
+            The current market state.
+        as_arrays : bool
+            Return the actions as an `ActionArrays` struct-of-arrays view
+            (requires `numpy`), for agents that score actions in batch.
+        pruned : bool
+            Drop actions that are symmetric to an earlier one (see
+            `prune_actions`), for search agents. Rule checks must use the
+            full set.
+        kinds : iterable of TraderActionType or TraderAction subclass, optional
+            Only return actions of these kinds (e.g. `[SellAction]`).
 
-        global_bonus_counts = {
-            bonus: len(state.coins.bonus_coins[bonus])
-            for bonus in BonusType
-        }
+        Returns
+        -------
+        ActionSequence, list of TraderAction or ActionArrays
+            All legal actions for the given actor, trades first, then sales,
+            then takes. By default a lazy `ActionSequence`: its length is
+            counted without building the actions, and each kind is only
+            enumerated when one of its actions is needed. Pruned actions are
+            a list.
+        """
+        actions = ActionSequence(self.observe(actor, state), kinds)
+        if pruned:
+            actions = self.prune_actions(actions.to_list(), state)
+        if as_arrays:
+            from .actionarrays import ActionArrays
+            return ActionArrays.from_actions(actions, self.observe(actor, state))
+        return actions
+
+    def prune_actions(self, actions: list[TraderAction], state: Market) -> list[TraderAction]:
+        """
+        Remove the actions that are symmetric to an earlier one.
+
+        Two good types are interchangeable in a state when they have the same
+        minimum sale, identical coin stacks, and the same number of cards in
+        the market, in each hand, in the deck and among the sold goods (as
+        FABRIC and SPICE do under the standard rules until one of them is
+        taken or sold). Swapping their labels then maps the state onto
+        itself, except for the order of the deck, which no player can see.
+        So two actions that only differ by such a swap (taking two fabrics
+        for two leathers, or two spices for two leathers) are worth the same
+        to any agent, and only the first one is kept.
+
+        No other action is removed: no action dominates another one in
+        general, and distinct actions never lead to the same state. For
+        example, paying a trade with camels or with goods is a real choice
+        (camels count for the camel bonus, goods can be sold), and a trade's
+        requested and offered goods never share a type, so its net change of
+        hand and market identifies it.
 
-        return MarketObservation(
-            observer,
-            state.actor,
-            state.action,
-            trader_goods,
-            trader_goods_coins,
-            trader_bonus_counts,
-            state.goods,
-            state.coins.goods_coins,
-            global_bonus_counts,
-            len(state.reserved_goods),
-            state.max_player_goods_count,
-            state.max_goods_count
-        )
+        Parameters
+        ----------
+        actions : list of TraderAction
+            Legal actions in `state`.
+        state : Market
+            The current market state.
 
-    def all_actions(self, actor: Trader, state: Market) -> list[TraderAction]:
+        Returns
+        -------
+        list of TraderAction
+            The remaining actions, in their original order (`actions` itself
+            when no good types are interchangeable).
         """
-        Get all possible actions available to a trader.
+        groups = _interchangeable_goods(state)
+        if not groups:
+            return actions
+
+        grouped = {i for group in groups for i in group}
+        others = [i for i in range(len(GoodType)) if i not in grouped]
+
+        # actions equal up to swaps within groups share a key
+        seen = set()
+        pruned = []
+        for action in actions:
+            action_type, requested, offered = action._shape.key
+            key = (action_type,
+                   tuple(tuple(sorted(((requested[i], offered[i]) for i in group), reverse=True))
+                         for group in groups),
+                   tuple((requested[i], offered[i]) for i in others))
+            if key not in seen:
+                seen.add(key)
+                pruned.append(action)
+        return pruned
+
+    def simulator(self, observer: Optional[Trader] = None, state: Optional[Market] = None) -> ActionSimulator:
+        """
+        Create the `simulate_action_fnc` to pass to `Trader.select_action`.
+
+        Parameters
+        ----------
+        observer : Trader, optional
+            The trader simulating actions (defaults to the actor of `state`).
+        state : Market, optional
+            The state to simulate from (defaults to the current state).
+
+        Returns
+        -------
+        ActionSimulator
+            Callable with one action, or with a list of actions via `simulate`.
+        """
+        state = self.state if state is None else state
+        return ActionSimulator(state, state.actor if observer is None else observer)
+
+    def simulate_action(self, action: TraderAction) -> MarketObservation:
+        """
+        Return the actor's observation after `action`, without changing the game.
+
+        Parameters
+        ----------
+        action : TraderAction
+            An action legal in the current state.
+
+        Returns
+        -------
+        MarketObservation
+            The observation the actor would get.
+        """
+        return self.simulator(action.actor)(action)
+
+    def count_actions(self, actor: Trader, state: Market, kinds: Optional[Iterable] = None) -> int:
+        """
+        Count the actions available to a trader without building them.
 
         Parameters
         ----------
@@ -137,18 +290,52 @@ class Bazaar(Game):
             The trader taking the action.
         state : Market
             The current market state.
+        kinds : iterable of TraderActionType or TraderAction subclass, optional
+            Only count actions of these kinds.
 
         Returns
         -------
-        list of TraderAction
-            A list of all legal actions for the given actor.
+        int
+            `len(self.all_actions(actor, state, kinds=kinds))`.
+        """
+        return len(ActionSequence(self.observe(actor, state), kinds))
+
+    def random_action(self, actor: Trader, state: Market, rng: random.Random) -> Optional[TraderAction]:
+        """
+        Draw a uniformly random legal action without enumerating them all.
+
+        Equivalent in distribution to `rng.choice(self.all_actions(actor, state))`,
+        at a small fraction of the cost.
+
+        Parameters
+        ----------
+        actor : Trader
+            The trader taking the action.
+        state : Market
+            The current market state.
+        rng : random.Random
+            Source of randomness.
+
+        Returns
+        -------
+        TraderAction or None
+            A legal action, or None if there is none.
         """
         obs = self.observe(actor, state)
-        return (
-            TradeAction.all_actions(obs) +
-            SellAction.all_actions(obs) +
-            TakeAction.all_actions(obs)
-        )
+        counts = [
+            (TradeAction, TradeAction.count_actions(obs)),
+            (SellAction, SellAction.count_actions(obs)),
+            (TakeAction, TakeAction.count_actions(obs)),
+        ]
+        total = sum(count for _, count in counts)
+        if total == 0:
+            return None
+
+        index = rng.randrange(total)
+        for action_class, count in counts:
+            if index < count:
+                return action_class.sample_action(obs, index)
+            index -= count
 
     def apply_action(self, state: Market, action: TraderAction) -> Market:
         """
@@ -167,33 +354,122 @@ class Bazaar(Game):
             The new market state after applying the action.
         """
         new_state = state.clone()
+        self.apply_action_inplace(new_state, action)
+        return new_state
+
+    def apply_action_inplace(self, state: Market, action: TraderAction):
+        """
+        Apply the selected action to a market state, modifying it.
+
+        Faster than `apply_action` when the caller owns `state`, such as a
+        search working on its own copy of a game.
+
+        Parameters
+        ----------
+        state : Market
+            The market state to update.
+        action: TraderAction
+            The current actor's action.
+        """
         actor = action.actor
 
         for good in action.requested_goods.to_list():
-            new_state.player_goods[actor].add(good)
-            new_state.goods.remove(good)
+            state.player_goods[actor].add(good)
+            state.goods.remove(good)
 
         for good in action.offered_goods.to_list():
-            new_state.player_goods[actor].remove(good)
+            state.player_goods[actor].remove(good)
             if action.trader_action_type == TraderActionType.SELL:
-                new_state.sold_goods.append(good)
+                state.sold_goods.append(good)
             else:
-                new_state.goods.add(good)
+                state.goods.add(good)
 
         if action.trader_action_type == TraderActionType.SELL:
             for _ in range(action._count):
-                coin = new_state.coins.pop_goods_coin(action._sell)
-                new_state.player_coins[actor].add_goods_coin(action._sell, coin)
+                coin = state.coins.pop_goods_coin(action._sell)
+                state.player_coins[actor].add_goods_coin(action._sell, coin)
 
             if action._count in BonusType._value2member_map_:
                 bonus_type = BonusType(action._count)
-                bonus_coin = new_state.coins.pop_bonus_coin(bonus_type)
-                new_state.player_coins[actor].add_bonus_coin(bonus_type, bonus_coin)
+                bonus_coin = state.coins.pop_bonus_coin(bonus_type)
+                state.player_coins[actor].add_bonus_coin(bonus_type, bonus_coin)
 
-        new_state.actor = self.state.get_non_actor()
-        new_state.action = action
-        new_state.refill_market()
-        return new_state
+        state.actor = state.get_non_actor()
+        state.action = action
+        state.refill_market()
+
+    def score(self, player: Trader, state: Market) -> int:
+        """
+        Compute a player's final score: coins, bonus coins and the camel bonus.
+
+        Parameters
+        ----------
+        player : Trader
+            The trader to score.
+        state : Market
+            The market state.
+
+        Returns
+        -------
+        int
+            The player's score if the game ended in `state`.
+        """
+        total = _coins_value(state.player_coins[player])
+
+        camels = state.player_goods[player][GoodType.CAMEL]
+        if all(camels > state.player_goods[other][GoodType.CAMEL]
+               for other in state.players if other != player):
+            total += state.camel_bonus
+        return total
+
+    def step(self, action: TraderAction) -> Transition:
+        """
+        Play one turn: apply an action, compute the rewards and let the players observe it.
+
+        The rewards are computed once, by `reward_function`, and passed to the
+        `calculate_reward` of every player that overrides it, with read-only
+        observations of the states before and after the turn. Nothing is
+        cloned: players that do not override `calculate_reward` cost nothing.
+
+        Parameters
+        ----------
+        action : TraderAction
+            A legal action of the current actor.
+
+        Returns
+        -------
+        Transition
+            What happened during the turn.
+        """
+        old_state = self.state
+        new_state = self.apply_action(old_state, action)
+        self.old_state = old_state
+        self.state = new_state
+
+        actor = old_state.actor
+        transition = Transition(
+            action=action,
+            actor=actor,
+            coins_gained=(_coins_value(new_state.player_coins[actor])
+                          - _coins_value(old_state.player_coins[actor])),
+            cards_drawn=len(old_state.reserved_goods) - len(new_state.reserved_goods),
+            terminal=self.terminal(new_state),
+            old_state=old_state,
+            new_state=new_state,
+        )
+        transition.rewards = self.reward_function(self, transition)
+
+        for player in self.players:
+            if player.uses_rewards():
+                player.calculate_reward(
+                    self.observe(player, old_state),
+                    self.observe(player, new_state),
+                    player == actor,
+                    transition.rewards.get(player)
+                )
+
+        self.round += 1
+        return transition
 
     def calculate_reward(
         self,
@@ -221,12 +497,7 @@ class Bazaar(Game):
         if not self.terminal(new_state):
             return 0
 
-        total = 0
-        for good in GoodType:
-            total += sum(new_state.player_coins[player].goods_coins[good])
-        for bonus in BonusType:
-            total += sum(new_state.player_coins[player].bonus_coins[bonus])
-        return total
+        return _coins_value(new_state.player_coins[player])
 
     def output(self):
         """
@@ -372,51 +643,123 @@ class Bazaar(Game):
             for player_id in self.players
         ]))
 
+def _interchangeable_goods(state: Market) -> list[list[int]]:
+    """
+    Groups of interchangeable good types in a state (see `Bazaar.prune_actions`).
+
+    Returns
+    -------
+    list of list of int
+        Indices into `list(GoodType)` of each group of two or more types.
+    """
+    signatures = {}
+    for i, good_type in enumerate(GoodType):
+        signature = (
+            SellAction.MIN_SELL_COUNT[good_type],
+            tuple(state.coins.goods_coins[good_type]),
+            state.goods[good_type],
+            tuple(state.player_goods[player][good_type] for player in state.players),
+            state.reserved_goods.count(good_type),
+            state.sold_goods.count(good_type),
+        )
+        signatures.setdefault(signature, []).append(i)
+    return [group for group in signatures.values() if len(group) > 1]
+
+
+def _coins_value(coins: Coins) -> int:
+    """Total value of a trader's goods and bonus coins."""
+    return (sum(sum(stack) for stack in coins.goods_coins.values())
+            + sum(sum(stack) for stack in coins.bonus_coins.values()))
+
+
 class BasicBazaar(Bazaar):
+    """
+    A Bazaar using the standard Jaipur deck, coins and hand limits.
+    """
+
+    RESERVED_GOODS = (
+        (GoodType.CAMEL, 11),
+        (GoodType.LEATHER, 10),
+        (GoodType.SPICE, 8),
+        (GoodType.FABRIC, 8),
+        (GoodType.SILVER, 6),
+        (GoodType.GOLD, 6),
+        (GoodType.DIAMOND, 6)
+    )
+
+    GOODS_COINS = {
+        GoodType.DIAMOND: (5, 5, 5, 7, 7),
+        GoodType.GOLD: (5, 5, 5, 6, 6),
+        GoodType.SILVER: (5, 5, 5, 5, 5),
+        GoodType.FABRIC: (1, 1, 2, 2, 3, 3, 5),
+        GoodType.SPICE: (1, 1, 2, 2, 3, 3, 5),
+        GoodType.LEATHER: (4, 3, 2, 1, 1, 1, 1, 1, 1),
+        GoodType.CAMEL: ()
+    }
+
+    BONUS_COINS = {
+        BonusType.THREE: (1, 1, 2, 2, 2, 3, 3),
+        BonusType.FOUR: (6, 6, 4, 4, 5, 5),
+        BonusType.FIVE: (8, 8, 9, 10, 10),
+    }
+
+    CAMEL_BONUS = 5
+    MAX_GOODS_COUNT = 5
+    MAX_PLAYER_GOODS_COUNT = 7
+    INITIAL_PLAYER_GOODS_COUNT = 5
+
     def __init__(self, seed, players):
+        initial_state = self.market_factory().create(seed, players)
+        super().__init__(players, initial_state, rules=self.default_rules())
 
-        reserved_goods = (
-            [GoodType.CAMEL] * 11 +
-            [GoodType.LEATHER] * 10 + 
-            [GoodType.SPICE] * 8 +
-            [GoodType.FABRIC] * 8 +
-            [GoodType.SILVER] * 6 +
-            [GoodType.GOLD] * 6 +
-            [GoodType.DIAMOND] * 6
-        )
+    def reset(self, seed):
+        """
+        Start a new game with the same players, reusing the current state object.
 
-        goods_coins = {
-            GoodType.DIAMOND: [5, 5, 5, 7, 7],
-            GoodType.GOLD: [5, 5, 5, 6, 6], 
-            GoodType.SILVER: [5, 5, 5, 5, 5],
-            GoodType.FABRIC: [1, 1, 2, 2, 3, 3, 5],
-            GoodType.SPICE: [1, 1, 2, 2, 3, 3, 5],
-            GoodType.LEATHER: [4, 3, 2, 1, 1, 1, 1, 1, 1],
-            GoodType.CAMEL: []
-        }
+        Parameters
+        ----------
+        seed : int
+            Seed of the new game.
+        """
+        self.market_factory().reset(self.state, seed)
+        self.round = 0
+        self.old_state = None
 
-        bonus_coins = {
-            BonusType.THREE: [1, 1, 2, 2, 2, 3, 3],
-            BonusType.FOUR: [6, 6, 4, 4, 5, 5], 
-            BonusType.FIVE: [8, 8, 9, 10, 10],
-        }
+    @classmethod
+    def market_factory(cls) -> MarketFactory:
+        """
+        The MarketFactory for the standard rules, built once per class.
 
-        camel_bonus = 5
-        max_size = 5
-        max_trader_size = 7
-        initial_trader_size = 5
-
-        initial_state = Market(
-            seed=seed,
-            players = players,
-            actor = players[0],
-            action = None,
-            reserved_goods = reserved_goods,
-            goods_coins = goods_coins,
-            bonus_coins = bonus_coins,
-            camel_bonus = camel_bonus,
-            max_goods_count = max_size,
-            max_player_goods_count = max_trader_size,
-            initial_player_goods_count = initial_trader_size)
-        
-        super().__init__(players, initial_state)
\ No newline at end of file
+        Returns
+        -------
+        MarketFactory
+            A factory shared by every game of this class.
+        """
+        factory = cls.__dict__.get('_market_factory')
+        if factory is None:
+            factory = MarketFactory(cls.default_rules())
+            cls._market_factory = factory
+        return factory
+
+    @classmethod
+    def default_rules(cls) -> dict:
+        """
+        Build fresh Market keyword arguments for the standard rules.
+
+        Returns
+        -------
+        dict
+            reserved_goods, goods_coins, bonus_coins, camel_bonus,
+            max_goods_count, max_player_goods_count and initial_player_goods_count.
+        """
+        return {
+            'reserved_goods': [
+                good_type for good_type, count in cls.RESERVED_GOODS for _ in range(count)
+            ],
+            'goods_coins': {good: list(coins) for good, coins in cls.GOODS_COINS.items()},
+            'bonus_coins': {bonus: list(coins) for bonus, coins in cls.BONUS_COINS.items()},
+            'camel_bonus': cls.CAMEL_BONUS,
+            'max_goods_count': cls.MAX_GOODS_COUNT,
+            'max_player_goods_count': cls.MAX_PLAYER_GOODS_COUNT,
+            'initial_player_goods_count': cls.INITIAL_PLAYER_GOODS_COUNT
+        }
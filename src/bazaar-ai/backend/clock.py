@@ -0,0 +1,243 @@
+"""
+Time controls for Bazaar games.
+
+A `TimeControl` describes how much thinking time each player gets: a fixed
+allowance per move, a total budget for the game plus an increment added
+after every move, or both. A `GameClock` keeps each player's remaining time
+under a time control and hands out a `MoveBudget` at the start of every move:
+
+    clock = GameClock(TimeControl.incremental(180, 2), game.state.players)
+    budget = clock.start_move(actor)
+    action = select_action_with_budget(actor, actions, observation, simulate, budget)
+    late = not clock.stop_move(actor, budget)
+
+Agents opt in to receiving the budget by accepting a `budget` keyword in
+`select_action` (see `Trader.accepts_budget`); other agents are called as
+before. An agent can `offer` its best action so far to the budget, which
+the caller plays if the agent runs out of time before returning.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from .market import MarketObservation
+from .simulator import ActionSimulator
+from .trader import Trader, TraderAction
+
+
+@dataclass(frozen=True)
+class TimeControl:
+    """
+    Thinking time allowed to each player.
+
+    Parameters
+    ----------
+    per_move : float, optional
+        Seconds allowed for every move.
+    total : float, optional
+        Seconds allowed for the whole game.
+    increment : float
+        Seconds added to the total after each move made in time.
+
+    Raises
+    ------
+    ValueError
+        If neither `per_move` nor `total` is given, or a value is not positive.
+    """
+    per_move: Optional[float] = None
+    total: Optional[float] = None
+    increment: float = 0.0
+
+    def __post_init__(self):
+        if self.per_move is None and self.total is None:
+            raise ValueError("A time control needs a per-move or a total budget")
+        if (self.per_move is not None and self.per_move <= 0) or (self.total is not None and self.total <= 0):
+            raise ValueError("Time budgets must be positive")
+        if self.increment < 0:
+            raise ValueError("The increment cannot be negative")
+
+    @classmethod
+    def fixed(cls, seconds: float) -> 'TimeControl':
+        """The same allowance for every move."""
+        return cls(per_move=seconds)
+
+    @classmethod
+    def incremental(cls, total: float, increment: float = 0.0) -> 'TimeControl':
+        """A total budget for the game, plus `increment` seconds per move."""
+        return cls(total=total, increment=increment)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> Optional['TimeControl']:
+        """
+        Parse the JSON form used by the UI ({'perMove', 'total', 'increment'}).
+
+        Returns None when no budget is set (no time control).
+        """
+        per_move = data.get('perMove') or None
+        total = data.get('total') or None
+        if per_move is None and total is None:
+            return None
+        return cls(per_move=None if per_move is None else float(per_move),
+                   total=None if total is None else float(total),
+                   increment=float(data.get('increment') or 0.0))
+
+    def to_dict(self) -> dict:
+        """The JSON form accepted by `from_dict`."""
+        return {'perMove': self.per_move, 'total': self.total, 'increment': self.increment}
+
+    def __str__(self):
+        parts = []
+        if self.total is not None:
+            parts.append(f"{self.total:g}s+{self.increment:g}s")
+        if self.per_move is not None:
+            parts.append(f"{self.per_move:g}s/move")
+        return ', '.join(parts)
+
+
+class MoveBudget:
+    """
+    Thinking time granted for one move.
+
+    Parameters
+    ----------
+    seconds : float
+        Hard limit for the move: the per-move allowance or the player's
+        remaining total, whichever is smaller (inf without a limit).
+    time_control : TimeControl, optional
+        The game's time control.
+
+    Attributes
+    ----------
+    best : TraderAction or None
+        The last action offered with `offer`.
+    """
+
+    __slots__ = ('seconds', 'time_control', 'started', 'deadline', 'best')
+
+    def __init__(self, seconds: float, time_control: Optional[TimeControl] = None):
+        self.seconds = seconds
+        self.time_control = time_control
+        self.started = time.perf_counter()
+        self.deadline = self.started + seconds
+        self.best = None
+
+    def elapsed(self) -> float:
+        """Seconds spent on the move so far."""
+        return time.perf_counter() - self.started
+
+    def remaining(self) -> float:
+        """Seconds left before the hard limit (never negative)."""
+        return max(0.0, self.deadline - time.perf_counter())
+
+    def expired(self) -> bool:
+        """Whether the hard limit has passed."""
+        return time.perf_counter() >= self.deadline
+
+    def offer(self, action: TraderAction):
+        """
+        Register the best action found so far.
+
+        Called from `select_action` (from any thread), so that the caller can
+        still play a move if the agent does not return in time.
+        """
+        self.best = action
+
+    def allocate(self, moves_left: int = 20, margin: float = 0.05) -> float:
+        """
+        Suggest how long to think about this move.
+
+        With a per-move allowance only, that is the whole allowance; with a
+        total budget, an even share of the remaining time over `moves_left`
+        moves plus the increment. Either way `margin` (a fraction of the
+        move's hard limit, at least 10 ms) is kept back for returning.
+
+        Parameters
+        ----------
+        moves_left : int
+            Estimated number of moves the player has left in the game.
+        margin : float
+            Fraction of the hard limit kept in reserve.
+
+        Returns
+        -------
+        float
+            Seconds, possibly inf without a time control.
+        """
+        remaining = self.remaining()
+        if math.isinf(remaining):
+            return remaining
+        share = remaining
+        control = self.time_control
+        if control is not None and control.total is not None:
+            share = min(share, remaining / max(1, moves_left) + control.increment)
+        return max(0.0, min(share, remaining - max(0.01, margin * self.seconds)))
+
+
+class GameClock:
+    """
+    Remaining thinking time of every player of a game.
+
+    Parameters
+    ----------
+    time_control : TimeControl
+        The time control of the game.
+    players : iterable of Trader
+        The players.
+
+    Attributes
+    ----------
+    remaining : dict
+        Seconds left on each player's total budget, by player name (None
+        without a total budget).
+    """
+
+    def __init__(self, time_control: TimeControl, players: Iterable[Trader]):
+        self.time_control = time_control
+        self.remaining = {player.name: time_control.total for player in players}
+
+    def start_move(self, player: Trader) -> MoveBudget:
+        """Start the player's clock and return the budget of the move."""
+        control = self.time_control
+        seconds = math.inf
+        if control.per_move is not None:
+            seconds = control.per_move
+        if control.total is not None:
+            seconds = min(seconds, self.remaining[player.name])
+        return MoveBudget(seconds, control)
+
+    def stop_move(self, player: Trader, budget: MoveBudget) -> bool:
+        """
+        Stop the player's clock, charging the time spent on the move.
+
+        A late move is charged the whole budget and earns no increment; what
+        happens to the player is up to the caller.
+
+        Returns
+        -------
+        bool
+            Whether the move was made in time.
+        """
+        elapsed = budget.elapsed()
+        on_time = elapsed <= budget.seconds
+        control = self.time_control
+        if control.total is not None:
+            left = self.remaining[player.name] - min(elapsed, budget.seconds)
+            self.remaining[player.name] = max(0.0, left) + (control.increment if on_time else 0.0)
+        return on_time
+
+
+def select_action_with_budget(player: Trader,
+                              actions,
+                              observation: MarketObservation,
+                              simulate_action_fnc: ActionSimulator,
+                              budget: Optional[MoveBudget]) -> TraderAction:
+    """
+    Call `player.select_action`, passing the budget if the player accepts one.
+    """
+    if budget is not None and player.accepts_budget():
+        return player.select_action(actions, observation, simulate_action_fnc, budget=budget)
+    return player.select_action(actions, observation, simulate_action_fnc)
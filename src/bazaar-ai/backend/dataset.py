@@ -0,0 +1,408 @@
+"""
+Columnar trajectory datasets backed by memory-mapped NumPy files.
+
+A dataset is a directory holding one raw, append-only file per column plus an
+`index.json` describing row count and column layout. Rows are turns: the
+encoded observation of the acting player, the action it took, the legality
+mask of that turn, and the reward/done signals. Datasets can therefore grow
+beyond RAM and are read back through `np.memmap` without loading them.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from .bazaar import Bazaar
+from .market import MarketObservation
+from .trader import TraderAction
+from .goods import GoodType
+from .coins import BonusType
+from .clock import TimeControl, GameClock, select_action_with_budget
+
+
+_INDEX_FILE = 'index.json'
+_VERSION = 1
+
+_NON_CAMELS = [gt for gt in GoodType if gt != GoodType.CAMEL]
+
+OBSERVATION_SIZE = 2 * len(GoodType) + 4 * len(_NON_CAMELS) + 2 * len(BonusType) + 4
+
+
+def encode_observation(observation: MarketObservation) -> np.ndarray:
+    """
+    Encode an observation as a fixed-length int16 vector.
+
+    Layout: actor goods (7), market goods (7), for each non-camel good the
+    remaining market coin count, top coin and coin sum (3 x 6), the actor's
+    coin sum per non-camel good (6), actor and market bonus coin counts (3 + 3),
+    deck size, whether the observer is the actor, and the hand/market limits.
+
+    Parameters
+    ----------
+    observation : MarketObservation
+        The observation to encode.
+
+    Returns
+    -------
+    np.ndarray
+        Vector of length OBSERVATION_SIZE.
+    """
+    vec = [observation.actor_goods[gt] for gt in GoodType]
+    vec += [observation.market_goods[gt] for gt in GoodType]
+    for gt in _NON_CAMELS:
+        coins = observation.market_goods_coins[gt]
+        vec += [len(coins), coins[-1] if coins else 0, sum(coins)]
+    vec += [sum(observation.actor_goods_coins[gt]) for gt in _NON_CAMELS]
+    vec += [observation.actor_bonus_coins_counts[bt] for bt in BonusType]
+    vec += [observation.market_bonus_coins_counts[bt] for bt in BonusType]
+    vec += [
+        observation.market_reserved_goods_count,
+        int(observation.observer == observation.actor),
+        observation.max_player_goods_count,
+        observation.max_market_goods_count
+    ]
+    return np.array(vec, dtype=np.int16)
+
+
+def encode_legal_actions(actions: list[TraderAction]) -> np.ndarray:
+    """
+    Encode a list of legal actions as a bit-packed mask over action codes.
+
+    Parameters
+    ----------
+    actions : list of TraderAction
+        The legal actions.
+
+    Returns
+    -------
+    np.ndarray
+        uint8 vector of ceil(TraderAction.code_count() / 8) bytes.
+    """
+    mask = np.zeros(TraderAction.code_count(), dtype=bool)
+    mask[[action.code for action in actions]] = True
+    return np.packbits(mask)
+
+
+def _columns() -> dict[str, tuple[str, tuple[int, ...]]]:
+    """Column name -> (dtype, per-row shape)."""
+    return {
+        'observations': ('int16', (OBSERVATION_SIZE,)),
+        'actions': ('uint16', ()),
+        'legal_masks': ('uint8', ((TraderAction.code_count() + 7) // 8,)),
+        'rewards': ('float32', ()),
+        'dones': ('bool', ()),
+        'seats': ('uint8', ()),
+    }
+
+
+def play_game(game: Bazaar, time_control: Optional[TimeControl] = None) -> dict[str, np.ndarray]:
+    """
+    Play a game to completion with its own players and encode every turn.
+
+    Turns are played with `Bazaar.step`, so players observe them as usual.
+    The rewards of every turn (from the game's `reward_function`) go to each
+    player's latest step, and each player's final step is marked done.
+
+    Parameters
+    ----------
+    game : Bazaar
+        A game that has not started yet.
+    time_control : TimeControl, optional
+        Clocks for the players. Agents that accept a budget pace themselves
+        with it; moves are not interrupted, and late moves are still played.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        One array per dataset column, with one row per turn.
+    """
+    seats = {player: seat for seat, player in enumerate(game.state.players)}
+    columns = {name: [] for name in _columns()}
+    last_step = {}
+    clock = GameClock(time_control, game.state.players) if time_control is not None else None
+
+    while not game.terminal(game.state):
+        actor = game.state.actor
+        actions = game.all_actions(actor, game.state)
+        observation = game.observe(actor, game.state)
+        budget = clock.start_move(actor) if clock is not None else None
+        action = select_action_with_budget(actor, actions, observation, game.simulator(actor), budget)
+        if clock is not None:
+            clock.stop_move(actor, budget)
+
+        last_step[actor] = len(columns['actions'])
+        columns['observations'].append(encode_observation(observation))
+        columns['actions'].append(action.code)
+        columns['legal_masks'].append(encode_legal_actions(actions))
+        columns['rewards'].append(0.0)
+        columns['dones'].append(False)
+        columns['seats'].append(seats[actor])
+
+        transition = game.step(action)
+        for player, reward in transition.rewards.items():
+            if player in last_step:
+                columns['rewards'][last_step[player]] += reward
+
+    for index in last_step.values():
+        columns['dones'][index] = True
+
+    count = len(columns['actions'])
+    return {
+        name: np.asarray(columns[name], dtype=dtype).reshape((count, *shape))
+        for name, (dtype, shape) in _columns().items()
+    }
+
+
+class TrajectoryWriter:
+    """
+    Append-only writer for a trajectory dataset.
+
+    Rows are buffered in memory and written to the column files on `flush`
+    (automatically every `flush_rows` rows and on `close`). Opening an
+    existing dataset appends to it, after cutting the files back to the rows
+    and episodes of its index: a flush interrupted between writing the
+    column files and replacing the index leaves nothing behind.
+
+    Parameters
+    ----------
+    path : str or Path
+        Dataset directory (created if needed).
+    flush_rows : int
+        Number of buffered rows that triggers a flush.
+    """
+
+    def __init__(self, path, flush_rows: int = 4096):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.flush_rows = flush_rows
+        self.columns = _columns()
+
+        index_path = self.path / _INDEX_FILE
+        if index_path.exists():
+            with open(index_path) as f:
+                index = json.load(f)
+            self._check_layout(index)
+            self.rows = index['rows']
+            self.episodes = index['episodes']
+        else:
+            self.rows = 0
+            self.episodes = 0
+        self._truncate()
+
+        self._buffers = {name: [] for name in self.columns}
+        self._episode_starts = []
+        self._episode_open = False
+
+    def _truncate(self):
+        sizes = {
+            f'{name}.bin': self.rows * np.dtype(dtype).itemsize * math.prod(shape)
+            for name, (dtype, shape) in self.columns.items()
+        }
+        sizes['episode_starts.bin'] = self.episodes * np.dtype(np.int64).itemsize
+        for file_name, size in sizes.items():
+            file_path = self.path / file_name
+            actual = file_path.stat().st_size if file_path.exists() else 0
+            if actual < size:
+                raise ValueError(f"Dataset at {self.path} is missing rows of {file_name}")
+            if actual > size:
+                os.truncate(file_path, size)
+
+    def _check_layout(self, index: dict):
+        expected = {name: [dtype, list(shape)] for name, (dtype, shape) in self.columns.items()}
+        if index.get('version') != _VERSION or index.get('columns') != expected:
+            raise ValueError(f"Dataset at {self.path} has an incompatible layout")
+
+    def append(self,
+               observation: np.ndarray,
+               action: int,
+               legal_mask: np.ndarray,
+               reward: float,
+               done: bool,
+               seat: int = 0):
+        """
+        Append one row.
+
+        Parameters
+        ----------
+        observation : np.ndarray
+            Output of `encode_observation`.
+        action : int
+            Canonical action code.
+        legal_mask : np.ndarray
+            Output of `encode_legal_actions`.
+        reward : float
+            Reward received for this step.
+        done : bool
+            Whether this is the last step of the seat's trajectory.
+        seat : int
+            Seat index of the acting player.
+        """
+        if not self._episode_open:
+            self._episode_starts.append(self.rows + len(self._buffers['actions']))
+            self._episode_open = True
+
+        buffers = self._buffers
+        buffers['observations'].append(observation)
+        buffers['actions'].append(action)
+        buffers['legal_masks'].append(legal_mask)
+        buffers['rewards'].append(reward)
+        buffers['dones'].append(done)
+        buffers['seats'].append(seat)
+
+        if len(buffers['actions']) >= self.flush_rows:
+            self.flush()
+
+    def end_episode(self):
+        """Mark the end of the current game; the next row starts a new episode."""
+        self._episode_open = False
+
+    def append_episode(self, columns: dict[str, np.ndarray]):
+        """
+        Append the rows of one finished game as an episode.
+
+        Parameters
+        ----------
+        columns : dict[str, np.ndarray]
+            Column arrays with one row per turn, as returned by `play_game`.
+        """
+        self.end_episode()
+        for row in zip(*(columns[name] for name in self.columns)):
+            self.append(*row)
+        self.end_episode()
+
+    def record_game(self, game: Bazaar):
+        """
+        Play a game to completion with its own players and append every turn.
+
+        Parameters
+        ----------
+        game : Bazaar
+            A game that has not started yet.
+        """
+        self.append_episode(play_game(game))
+
+    def flush(self):
+        """Write buffered rows to the column files and update the index."""
+        count = len(self._buffers['actions'])
+        if count:
+            for name, (dtype, shape) in self.columns.items():
+                data = np.asarray(self._buffers[name], dtype=dtype).reshape((count, *shape))
+                with open(self.path / f'{name}.bin', 'ab') as f:
+                    data.tofile(f)
+                self._buffers[name].clear()
+            self.rows += count
+
+        if self._episode_starts:
+            with open(self.path / 'episode_starts.bin', 'ab') as f:
+                np.asarray(self._episode_starts, dtype=np.int64).tofile(f)
+            self.episodes += len(self._episode_starts)
+            self._episode_starts.clear()
+
+        index = {
+            'version': _VERSION,
+            'rows': self.rows,
+            'episodes': self.episodes,
+            'columns': {name: [dtype, list(shape)] for name, (dtype, shape) in self.columns.items()}
+        }
+        tmp_path = self.path / (_INDEX_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.path / _INDEX_FILE)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryDataset:
+    """
+    Read-only view of a trajectory dataset.
+
+    Columns are `np.memmap`s over the column files, so opening a dataset costs
+    nothing regardless of its size. Slicing returns views into the maps
+    (zero-copy); `sample` gathers a random minibatch directly from the maps,
+    touching only the sampled rows.
+
+    Parameters
+    ----------
+    path : str or Path
+        Dataset directory written by TrajectoryWriter.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / _INDEX_FILE) as f:
+            index = json.load(f)
+        if index.get('version') != _VERSION:
+            raise ValueError(f"Unsupported dataset version: {index.get('version')}")
+
+        self.rows = index['rows']
+        self.columns = {}
+        for name, (dtype, shape) in index['columns'].items():
+            self.columns[name] = self._map(f'{name}.bin', dtype, (self.rows, *shape))
+        self.episode_starts = self._map('episode_starts.bin', 'int64', (index['episodes'],))
+
+    def _map(self, file_name: str, dtype: str, shape: tuple[int, ...]) -> np.ndarray:
+        if shape[0] == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path / file_name, dtype=dtype, mode='r', shape=shape)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, index) -> dict[str, np.ndarray]:
+        """Rows `index` of every column (views when `index` is a slice)."""
+        return {name: column[index] for name, column in self.columns.items()}
+
+    def sample(self,
+               batch_size: int,
+               rng: Optional[np.random.Generator] = None) -> dict[str, np.ndarray]:
+        """
+        Draw a uniformly random minibatch of rows.
+
+        Parameters
+        ----------
+        batch_size : int
+            Number of rows to draw (without replacement).
+        rng : np.random.Generator, optional
+            Source of randomness.
+
+        Returns
+        -------
+        dict[str, np.ndarray]
+            One array per column, plus the sampled row `indices`.
+        """
+        rng = rng or np.random.default_rng()
+        # sorted indices keep the reads in file order
+        indices = np.sort(rng.choice(self.rows, size=batch_size, replace=False))
+        batch = self[indices]
+        batch['indices'] = indices
+        return batch
+
+    @staticmethod
+    def unpack_legal_masks(legal_masks: np.ndarray) -> np.ndarray:
+        """
+        Expand packed legality masks to booleans.
+
+        Parameters
+        ----------
+        legal_masks : np.ndarray
+            Packed masks of shape (N, bytes).
+
+        Returns
+        -------
+        np.ndarray
+            Boolean array of shape (N, TraderAction.code_count()).
+        """
+        return np.unpackbits(legal_masks, axis=-1, count=TraderAction.code_count()).astype(bool)
@@ -0,0 +1,344 @@
+"""
+Sampling complete game states consistent with a player's information.
+
+A MarketObservation hides the order of `Market.reserved_goods` and the
+opponent's hand. Search agents (ISMCTS and friends) instead work on
+determinizations: full Markets in which the unseen cards have been dealt at
+random, consistently with everything the observer knows. Together with the
+observation, `PublicHistory` records what the observer learned from earlier
+turns: the goods sold, the cards known to be in the opponent's hand and the
+order in which bonus coins were won.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Optional
+
+from .bazaar import Bazaar, BasicBazaar
+from .market import Market, MarketObservation
+from .trader import Trader, TraderAction, TraderActionType
+from .goods import GoodType, Goods
+from .coins import BonusType, Coins
+
+
+_GOODS = list(GoodType)
+
+
+class PublicHistory:
+    """
+    Public information gathered by one player over the course of a game.
+
+    Feed every action of the game, in order, to `record` (the observer's own
+    actions as well as the opponent's, which are visible as
+    `MarketObservation.action`).
+
+    Parameters
+    ----------
+    observer : Trader
+        The player whose knowledge this is.
+    initial_player_goods_count : int
+        Size of the hands dealt at the start of the game.
+
+    Attributes
+    ----------
+    opponent_known : Goods
+        Cards known to be in the opponent's hand (taken from the market).
+    opponent_hand_size : int
+        Total number of cards in the opponent's hand, camels included.
+    sold_goods : Goods
+        Goods sold by either player.
+    sells : list of (bool, GoodType, int)
+        Every sale in order, as (sold by the observer, good type, count).
+    """
+
+    def __init__(self,
+                 observer: Trader,
+                 initial_player_goods_count: int = BasicBazaar.INITIAL_PLAYER_GOODS_COUNT):
+        self.observer = observer
+        self.opponent_known = Goods()
+        self.opponent_hand_size = initial_player_goods_count
+        self.sold_goods = Goods()
+        self.sells = []
+
+    @classmethod
+    def from_actions(cls, observer: Trader, actions: list[TraderAction], **kwargs) -> 'PublicHistory':
+        """Build the history of a game from all of its actions, in order."""
+        history = cls(observer, **kwargs)
+        for action in actions:
+            history.record(action)
+        return history
+
+    def record(self, action: TraderAction):
+        """
+        Update the history with the next action of the game.
+
+        Parameters
+        ----------
+        action : TraderAction
+            The action, by either player.
+        """
+        by_observer = action.actor == self.observer
+        if action.trader_action_type == TraderActionType.SELL:
+            good_type, count = action._sell, action._count
+            self.sold_goods._goods[good_type] += count
+            self.sells.append((by_observer, good_type, count))
+
+        if by_observer:
+            return
+
+        known = self.opponent_known._goods
+        for good_type in _GOODS:
+            known[good_type] += action.requested_goods[good_type]
+            # cards given away come from the known part of the hand first,
+            # the rest were hidden until now
+            known[good_type] = max(0, known[good_type] - action.offered_goods[good_type])
+        self.opponent_hand_size += action.requested_goods.count() - action.offered_goods.count()
+
+    def unseen_goods(self, observation: MarketObservation, composition: Goods) -> Goods:
+        """
+        Cards the observer cannot see: the deck and the unknown part of the
+        opponent's hand.
+
+        Parameters
+        ----------
+        observation : MarketObservation
+            What the observer currently sees.
+        composition : Goods
+            All the cards of the game.
+
+        Raises
+        ------
+        ValueError
+            If more cards of a type are visible than the game holds.
+        """
+        return _unseen_goods(composition, observation, self.sold_goods, self.opponent_known)
+
+    def bonus_coins(self, bonus_coins: dict[BonusType, list[int]]) -> tuple[dict, dict]:
+        """
+        Bonus coins won so far by the observer and by the opponent.
+
+        Every bonus coin is won from the top of its sorted stack, so replaying
+        the sales in order tells which coin went to whom.
+
+        Parameters
+        ----------
+        bonus_coins : dict
+            The sorted bonus coin stacks of the rules.
+
+        Returns
+        -------
+        tuple of (dict, dict)
+            The observer's and the opponent's coins, by bonus type.
+        """
+        stacks = {bonus: list(stack) for bonus, stack in bonus_coins.items()}
+        own = {bonus: [] for bonus in BonusType}
+        opponent = {bonus: [] for bonus in BonusType}
+        for by_observer, _, count in self.sells:
+            if count in BonusType._value2member_map_:
+                bonus = BonusType(count)
+                if stacks.get(bonus):
+                    (own if by_observer else opponent)[bonus].append(stacks[bonus].pop())
+        return own, opponent
+
+
+class Determinizer:
+    """
+    Sample full Markets consistent with an observation.
+
+    The unseen cards (the initial deck minus the visible market, the
+    observer's hand, the goods sold and the opponent cards known from the
+    history) are shuffled and dealt to the opponent's unknown hand slots and
+    to the deck. Coin stacks are rebuilt deterministically, since coins are
+    always won from the top of sorted stacks.
+
+    Parameters
+    ----------
+    rules : dict, optional
+        Market keyword arguments of the game (defaults to BasicBazaar's).
+    seed : optional
+        Seed of the sampler's random number generator.
+    """
+
+    def __init__(self, rules: Optional[dict] = None, seed=None):
+        self.rules = rules or BasicBazaar.default_rules()
+        self.rng = random.Random(seed)
+
+        self.composition = Goods.from_list(self.rules['reserved_goods'])
+        self.goods_coins = {good: sorted(coins) for good, coins in self.rules['goods_coins'].items()}
+        self.bonus_coins = {bonus: sorted(coins) for bonus, coins in self.rules['bonus_coins'].items()}
+
+    def sample(self,
+               observation: MarketObservation,
+               history: Optional[PublicHistory] = None,
+               count: int = 1,
+               opponent: Optional[Trader] = None) -> list[Market]:
+        """
+        Sample `count` determinizations of an observation.
+
+        Without a history, sold goods are inferred from the coins taken off
+        the market (exact until a stack runs out), nothing is assumed about the
+        opponent's hand, and bonus coins are split between the players
+        arbitrarily.
+
+        Parameters
+        ----------
+        observation : MarketObservation
+            What the observer currently sees.
+        history : PublicHistory, optional
+            What the observer learned from earlier turns.
+        count : int
+            Number of Markets to sample.
+        opponent : Trader, optional
+            The opponent to seat in the sampled Markets. Defaults to a
+            placeholder Trader named after the observer.
+
+        Returns
+        -------
+        list of Market
+            Independent Markets, with the observer in `players[0]`.
+
+        Raises
+        ------
+        ValueError
+            If the observation and history contradict the rules' deck.
+        """
+        observer = observation.observer
+        if opponent is None:
+            opponent = Trader(None, f"{observer.name} (opponent)")
+        players = [observer, opponent]
+        actor = observer if observation.actor == observer else opponent
+
+        market_goods = observation.market_goods
+        own_goods = observation.actor_goods
+        market_coins = observation.market_goods_coins
+
+        if history is not None:
+            sold = history.sold_goods
+            opponent_known = history.opponent_known
+            unseen = history.unseen_goods(observation, self.composition)
+        else:
+            sold = Goods.from_dict({
+                good: len(self.goods_coins[good]) - len(market_coins[good]) for good in _GOODS
+            })
+            opponent_known = Goods()
+            unseen = _unseen_goods(self.composition, observation, sold, opponent_known)
+
+        pool = []
+        for good_type in _GOODS:
+            pool += [good_type] * unseen[good_type]
+
+        deck_size = observation.market_reserved_goods_count
+        hidden_hand_size = len(pool) - deck_size
+        if hidden_hand_size < 0:
+            raise ValueError("Fewer unseen cards than the deck size")
+        if history is not None and hidden_hand_size != history.opponent_hand_size - opponent_known.count():
+            raise ValueError("The history does not match the observation")
+
+        coins, own_coins, opponent_coins = self._coins(observation, history)
+        own_goods_counts = own_goods._goods
+        opponent_known_counts = opponent_known._goods
+
+        states = []
+        for _ in range(count):
+            self.rng.shuffle(pool)
+            opponent_goods = Goods()
+            opponent_goods._goods.update(opponent_known_counts)
+            for good_type in pool[:hidden_hand_size]:
+                opponent_goods._goods[good_type] += 1
+            own = Goods()
+            own._goods.update(own_goods_counts)
+            goods = Goods()
+            goods._goods.update(market_goods._goods)
+
+            state = self._new_market(players, actor, observation.action)
+            state.reserved_goods = pool[hidden_hand_size:]
+            state.goods = goods
+            state.coins = _copy_coins(coins)
+            state.player_goods = {observer: own, opponent: opponent_goods}
+            state.player_coins = {observer: _copy_coins(own_coins), opponent: _copy_coins(opponent_coins)}
+            state.sold_goods = [good for good in _GOODS for _ in range(sold[good])]
+            states.append(state)
+        return states
+
+    def sample_game(self,
+                    observation: MarketObservation,
+                    history: Optional[PublicHistory] = None,
+                    opponent: Optional[Trader] = None,
+                    max_rounds: int = 500) -> Bazaar:
+        """Sample one determinization wrapped in a Bazaar, ready for simulation."""
+        state = self.sample(observation, history, 1, opponent)[0]
+        return Bazaar(state.players, state, max_rounds, self.rules)
+
+    def _new_market(self, players: list[Trader], actor: Trader, action: TraderAction) -> Market:
+        # Skip Market.__init__: there is nothing to shuffle or deal
+        rules = self.rules
+        state = Market.__new__(Market)
+        state.actor = actor
+        state.action = action
+        state.seed = self.rng.getrandbits(32)
+        state.rng = random.Random(state.seed)
+        state.players = players
+        state.camel_bonus = rules['camel_bonus']
+        state.max_goods_count = rules['max_goods_count']
+        state.max_player_goods_count = rules['max_player_goods_count']
+        state.initial_player_goods_count = rules['initial_player_goods_count']
+        return state
+
+    def _coins(self,
+               observation: MarketObservation,
+               history: Optional[PublicHistory]) -> tuple[Coins, Coins, Coins]:
+        """Rebuild the market's, the observer's and the opponent's coins."""
+        market, own, opponent = Coins(), Coins(), Coins()
+        for good in _GOODS:
+            market.goods_coins[good].extend(observation.market_goods_coins[good])
+            own.goods_coins[good].extend(observation.actor_goods_coins[good])
+            # the opponent holds every coin that is neither left nor ours
+            rest = list(self.goods_coins.get(good, ()))
+            for coin in market.goods_coins[good] + own.goods_coins[good]:
+                rest.remove(coin)
+            opponent.goods_coins[good].extend(rest)
+
+        if history is not None:
+            own_bonus, opponent_bonus = history.bonus_coins(self.bonus_coins)
+        for bonus in BonusType:
+            stack = list(self.bonus_coins.get(bonus, ()))
+            remaining = observation.market_bonus_coins_counts[bonus]
+            won = stack[remaining:]
+            market.bonus_coins[bonus].extend(stack[:remaining])
+            if history is not None:
+                own.bonus_coins[bonus].extend(own_bonus[bonus])
+                opponent.bonus_coins[bonus].extend(opponent_bonus[bonus])
+            else:
+                own_count = observation.actor_bonus_coins_counts[bonus]
+                own.bonus_coins[bonus].extend(won[len(won) - own_count:])
+                opponent.bonus_coins[bonus].extend(won[:len(won) - own_count])
+            own.bonus_coins[bonus].sort()
+            opponent.bonus_coins[bonus].sort()
+        return market, own, opponent
+
+
+def _unseen_goods(composition: Goods,
+                  observation: MarketObservation,
+                  sold: Goods,
+                  opponent_known: Goods) -> Goods:
+    """The cards of the game minus the visible, sold and known ones."""
+    market_goods = observation.market_goods
+    own_goods = observation.actor_goods
+    unseen = Goods()
+    for good_type in _GOODS:
+        count = (composition[good_type] - market_goods[good_type] - own_goods[good_type]
+                 - sold[good_type] - opponent_known[good_type])
+        if count < 0:
+            raise ValueError(f"More {good_type.name} cards are visible than the deck holds")
+        unseen._goods[good_type] = count
+    return unseen
+
+
+def _copy_coins(coins: Coins) -> Coins:
+    copy = Coins()
+    for good, stack in coins.goods_coins.items():
+        copy.goods_coins[good].extend(stack)
+    for bonus, stack in coins.bonus_coins.items():
+        copy.bonus_coins[bonus].extend(stack)
+    return copy
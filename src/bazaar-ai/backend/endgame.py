@@ -0,0 +1,436 @@
+"""
+Endgame search for Bazaar.
+
+Once few cards remain in `Market.reserved_goods`, the rest of a game is small
+enough to search (nearly) exhaustively. `EndgameSolver` runs a negamax search
+with alpha-beta pruning at decision nodes and exact expectations over the
+cards drawn to refill the market (chance nodes), with a transposition table.
+Players can keep selling and trading without ever drawing, so the search is
+bounded by a depth and a node budget; `EndgameResult.exact` tells whether the
+result is the true game value. Positions are packed into tuples of counts, so
+the search never touches Market objects.
+
+The solver needs a complete state. From a player's point of view,
+`EndgameSolver.select_action` solves several determinizations (see
+`backend.determinization`) and plays the action with the best average value.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .bazaar import BasicBazaar
+from .market import Market, MarketObservation
+from .trader import Trader, TraderAction, TraderActionType, SellAction, _action_table
+from .goods import GoodType
+from .coins import BonusType
+from .determinization import Determinizer, PublicHistory
+
+
+_GOODS = list(GoodType)
+_CAMEL = _GOODS.index(GoodType.CAMEL)
+_NON_CAMELS = [i for i in range(len(_GOODS)) if i != _CAMEL]
+_BONUSES = list(BonusType)
+_MIN_SELL = [SellAction.MIN_SELL_COUNT[gt] for gt in _GOODS]
+_NO_GOODS = (0,) * len(_GOODS)
+
+# Transposition table entries are (depth, flag, value, best move code)
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+
+class _OutOfNodes(Exception):
+    pass
+
+
+@dataclass
+class EndgameResult:
+    """
+    Outcome of an endgame search.
+
+    Attributes
+    ----------
+    action : TraderAction
+        The best action for the actor.
+    value : float
+        Expected final score difference (actor minus opponent) under optimal
+        play, counting the coins already won.
+    exact : bool
+        False if the depth limit was reached somewhere, in which case values
+        below that depth were estimated.
+    nodes : int
+        Number of positions searched.
+    depth : int
+        Depth of the deepest completed search.
+    values : dict[int, float]
+        Value of each root action, by action code.
+    """
+    action: TraderAction
+    value: float
+    exact: bool
+    nodes: int
+    depth: int
+    values: dict[int, float] = field(default_factory=dict)
+
+
+class EndgameSolver:
+    """
+    Expectiminimax search over the end of a game.
+
+    Parameters
+    ----------
+    rules : dict, optional
+        Market keyword arguments of the game (defaults to BasicBazaar's).
+    deck_threshold : int
+        `select_action` only searches when at most this many cards remain in the deck.
+    max_depth : int
+        Maximum number of moves searched. Trades can go back and forth
+        forever, so the search needs a horizon; positions beyond it are
+        scored by the coins won so far and the camel bonus.
+    node_limit : int
+        Node budget per solve. The search deepens one move at a time until
+        the result is exact, `max_depth` is reached or the budget runs out,
+        and returns the deepest completed result.
+    table_size : int
+        Number of transposition table entries kept before it is cleared.
+    tablebase : Tablebase, optional
+        Precomputed endgame values (see `backend.tablebase`), consulted at
+        every decision node before searching it.
+    """
+
+    def __init__(self,
+                 rules: Optional[dict] = None,
+                 deck_threshold: int = 2,
+                 max_depth: int = 8,
+                 node_limit: int = 50_000,
+                 table_size: int = 1_000_000,
+                 tablebase=None):
+        self.rules = rules or BasicBazaar.default_rules()
+        self.deck_threshold = deck_threshold
+        self.max_depth = max_depth
+        self.node_limit = node_limit
+        self.table_size = table_size
+        self.tablebase = tablebase
+
+        self.goods_coins = [sorted(self.rules['goods_coins'].get(gt, ())) for gt in _GOODS]
+        self.bonus_coins = [sorted(self.rules['bonus_coins'].get(bt, ())) for bt in _BONUSES]
+        self.camel_bonus = self.rules['camel_bonus']
+        self.max_hand = self.rules['max_player_goods_count']
+        self.max_market = self.rules['max_goods_count']
+
+        self.table = {}
+        self._moves = {}
+        self._nodes = 0
+        self._cut = False
+
+    def solve(self, state: Market) -> EndgameResult:
+        """
+        Search a complete state for its actor.
+
+        Parameters
+        ----------
+        state : Market
+            The position to solve (usually a determinization).
+
+        Returns
+        -------
+        EndgameResult
+            The best action and its value.
+        """
+        actor = state.actor
+        other = state.get_non_actor()
+        position = self._pack(state, actor, other)
+        points = _points(state, actor) - _points(state, other)
+
+        self._nodes = 0
+        if len(self.table) > self.table_size:
+            self.table.clear()
+
+        # Iterative deepening: shallow results fill the table and order the
+        # moves of deeper searches
+        values, exact, completed = None, False, 0
+        for depth in range(1, self.max_depth + 1):
+            self._cut = False
+            try:
+                values = {
+                    move[0]: points + self._after(position, move, depth - 1)
+                    for move in self._ordered_moves(position)
+                }
+            except _OutOfNodes:
+                break
+            completed = depth
+            exact = not self._cut
+            if exact:
+                break
+
+        if values is None:
+            raise RuntimeError("Endgame node budget too small for a single move")
+        best = max(values, key=values.get)
+        return EndgameResult(TraderAction.from_code(best, actor), values[best],
+                             exact, self._nodes, completed, values)
+
+    def select_action(self,
+                      actions: list[TraderAction],
+                      observation: MarketObservation,
+                      history: Optional[PublicHistory] = None,
+                      determinizations: int = 4,
+                      determinizer: Optional[Determinizer] = None) -> Optional[TraderAction]:
+        """
+        Pick an endgame action for a Trader, or None when the deck is still too large.
+
+        Solves `determinizations` sampled complete states and returns the
+        legal action with the best average value.
+
+        Parameters
+        ----------
+        actions : list of TraderAction
+            The legal actions, as given to `Trader.select_action`.
+        observation : MarketObservation
+            The trader's observation.
+        history : PublicHistory, optional
+            What the trader learned from earlier turns.
+        determinizations : int
+            Number of complete states to solve.
+        determinizer : Determinizer, optional
+            Sampler to use (a new one with the solver's rules by default).
+
+        Returns
+        -------
+        TraderAction or None
+            One of `actions`, or None if the deck holds more than `deck_threshold` cards.
+        """
+        if observation.market_reserved_goods_count > self.deck_threshold:
+            return None
+
+        determinizer = determinizer or Determinizer(self.rules)
+        totals = {}
+        for state in determinizer.sample(observation, history, determinizations):
+            for code, value in self.solve(state).values.items():
+                totals[code] = totals.get(code, 0.0) + value
+
+        by_code = {action.code: action for action in actions}
+        legal = [code for code in totals if code in by_code]
+        if not legal:
+            return None
+        return by_code[max(legal, key=totals.get)]
+
+    def position(self, state: Market) -> tuple:
+        """
+        The packed position of a state, from its actor's point of view.
+
+        A position is (mover hand, other hand, market, deck, goods coins left,
+        bonus coins left), each a tuple of counts. Coins already won are not
+        part of it: position values are future score differences.
+        """
+        return self._pack(state, state.actor, state.get_non_actor())
+
+    def _pack(self, state: Market, actor: Trader, other: Trader) -> tuple:
+        def counts(goods):
+            return tuple(goods[gt] for gt in _GOODS)
+
+        deck = [0] * len(_GOODS)
+        for good_type in state.reserved_goods:
+            deck[_GOODS.index(good_type)] += 1
+        return (
+            counts(state.player_goods[actor]),
+            counts(state.player_goods[other]),
+            counts(state.goods),
+            tuple(deck),
+            tuple(len(state.coins.goods_coins[gt]) for gt in _GOODS),
+            tuple(len(state.coins.bonus_coins[bt]) for bt in _BONUSES),
+        )
+
+    def _terminal(self, position: tuple) -> bool:
+        _, _, market, deck, coins, _ = position
+        if sum(1 for i in _NON_CAMELS if coins[i] == 0) >= 3:
+            return True
+        return sum(deck) == 0 and sum(market) < self.max_market
+
+    def _camel_term(self, position: tuple) -> int:
+        mover, other = position[0][_CAMEL], position[1][_CAMEL]
+        if mover > other:
+            return self.camel_bonus
+        if mover < other:
+            return -self.camel_bonus
+        return 0
+
+    def _negamax(self, position: tuple, depth: int, alpha: float, beta: float) -> float:
+        """Value of `position` for the player to move: future points difference plus camel bonus."""
+        self._nodes += 1
+        if self._nodes > self.node_limit:
+            raise _OutOfNodes
+        if self._terminal(position):
+            return self._camel_term(position)
+        if depth <= 0:
+            self._cut = True
+            return self._camel_term(position)
+
+        if self.tablebase is not None:
+            stored = self.tablebase.get(position)
+            if stored is not None and (stored.exact or stored.depth >= depth):
+                if not stored.exact:
+                    self._cut = True
+                return stored.value
+
+        entry = self.table.get(position)
+        best_code = None
+        if entry is not None:
+            best_code = entry[3]
+        if entry is not None and entry[0] >= depth:
+            _, flag, value, _ = entry
+            if flag == _EXACT:
+                return value
+            if flag == _LOWER:
+                alpha = max(alpha, value)
+            elif flag == _UPPER:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        moves = self._ordered_moves(position)
+        if best_code is not None:
+            # try the best move of an earlier search first
+            moves = sorted(moves, key=lambda move: move[0] != best_code)
+
+        original_alpha = alpha
+        best = -math.inf
+        for move in moves:
+            value = self._after(position, move, depth - 1, alpha, beta)
+            if value > best:
+                best = value
+                best_code = move[0]
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            flag = _UPPER
+        elif best >= beta:
+            flag = _LOWER
+        else:
+            flag = _EXACT
+        self.table[position] = (depth, flag, best, best_code)
+        return best
+
+    def _after(self, position: tuple, move: tuple, depth: int,
+               alpha: float = -math.inf, beta: float = math.inf) -> float:
+        """Value for the mover of playing `move`: its gain minus the opponent's value after it."""
+        code, hand_delta, market_delta, sell_good, sell_count = move
+        hand, other, market, deck, coins, bonus = position
+
+        gain = 0
+        if sell_good >= 0:
+            left = coins[sell_good]
+            kept = max(0, left - sell_count)
+            gain += sum(self.goods_coins[sell_good][kept:left])
+            coins = coins[:sell_good] + (kept,) + coins[sell_good + 1:]
+            if sell_count in BonusType._value2member_map_:
+                b = _BONUSES.index(BonusType(sell_count))
+                if bonus[b]:
+                    gain += self.bonus_coins[b][bonus[b] - 1]
+                    bonus = bonus[:b] + (bonus[b] - 1,) + bonus[b + 1:]
+
+        hand = tuple(h + d for h, d in zip(hand, hand_delta))
+        market = tuple(m + d for m, d in zip(market, market_delta))
+
+        # the opponent moves next
+        if sum(market) < self.max_market and sum(deck):
+            return gain - self._chance(other, hand, market, deck, coins, bonus, depth)
+        child = (other, hand, market, deck, coins, bonus)
+        return gain - self._negamax(child, depth, gain - beta, gain - alpha)
+
+    def _chance(self, mover, other, market, deck, coins, bonus, depth) -> float:
+        """Expected value for `mover` over the cards drawn to refill the market."""
+        if sum(market) >= self.max_market or not sum(deck):
+            return self._negamax((mover, other, market, deck, coins, bonus), depth, -math.inf, math.inf)
+
+        total = sum(deck)
+        expected = 0.0
+        for i, count in enumerate(deck):
+            if count:
+                drawn_deck = deck[:i] + (count - 1,) + deck[i + 1:]
+                drawn_market = market[:i] + (market[i] + 1,) + market[i + 1:]
+                expected += count / total * self._chance(
+                    mover, other, drawn_market, drawn_deck, coins, bonus, depth)
+        return expected
+
+    def _ordered_moves(self, position: tuple) -> list[tuple]:
+        """Legal moves of the player to move: sells (biggest first), then takes, then trades."""
+        hand, _, market = position[0], position[1], position[2]
+        key = (hand, market)
+        moves = self._moves.get(key)
+        if moves is None:
+            if len(self._moves) > self.table_size:
+                self._moves.clear()
+            moves = self._moves[key] = self._generate_moves(hand, market)
+        return moves
+
+    def _generate_moves(self, hand: tuple, market: tuple) -> list[tuple]:
+        # Mirrors SellAction/TakeAction/TradeAction.all_actions
+        if sum(market) < 5:
+            return []
+        codes = _action_table()[1]
+        hand_room = self.max_hand - (sum(hand) - hand[_CAMEL])
+
+        def move(action_type, requested, offered, sell_good=-1, sell_count=0):
+            code = codes[(action_type, requested, offered)]
+            hand_delta = tuple(r - o for r, o in zip(requested, offered))
+            market_delta = (tuple(-r for r in requested) if action_type == TraderActionType.SELL
+                            else tuple(o - r for r, o in zip(requested, offered)))
+            return (code, hand_delta, market_delta, sell_good, sell_count)
+
+        def single(i, count):
+            counts = [0] * len(_GOODS)
+            counts[i] = count
+            return tuple(counts)
+
+        sells = []
+        for i in _NON_CAMELS:
+            for count in range(_MIN_SELL[i], hand[i] + 1):
+                sells.append(move(TraderActionType.SELL, _NO_GOODS, single(i, count), i, count))
+        sells.reverse()
+
+        takes = []
+        if market[_CAMEL]:
+            takes.append(move(TraderActionType.TAKE, single(_CAMEL, market[_CAMEL]), _NO_GOODS))
+        if hand_room > 0:
+            for i in _NON_CAMELS:
+                if market[i]:
+                    takes.append(move(TraderActionType.TAKE, single(i, 1), _NO_GOODS))
+
+        trades = []
+        for requested in _bounded_vectors(market, _NON_CAMELS, min(hand_room, 5)):
+            size = sum(requested)
+            if size < 2:
+                continue
+            allowed = [i for i in range(len(_GOODS)) if not requested[i]]
+            for offered in _bounded_vectors(hand, allowed, size, exact=True):
+                trades.append(move(TraderActionType.TRADE, requested, offered))
+
+        return sells + takes + trades
+
+
+def _bounded_vectors(limits: tuple, indices: list[int], max_total: int, exact: bool = False):
+    """Count vectors v with v[i] <= limits[i] on `indices` (0 elsewhere) and sum <= max_total."""
+    vector = [0] * len(limits)
+
+    def rec(k, remaining):
+        if k == len(indices):
+            if not exact or remaining == 0:
+                yield tuple(vector)
+            return
+        i = indices[k]
+        for count in range(min(limits[i], remaining) + 1):
+            vector[i] = count
+            yield from rec(k + 1, remaining - count)
+        vector[i] = 0
+
+    yield from rec(0, max_total)
+
+
+def _points(state: Market, player: Trader) -> int:
+    coins = state.player_coins[player]
+    return (sum(sum(stack) for stack in coins.goods_coins.values())
+            + sum(sum(stack) for stack in coins.bonus_coins.values()))
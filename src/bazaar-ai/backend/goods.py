@@ -64,3 +64,19 @@ class Goods:
         for good_type in GoodType:
             goods._goods[good_type] = dct.get(good_type, 0)
         return goods
+
+
+class FrozenGoods(Goods):
+    """
+    A read-only view of another Goods: it shares its counts without copying
+    them, so it reflects later changes to the original.
+    """
+
+    def __init__(self, goods: Goods):
+        self._goods = goods._goods
+
+    def add(self, good_type):
+        raise TypeError("These goods are read-only")
+
+    def remove(self, good_type):
+        raise TypeError("These goods are read-only")
@@ -3,13 +3,15 @@ from typing import TYPE_CHECKING
 
 from arelai.game import State, Observation
 
-from .goods import GoodType, Goods
+from .goods import GoodType, Goods, FrozenGoods
 from .coins import BonusType, Coins
 
 if TYPE_CHECKING:
     from .trader import Trader, TraderAction
 
 import random
+import struct
+from types import MappingProxyType
 from uuid import UUID
 
 
@@ -37,6 +39,7 @@ class Market(State):
             action=action)
 
         # use this for random operations
+        self.seed = seed
         self.rng = random.Random(seed)
 
         self.players = players
@@ -46,48 +49,205 @@ class Market(State):
 
         self.coins = Coins()
         for good_type in goods_coins.keys():
-            for coin in goods_coins[good_type]:
-                self.coins.add_goods_coin(good_type, coin)
+            self.coins.goods_coins[good_type] = sorted(coin for coin in goods_coins[good_type] if coin)
         for bonus_type in bonus_coins.keys():
-            for coin in bonus_coins[bonus_type]:
-                self.coins.add_bonus_coin(bonus_type, coin)
-
-        self.player_goods = {}
-        self.player_coins = {}
-        
-        for player in self.players:
-            self.player_coins[player] = Coins()
-            self.player_goods[player] = Goods()
+            self.coins.bonus_coins[bonus_type] = sorted(coin for coin in bonus_coins[bonus_type] if coin)
 
         self.max_player_goods_count = max_player_goods_count
         self.initial_player_goods_count = initial_player_goods_count
-        
-        # give each player some goods
-        for _ in range(initial_player_goods_count):
-            for player in self.players:
-                good_type = self.reserved_goods.pop()
-                self.player_goods[player].add(good_type)
-
         self.max_goods_count = max_goods_count
-        self.goods = Goods()
-        
-        # Place exactly 3 camels in the initial market
+        self.camel_bonus = camel_bonus
+
+        self.deal()
+
+    def deal(self):
+        """
+        Deal the hands and the initial market from the shuffled `reserved_goods`.
+
+        Each player gets `initial_player_goods_count` cards, dealt in turns
+        from the end of the deck; the 3 camels closest to the end of what is
+        left go to the market, which is then refilled.
+        """
+        players = self.players
+        self.player_coins = {player: Coins() for player in players}
+
+        # give each player some goods, dealt in turns from the end of the deck
+        deck = self.reserved_goods
+        start = max(0, len(deck) - self.initial_player_goods_count * len(players))
+        dealt = deck[start:]
+        del deck[start:]
+        dealt.reverse()
+        self.player_goods = {
+            player: _goods_from_cards(dealt[i::len(players)]) for i, player in enumerate(players)
+        }
+
+        # Place exactly 3 camels in the initial market: find the 3rd camel
+        # from the end, then drop the camels after it in one pass
         camels_to_place = 3
-        i = len(self.reserved_goods) - 1
-        while camels_to_place > 0 and i >= 0:
-            if self.reserved_goods[i] == GoodType.CAMEL:
-                self.goods.add(self.reserved_goods.pop(i))
+        cut = len(deck)
+        while camels_to_place > 0 and cut > 0:
+            cut -= 1
+            if deck[cut] == GoodType.CAMEL:
                 camels_to_place -= 1
-            i -= 1
-        
+        tail = deck[cut:]
+        del deck[cut:]
+        deck.extend(good_type for good_type in tail if good_type != GoodType.CAMEL)
+        market = [GoodType.CAMEL] * (len(tail) - (len(deck) - cut))
+
         # Fill the rest of the market
-        self.refill_market()
+        start = max(0, len(deck) - max(0, self.max_goods_count - len(market)))
+        market += deck[start:]
+        del deck[start:]
+        self.goods = _goods_from_cards(market)
 
         self.sold_goods = []
 
-        self.camel_bonus = camel_bonus
-        self.max_goods_count = max_goods_count
-    
+    # Binary layout (little-endian): a header, the deck and the sold goods as
+    # one byte per card, the market's goods counts and coins, then each
+    # player's goods counts and coins. Coin stacks are a length byte followed
+    # by up to MAX_STACK_SIZE coin values. The RNG state may follow.
+
+    MAX_CARDS = 64
+    MAX_STACK_SIZE = 11
+
+    def to_bytes(self, include_rng: bool = False) -> bytes:
+        """
+        Serialize the state into a fixed-size binary layout.
+
+        Players are stored by seat index, so the state must be rebuilt with
+        the same player list (see `from_bytes`). A state takes
+        `Market.packed_size()` bytes, plus 2509 with the RNG state.
+
+        Parameters
+        ----------
+        include_rng : bool
+            Also store the full state of `rng`.
+
+        Returns
+        -------
+        bytes
+            The packed state.
+
+        Raises
+        ------
+        ValueError
+            If the state does not fit the layout (not two players, a
+            non-canonical action, more than MAX_CARDS cards or more than
+            MAX_STACK_SIZE coins in a stack).
+        """
+        players = self.players
+        if len(players) != 2:
+            raise ValueError("Only two-player Markets can be packed")
+        if len(self.reserved_goods) > self.MAX_CARDS or len(self.sold_goods) > self.MAX_CARDS:
+            raise ValueError(f"More than {self.MAX_CARDS} cards in the deck or sold")
+
+        flags = 0
+        seed = 0
+        if isinstance(self.seed, int) and -(1 << 63) <= self.seed < (1 << 63):
+            flags |= _HAS_SEED
+            seed = self.seed
+        if include_rng:
+            flags |= _HAS_RNG
+
+        action_seat, action_code = 0, _NO_ACTION
+        if self.action is not None:
+            action_seat, action_code = players.index(self.action.actor), self.action.code
+
+        out = bytearray(_PACKED_HEADER.pack(
+            _PACKED_VERSION, flags,
+            players.index(self.actor), action_seat, action_code,
+            self.camel_bonus, self.max_goods_count,
+            self.max_player_goods_count, self.initial_player_goods_count,
+            len(self.reserved_goods), len(self.sold_goods), seed))
+        # list.index compares by identity, which is cheaper than hashing enums
+        out += bytes(map(_GOOD_ORDER.index, self.reserved_goods)).ljust(self.MAX_CARDS, b'\0')
+        out += bytes(map(_GOOD_ORDER.index, self.sold_goods)).ljust(self.MAX_CARDS, b'\0')
+
+        counts = self.goods._goods
+        out += bytes(counts[good_type] for good_type in _GOOD_ORDER)
+        _pack_coins(out, self.coins)
+        for player in players:
+            counts = self.player_goods[player]._goods
+            out += bytes(counts[good_type] for good_type in _GOOD_ORDER)
+            _pack_coins(out, self.player_coins[player])
+
+        if include_rng:
+            version, internal, gauss = self.rng.getstate()
+            out += _RNG_STATE.pack(*internal, gauss is not None, gauss or 0.0)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, players: list[Trader]) -> 'Market':
+        """
+        Rebuild a state packed with `to_bytes`.
+
+        Parameters
+        ----------
+        data : bytes-like
+            The packed state.
+        players : list of Trader
+            The players, in the same seat order as when packing.
+
+        Returns
+        -------
+        Market
+            An independent state. Without a packed RNG state, `rng` is
+            freshly seeded from `seed`; a seed that was not a 64-bit integer
+            is lost (None).
+
+        Raises
+        ------
+        ValueError
+            If `data` is not a packed Market.
+        """
+        from .trader import TraderAction
+
+        data = memoryview(data)
+        if len(data) < _PACKED_SIZE or data[0] != _PACKED_VERSION:
+            raise ValueError("Not a packed Market")
+        (_, flags, actor_seat, action_seat, action_code,
+         camel_bonus, max_goods_count, max_player_goods_count, initial_player_goods_count,
+         deck_size, sold_size, seed) = _PACKED_HEADER.unpack_from(data, 0)
+
+        state = cls.__new__(cls)
+        state.players = players
+        state.actor = players[actor_seat]
+        state.action = None
+        if action_code != _NO_ACTION:
+            state.action = TraderAction.from_code(action_code, players[action_seat])
+        state.seed = seed if flags & _HAS_SEED else None
+        state.camel_bonus = camel_bonus
+        state.max_goods_count = max_goods_count
+        state.max_player_goods_count = max_player_goods_count
+        state.initial_player_goods_count = initial_player_goods_count
+
+        pos = _PACKED_HEADER.size
+        state.reserved_goods = [_GOOD_ORDER[i] for i in data[pos:pos + deck_size]]
+        pos += cls.MAX_CARDS
+        state.sold_goods = [_GOOD_ORDER[i] for i in data[pos:pos + sold_size]]
+        pos += cls.MAX_CARDS
+
+        state.goods = _unpack_goods(data, pos)
+        state.coins = _unpack_coins(data, pos + len(_GOOD_ORDER))
+        pos += _PACKED_SIDE
+        state.player_goods = {}
+        state.player_coins = {}
+        for player in players:
+            state.player_goods[player] = _unpack_goods(data, pos)
+            state.player_coins[player] = _unpack_coins(data, pos + len(_GOOD_ORDER))
+            pos += _PACKED_SIDE
+
+        state.rng = random.Random(state.seed)
+        if flags & _HAS_RNG:
+            *internal, has_gauss, gauss = _RNG_STATE.unpack_from(data, pos)
+            state.rng.setstate((3, tuple(internal), gauss if has_gauss else None))
+        return state
+
+    @classmethod
+    def packed_size(cls, include_rng: bool = False) -> int:
+        """Size in bytes of a state packed by `to_bytes`."""
+        return _PACKED_SIZE + (_RNG_STATE.size if include_rng else 0)
+
     def refill_market(self):
         while self.goods.count() < self.max_goods_count and self.reserved_goods:
             good_type = self.reserved_goods.pop()
@@ -98,7 +258,166 @@ class Market(State):
         return non_actor
 
 
+_NO_GOODS = Goods()._goods
+
+# the key order of fresh Goods and Coins, which unpacked ones keep
+_GOOD_ORDER = list(_NO_GOODS)
+_BONUS_ORDER = list(Coins().bonus_coins)
+
+_PACKED_VERSION = 1
+_HAS_SEED, _HAS_RNG = 1, 2
+_NO_ACTION = 0xFFFF
+# version, flags, actor seat, action seat, action code, camel bonus, max
+# market goods, max hand size, initial hand size, deck size, sold count, seed
+_PACKED_HEADER = struct.Struct('<BBBBHBBBBBBq')
+_PACKED_STACK = 1 + Market.MAX_STACK_SIZE
+# goods counts and coin stacks of the market or of one player
+_PACKED_SIDE = len(_GOOD_ORDER) + _PACKED_STACK * (len(_GOOD_ORDER) + len(_BONUS_ORDER))
+_PACKED_SIZE = _PACKED_HEADER.size + 2 * Market.MAX_CARDS + 3 * _PACKED_SIDE
+_RNG_STATE = struct.Struct('<625I?d')
+
+
+def _pack_coins(out: bytearray, coins: Coins):
+    for stacks, order in ((coins.goods_coins, _GOOD_ORDER), (coins.bonus_coins, _BONUS_ORDER)):
+        for key in order:
+            stack = stacks[key]
+            if len(stack) > Market.MAX_STACK_SIZE:
+                raise ValueError(f"More than {Market.MAX_STACK_SIZE} coins in a stack")
+            out += bytes((len(stack), *stack)).ljust(_PACKED_STACK, b'\0')
+
+
+def _unpack_coins(data: memoryview, pos: int) -> Coins:
+    stacks = []
+    for _ in range(len(_GOOD_ORDER) + len(_BONUS_ORDER)):
+        stacks.append(list(data[pos + 1:pos + 1 + data[pos]]))
+        pos += _PACKED_STACK
+    coins = Coins.__new__(Coins)
+    coins._goods_coins = dict(zip(_GOOD_ORDER, stacks))
+    coins._bonus_coins = dict(zip(_BONUS_ORDER, stacks[len(_GOOD_ORDER):]))
+    return coins
+
+
+def _unpack_goods(data: memoryview, pos: int) -> Goods:
+    goods = Goods.__new__(Goods)
+    goods._goods = dict(zip(_GOOD_ORDER, data[pos:pos + len(_GOOD_ORDER)]))
+    return goods
+
+
+def _goods_from_cards(cards: list[GoodType]) -> Goods:
+    # copying a dict reuses its keys' hashes, which are slow to compute for enums
+    goods = Goods.__new__(Goods)
+    counts = goods._goods = _NO_GOODS.copy()
+    for good_type in counts:
+        count = cards.count(good_type)
+        if count:
+            counts[good_type] = count
+    return goods
+
+
+class MarketFactory:
+    """
+    Create many Markets with the same rules.
+
+    The rules are checked and preprocessed once (deck composition, sorted
+    coin stacks, limits), so that each `create` or `reset` only shuffles the
+    deck and deals. For a given seed the result is identical to
+    `Market(seed, players, actor, None, **rules)`.
+
+    Parameters
+    ----------
+    rules : dict
+        Market keyword arguments: reserved_goods, goods_coins, bonus_coins,
+        camel_bonus, max_goods_count, max_player_goods_count and
+        initial_player_goods_count (see `BasicBazaar.default_rules`).
+    """
+
+    def __init__(self, rules: dict):
+        self.rules = rules
+        self.reserved_goods = tuple(rules['reserved_goods'])
+        self.goods_coins = {
+            good_type: tuple(sorted(coin for coin in coins if coin))
+            for good_type, coins in rules['goods_coins'].items()
+        }
+        self.bonus_coins = {
+            bonus_type: tuple(sorted(coin for coin in coins if coin))
+            for bonus_type, coins in rules['bonus_coins'].items()
+        }
+        self.camel_bonus = rules['camel_bonus']
+        self.max_goods_count = rules['max_goods_count']
+        self.max_player_goods_count = rules['max_player_goods_count']
+        self.initial_player_goods_count = rules['initial_player_goods_count']
+
+    def create(self, seed, players: list[Trader], actor: Trader = None) -> Market:
+        """
+        Create the initial Market of a game.
+
+        Parameters
+        ----------
+        seed : int
+            Seed of the deck shuffle.
+        players : list of Trader
+            The players, in seat order.
+        actor : Trader, optional
+            The first player to act (defaults to `players[0]`).
+
+        Returns
+        -------
+        Market
+            A new initial state.
+        """
+        state = Market.__new__(Market)
+        state.players = players
+        self.reset(state, seed, actor)
+        return state
+
+    def reset(self, state: Market, seed, actor: Trader = None):
+        """
+        Turn an existing Market back into the initial state of a new game, in place.
+
+        Parameters
+        ----------
+        state : Market
+            The Market to reset; keeps its players.
+        seed : int
+            Seed of the deck shuffle.
+        actor : Trader, optional
+            The first player to act (defaults to `state.players[0]`).
+        """
+        state.actor = actor if actor is not None else state.players[0]
+        state.action = None
+        state.seed = seed
+        state.rng = random.Random(seed)
+
+        state.reserved_goods = list(self.reserved_goods)
+        state.rng.shuffle(state.reserved_goods)
+
+        state.coins = Coins()
+        for good_type, coins in self.goods_coins.items():
+            state.coins.goods_coins[good_type] = list(coins)
+        for bonus_type, coins in self.bonus_coins.items():
+            state.coins.bonus_coins[bonus_type] = list(coins)
+
+        state.camel_bonus = self.camel_bonus
+        state.max_goods_count = self.max_goods_count
+        state.max_player_goods_count = self.max_player_goods_count
+        state.initial_player_goods_count = self.initial_player_goods_count
+        state.deal()
+
+
 class MarketObservation(Observation):
+    """
+    What one trader can see of a Market.
+
+    Observations made by `Bazaar.observe` (see `from_state`) are read-only
+    views: goods are FrozenGoods sharing the state's counts, coin stacks are
+    read-only mappings of tuples, and bonus coin counts are read-only
+    mappings. The coin fields and `actor_non_camel_goods_count` are only
+    computed when first read. A view assumes the observed state is not
+    modified afterwards, which holds for every state produced by
+    `Bazaar.apply_action`; it can then be shared without copying, and
+    `clone` returns it as is.
+    """
+
     def __init__(self,
             observer_id: UUID,
             actor_id: UUID,
@@ -124,8 +443,94 @@ class MarketObservation(Observation):
         self.market_reserved_goods_count = market_reserved_goods_count
         self.max_player_goods_count = max_player_goods_count
         self.max_market_goods_count = max_market_goods_count
+        self._player_coins = None
+        self._market_coins = None
 
         self.actor_non_camel_goods_count = self.actor_goods.count(include_camels=False)
 
         super().__init__(observer_id)
-    
+
+    @classmethod
+    def from_state(cls, state: Market, observer: Trader) -> 'MarketObservation':
+        """
+        Make a read-only view of what `observer` can see of `state`.
+
+        Parameters
+        ----------
+        state : Market
+            The observed state; it must not be modified while the view is in use.
+        observer : Trader
+            The observing trader.
+
+        Returns
+        -------
+        MarketObservation
+            The view.
+        """
+        observation = cls.__new__(cls)
+        observation.observer = observer
+        observation.actor = state.actor
+        observation.action = state.action
+        observation.actor_goods = FrozenGoods(state.player_goods[observer])
+        observation.market_goods = FrozenGoods(state.goods)
+        observation.market_reserved_goods_count = len(state.reserved_goods)
+        observation.max_player_goods_count = state.max_player_goods_count
+        observation.max_market_goods_count = state.max_goods_count
+        # only the coins are kept, never the state: it holds hidden cards
+        observation._player_coins = state.player_coins[observer]
+        observation._market_coins = state.coins
+        return observation
+
+    def __getattr__(self, name):
+        # Only called for fields of a view that have not been read yet
+        compute = _VIEW_FIELDS.get(name)
+        if compute is None:
+            raise AttributeError(name)
+        value = compute(self)
+        setattr(self, name, value)
+        return value
+
+    def clone(self) -> 'MarketObservation':
+        """A copy that is safe to modify, or the observation itself if it is a read-only view."""
+        if self._player_coins is not None:
+            return self
+        return super().clone()
+
+    def __reduce__(self):
+        # Pickled and deep-copied as a plain, independent observation
+        actor_goods = Goods()
+        actor_goods._goods.update(self.actor_goods._goods)
+        market_goods = Goods()
+        market_goods._goods.update(self.market_goods._goods)
+        return (MarketObservation, (
+            self.observer,
+            self.actor,
+            self.action,
+            actor_goods,
+            {good: list(coins) for good, coins in self.actor_goods_coins.items()},
+            dict(self.actor_bonus_coins_counts),
+            market_goods,
+            {good: list(coins) for good, coins in self.market_goods_coins.items()},
+            dict(self.market_bonus_coins_counts),
+            self.market_reserved_goods_count,
+            self.max_player_goods_count,
+            self.max_market_goods_count,
+        ))
+
+
+def _bonus_counts(coins: Coins) -> MappingProxyType:
+    return MappingProxyType({bonus: len(coins.bonus_coins[bonus]) for bonus in BonusType})
+
+
+def _frozen_stacks(stacks: dict[GoodType, list[int]]) -> MappingProxyType:
+    """Read-only copy of coin stacks: a mapping of tuples."""
+    return MappingProxyType({good: tuple(stack) for good, stack in stacks.items()})
+
+
+_VIEW_FIELDS = {
+    'actor_goods_coins': lambda o: _frozen_stacks(o._player_coins.goods_coins),
+    'actor_bonus_coins_counts': lambda o: _bonus_counts(o._player_coins),
+    'market_goods_coins': lambda o: _frozen_stacks(o._market_coins.goods_coins),
+    'market_bonus_coins_counts': lambda o: _bonus_counts(o._market_coins),
+    'actor_non_camel_goods_count': lambda o: o.actor_goods.count(include_camels=False),
+}
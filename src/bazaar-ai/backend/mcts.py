@@ -0,0 +1,429 @@
+"""
+Single-observer information-set Monte Carlo tree search (SO-ISMCTS).
+
+Every iteration samples a determinization of the searching player's
+information set (see `backend.determinization`), walks a single tree shared
+by all determinizations, restricted to the actions legal in the sampled
+world, and finishes the game with a fast random rollout. Tree nodes are keyed
+by canonical action codes, so the same move in different worlds shares
+statistics.
+
+With `workers > 1` the search is root-parallel: each worker process grows
+its own tree from the same observation with different determinizations,
+and the root visit counts are summed before choosing the action.
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from .bazaar import Bazaar
+from .market import Market, MarketObservation
+from .trader import Trader, TraderAction, SellAction, TakeAction, MAX_MARKET_GOODS
+from .goods import GoodType
+from .determinization import Determinizer, PublicHistory
+
+
+_GOODS = list(GoodType)
+
+# Legal action codes depend only on the actor's hand and the market; the
+# memos are cleared when they grow past this many positions.
+_MEMO_LIMIT = 200_000
+
+
+def _position_key(state: Market) -> tuple:
+    goods = state.player_goods[state.actor]._goods
+    market = state.goods._goods
+    return tuple(goods[gt] for gt in _GOODS) + tuple(market[gt] for gt in _GOODS)
+
+
+@dataclass
+class SearchResult:
+    """
+    Outcome of one search.
+
+    Attributes
+    ----------
+    action : TraderAction
+        The most visited legal action at the root.
+    iterations : int
+        Number of iterations run.
+    elapsed : float
+        Wall-clock time of the search, in seconds.
+    visits : dict[int, int]
+        Root visit counts by action code.
+    values : dict[int, float]
+        Mean root reward (for the searching player) by action code.
+    trees : int
+        Number of independent trees searched (one per worker).
+    """
+    action: TraderAction
+    iterations: int
+    elapsed: float
+    visits: dict[int, int] = field(default_factory=dict)
+    values: dict[int, float] = field(default_factory=dict)
+    trees: int = 1
+
+    @property
+    def iterations_per_second(self) -> float:
+        return self.iterations / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class _Node:
+    __slots__ = ('children', 'visits', 'reward', 'availability', 'by_observer')
+
+    def __init__(self, by_observer: bool):
+        self.children = {}
+        self.visits = 0
+        self.reward = 0.0
+        self.availability = 1
+        # whether the move leading to this node was made by the searching player
+        self.by_observer = by_observer
+
+
+class ISMCTS:
+    """
+    SO-ISMCTS search for Bazaar.
+
+    Parameters
+    ----------
+    iterations : int, optional
+        Maximum number of iterations per search.
+    time_limit : float, optional
+        Maximum time per search, in seconds. The search stops at whichever
+        of `iterations` and `time_limit` comes first; both apply to each tree
+        when searching in parallel. With neither, every `search` must be
+        given a time limit (e.g. by a `MoveBudget`).
+    exploration : float
+        UCB exploration constant.
+    rollout_limit : int
+        Maximum number of rollout moves; unfinished games are scored as if
+        they ended there.
+    rollout_trades : bool
+        Whether rollouts draw uniformly from all legal actions (trades
+        included, sampled with `Bazaar.random_action`) rather than from the
+        sells and takes only.
+    batch_size : int
+        Number of determinizations sampled at a time.
+    rules : dict, optional
+        Market keyword arguments of the game (defaults to BasicBazaar's).
+    seed : optional
+        Seed of the search's random number generators.
+    workers : int
+        Number of processes searching independent trees. With 1, the search
+        runs in the calling process.
+
+    Notes
+    -----
+    Deep copies of a search are the search itself. The memos of legal and
+    rollout actions (up to `_MEMO_LIMIT` entries each) and the worker pool
+    are therefore never copied when `Market.clone` copies the agent that
+    owns the search, and every copy of the agent keeps them warm.
+    """
+
+    def __init__(self,
+                 iterations: Optional[int] = None,
+                 time_limit: Optional[float] = 1.0,
+                 exploration: float = 0.7,
+                 rollout_limit: int = 200,
+                 rollout_trades: bool = False,
+                 batch_size: int = 64,
+                 rules: Optional[dict] = None,
+                 seed=None,
+                 workers: int = 1):
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_limit = rollout_limit
+        self.rollout_trades = rollout_trades
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.determinizer = Determinizer(rules, seed=self.rng.getrandbits(32))
+        self._legal_codes = {}
+        self._rollout_codes = {}
+        self._actions = {}
+
+        self.workers = workers
+        self._config = {
+            'iterations': iterations, 'time_limit': time_limit, 'exploration': exploration,
+            'rollout_limit': rollout_limit, 'rollout_trades': rollout_trades, 'batch_size': batch_size, 'rules': rules
+        }
+        self._executor = None
+
+    def search(self,
+               actions: list[TraderAction],
+               observation: MarketObservation,
+               history: Optional[PublicHistory] = None,
+               time_limit: Optional[float] = None,
+               progress: Optional[Callable[[TraderAction], None]] = None) -> SearchResult:
+        """
+        Search from the observer's information set and pick an action.
+
+        Parameters
+        ----------
+        actions : list of TraderAction
+            The legal actions, as given to `Trader.select_action`.
+        observation : MarketObservation
+            The searching player's observation.
+        history : PublicHistory, optional
+            What the searching player learned from earlier turns.
+        time_limit : float, optional
+            Time limit of this search, in seconds, instead of `self.time_limit`
+            (e.g. the time allotted by a `MoveBudget`).
+        progress : callable, optional
+            Called with the most visited action after every batch of
+            iterations, e.g. `MoveBudget.offer` (single-process search only).
+
+        Returns
+        -------
+        SearchResult
+            The chosen action and search statistics.
+
+        Raises
+        ------
+        ValueError
+            If the search has neither an iteration nor a time limit.
+        """
+        if time_limit is None:
+            time_limit = self.time_limit
+        if self.iterations is None and (time_limit is None or math.isinf(time_limit)):
+            raise ValueError("ISMCTS needs an iteration or a time budget")
+        if self.workers > 1:
+            return self._search_parallel(actions, observation, history, time_limit)
+
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else math.inf
+        observer = observation.observer
+        by_code = {action.code: action for action in actions}
+
+        root = _Node(by_observer=False)
+        worlds = []
+        iterations = 0
+        while True:
+            if not worlds:
+                if progress is not None and iterations:
+                    progress(by_code[_most_visited(root, by_code)])
+                worlds = self.determinizer.sample(observation, history, self.batch_size)
+            state = worlds.pop()
+            game = Bazaar(state.players, state, max_rounds=math.inf, rules=self.determinizer.rules)
+            self._iterate(root, game, state, observer)
+            iterations += 1
+
+            if self.iterations is not None and iterations >= self.iterations:
+                break
+            if time.perf_counter() >= deadline:
+                break
+
+        visits = {code: child.visits for code, child in root.children.items() if code in by_code}
+        values = {code: root.children[code].reward / root.children[code].visits for code in visits}
+        best = max(visits, key=lambda code: (visits[code], values[code]))
+        return SearchResult(by_code[best], iterations, time.perf_counter() - start, visits, values)
+
+    def _search_parallel(self,
+                         actions: list[TraderAction],
+                         observation: MarketObservation,
+                         history: Optional[PublicHistory],
+                         time_limit: Optional[float]) -> SearchResult:
+        start = time.perf_counter()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self._config,))
+
+        codes = [action.code for action in actions]
+        observation, history = _detach(observation, history)
+        futures = [
+            self._executor.submit(_search_tree, self.rng.getrandbits(32), codes, observation, history, time_limit)
+            for _ in range(self.workers)
+        ]
+
+        iterations = 0
+        visits = {}
+        rewards = {}
+        for future in futures:
+            tree_iterations, tree_visits, tree_values = future.result()
+            iterations += tree_iterations
+            for code, count in tree_visits.items():
+                visits[code] = visits.get(code, 0) + count
+                rewards[code] = rewards.get(code, 0.0) + tree_values[code] * count
+
+        values = {code: rewards[code] / visits[code] for code in visits}
+        best = max(visits, key=lambda code: (visits[code], values[code]))
+        by_code = {action.code: action for action in actions}
+        return SearchResult(by_code[best], iterations, time.perf_counter() - start,
+                            visits, values, trees=len(futures))
+
+    def __deepcopy__(self, memo):
+        # Markets deep-copy their players, agents included, on every move.
+        # A search is shared by all copies of its agent instead: its worker
+        # pool cannot be copied, and its memos would be copied every move.
+        return self
+
+    def close(self):
+        """Shut down the worker processes, if any."""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def legal_codes(self, game: Bazaar, state: Market) -> tuple[int, ...]:
+        """Codes of the actions legal for the actor of `state` (memoized)."""
+        key = _position_key(state)
+        codes = self._legal_codes.get(key)
+        if codes is None:
+            if len(self._legal_codes) >= _MEMO_LIMIT:
+                self._legal_codes.clear()
+            codes = tuple(action.code for action in game.all_actions(state.actor, state))
+            self._legal_codes[key] = codes
+        return codes
+
+    def rollout_codes(self, game: Bazaar, state: Market) -> tuple[int, ...]:
+        """Codes of the sells and takes legal for the actor of `state` (memoized)."""
+        key = _position_key(state)
+        codes = self._rollout_codes.get(key)
+        if codes is None:
+            if len(self._rollout_codes) >= _MEMO_LIMIT:
+                self._rollout_codes.clear()
+            # A sell or take is always available when any action is
+            observation = game.observe(state.actor, state)
+            actions = SellAction.all_actions(observation) + TakeAction.all_actions(observation)
+            codes = tuple(action.code for action in actions)
+            self._rollout_codes[key] = codes
+        return codes
+
+    def _action(self, code: int, actor: Trader) -> TraderAction:
+        # Actions are never modified once built, so one instance per code and actor is enough
+        action = self._actions.get((code, actor.name))
+        if action is None:
+            action = self._actions[code, actor.name] = TraderAction.from_code(code, actor)
+        return action
+
+    def _terminal(self, game: Bazaar, state: Market) -> bool:
+        # Bazaar.terminal, without enumerating the legal actions
+        empty_stacks = sum(1 for good_type in _GOODS
+                           if good_type != GoodType.CAMEL and not state.coins.goods_coins[good_type])
+        if empty_stacks >= 3:
+            return True
+        # Some sell or take is always legal while the market is full, and no
+        # action is legal otherwise, so this matches "no legal actions"
+        return not state.reserved_goods and state.goods.count() < MAX_MARKET_GOODS
+
+    def _iterate(self, root: _Node, game: Bazaar, state: Market, observer: Trader):
+        path = [root]
+        node = root
+
+        # selection and expansion, in the actions available in this world
+        while not self._terminal(game, state):
+            actor = state.actor
+            codes = self.legal_codes(game, state)
+            untried = []
+            for code in codes:
+                child = node.children.get(code)
+                if child is None:
+                    untried.append(code)
+                else:
+                    child.availability += 1
+
+            if untried:
+                code = self.rng.choice(untried)
+                child = _Node(by_observer=actor == observer)
+                node.children[code] = child
+                node = child
+                game.apply_action_inplace(state, self._action(code, actor))
+                path.append(node)
+                break
+
+            code = max(codes, key=lambda c: self._ucb(node.children[c]))
+            node = node.children[code]
+            game.apply_action_inplace(state, self._action(code, actor))
+            path.append(node)
+
+        outcome = self._rollout(game, state, observer)
+        for node in path:
+            node.visits += 1
+            node.reward += outcome if node.by_observer else 1.0 - outcome
+
+    def _ucb(self, node: _Node) -> float:
+        return (node.reward / node.visits
+                + self.exploration * math.sqrt(math.log(node.availability) / node.visits))
+
+    def _rollout(self, game: Bazaar, state: Market, observer: Trader) -> float:
+        """Play random moves to the end; return the observer's result (1, 0.5 or 0)."""
+        for _ in range(self.rollout_limit):
+            if self._terminal(game, state):
+                break
+            if self.rollout_trades:
+                action = game.random_action(state.actor, state, self.rng)
+            else:
+                codes = self.rollout_codes(game, state)
+                action = self._action(self.rng.choice(codes), state.actor) if codes else None
+            if action is None:
+                break
+            game.apply_action_inplace(state, action)
+
+        own = game.score(observer, state)
+        other = max(game.score(player, state) for player in state.players if player != observer)
+        if own == other:
+            return 0.5
+        return 1.0 if own > other else 0.0
+
+
+# Search of the current worker process, created once by the pool initializer
+# so that its memos stay warm from one move to the next.
+_WORKER_SEARCH = None
+
+
+def _init_worker(config: dict):
+    global _WORKER_SEARCH
+    _WORKER_SEARCH = ISMCTS(**config)
+
+
+def _search_tree(seed: int,
+                 codes: list[int],
+                 observation: MarketObservation,
+                 history: Optional[PublicHistory],
+                 time_limit: Optional[float]) -> tuple[int, dict, dict]:
+    search = _WORKER_SEARCH
+    search.rng.seed(seed)
+    search.determinizer.rng.seed(search.rng.getrandbits(32))
+    actions = [TraderAction.from_code(code, observation.observer) for code in codes]
+    result = search.search(actions, observation, history, time_limit)
+    return result.iterations, result.visits, result.values
+
+
+def _most_visited(root: _Node, by_code: dict[int, TraderAction]) -> int:
+    """Code of the legal root action with the most visits."""
+    return max((code for code in root.children if code in by_code), key=lambda code: root.children[code].visits)
+
+
+def _detach(observation: MarketObservation,
+            history: Optional[PublicHistory]) -> tuple[MarketObservation, Optional[PublicHistory]]:
+    """
+    Copy an observation and history with placeholder Traders in place of the
+    real players, so that sending them to a worker does not pickle the agents.
+    """
+    players = {}
+
+    def placeholder(player: Trader) -> Trader:
+        if player.name not in players:
+            players[player.name] = Trader(None, player.name)
+        return players[player.name]
+
+    observation = copy.copy(observation)
+    observation.observer = placeholder(observation.observer)
+    observation.actor = placeholder(observation.actor)
+    if observation.action is not None:
+        observation.action = TraderAction.from_code(
+            observation.action.code, placeholder(observation.action.actor))
+
+    if history is not None:
+        history = copy.copy(history)
+        history.observer = placeholder(history.observer)
+        if getattr(history, 'observation', None) is not None:
+            # a CardTracker's last observation holds the real players too
+            history.observation = observation
+    return observation, history
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from typing import Optional
+
+from .bazaar import Bazaar
+from .market import Market
+from .trader import Trader, TraderAction
+from .goods import GoodType
+from .coins import BonusType
+
+
+_MAGIC = b'BZR'
+_VERSION = 2
+
+_GOODS = list(GoodType)
+_BONUSES = list(BonusType)
+
+
+class GameRecord:
+    """
+    A compact, replayable log of a Bazaar game.
+
+    A record stores the rules the game was created with, the seed of its
+    Market, the player names (by seat) and the canonical code of every action
+    taken. Actions cost 2 bytes per turn on top of a header of about 120 bytes
+    for the standard rules.
+
+    Optionally, the record embeds a Market checkpoint (`Market.to_bytes`,
+    529 bytes) every `checkpoint_interval` turns so that `seek` only has to
+    roll forward a few actions instead of replaying the whole game. The
+    checkpoints leave out the RNG state: the RNG only shuffles the opening
+    deck, and the deck order is part of the checkpoint.
+
+    Attributes
+    ----------
+    rules : dict
+        Market keyword arguments (see `BasicBazaar.default_rules`).
+    seed : int
+        Seed of the initial Market.
+    player_names : list of str
+        Player names in seat order.
+    max_rounds : int
+        The game's round limit.
+    actions : array of int
+        Canonical action codes (`TraderAction.code`) in turn order.
+    checkpoint_interval : int
+        Turns between embedded checkpoints (0 disables checkpoints).
+    checkpoints : dict[int, bytes]
+        Encoded Market after the given number of turns.
+    """
+
+    def __init__(self,
+                 rules: dict,
+                 seed: int,
+                 player_names: list[str],
+                 max_rounds: int = 500,
+                 actions: Optional[list[int]] = None,
+                 checkpoint_interval: int = 0):
+        self.rules = rules
+        self.seed = seed
+        self.player_names = list(player_names)
+        self.max_rounds = max_rounds
+        self.actions = array('H', actions or [])
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoints = {}
+
+    @staticmethod
+    def for_game(game: Bazaar, checkpoint_interval: int = 0) -> 'GameRecord':
+        """
+        Start an empty record for a freshly created game.
+
+        Parameters
+        ----------
+        game : Bazaar
+            A game created with known rules, e.g. a BasicBazaar.
+        checkpoint_interval : int
+            Embed a checkpoint every this many turns (0 disables checkpoints).
+
+        Returns
+        -------
+        GameRecord
+            A record with no actions yet.
+        """
+        return GameRecord(
+            game.rules,
+            game.state.seed,
+            [player.name for player in game.state.players],
+            game.max_rounds,
+            checkpoint_interval=checkpoint_interval
+        )
+
+    def append(self, action: TraderAction, state: Optional[Market] = None):
+        """
+        Record the next action of the game.
+
+        Parameters
+        ----------
+        action : TraderAction
+            The action taken.
+        state : Market, optional
+            The state after the action; stored as a checkpoint when the turn
+            falls on the checkpoint interval.
+        """
+        self.actions.append(action.code)
+        if state is not None and self.checkpoint_interval and len(self.actions) % self.checkpoint_interval == 0:
+            self.checkpoints[len(self.actions)] = state.to_bytes()
+
+    def add_checkpoints(self, interval: int):
+        """
+        Replay the game once and embed a checkpoint every `interval` turns.
+
+        Parameters
+        ----------
+        interval : int
+            Turns between checkpoints.
+        """
+        self.checkpoint_interval = interval
+        self.checkpoints = {}
+        game = replay(self, 0)
+        for turn, code in enumerate(self.actions, start=1):
+            action = TraderAction.from_code(code, game.state.actor)
+            game.state = game.apply_action(game.state, action)
+            if turn % interval == 0:
+                self.checkpoints[turn] = game.state.to_bytes()
+
+    def seek(self, turn: int, players: Optional[list[Trader]] = None) -> Bazaar:
+        """
+        Reconstruct the game after `turn` actions, starting from the nearest checkpoint.
+
+        Parameters
+        ----------
+        turn : int
+            Number of recorded actions to apply.
+        players : list of Trader, optional
+            Players to seat, in record order.
+
+        Returns
+        -------
+        Bazaar
+            The game positioned after `turn` actions.
+        """
+        return replay(self, turn, players)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the record.
+
+        Returns
+        -------
+        bytes
+            The binary record (little-endian, see `from_bytes`).
+        """
+        rules = self.rules
+        out = bytearray(_MAGIC)
+        out += struct.pack('<BqHBBBB',
+                           _VERSION,
+                           self.seed,
+                           self.max_rounds,
+                           rules['camel_bonus'],
+                           rules['max_goods_count'],
+                           rules['max_player_goods_count'],
+                           rules['initial_player_goods_count'])
+
+        # the deck in its original (pre-shuffle) order, run-length encoded
+        runs = []
+        for good_type in rules['reserved_goods']:
+            if runs and runs[-1][0] == good_type and runs[-1][1] < 255:
+                runs[-1][1] += 1
+            else:
+                runs.append([good_type, 1])
+        out.append(len(runs))
+        for good_type, count in runs:
+            out += bytes((_GOODS.index(good_type), count))
+
+        out.append(len(rules['goods_coins']))
+        for good_type, coins in rules['goods_coins'].items():
+            out += bytes((_GOODS.index(good_type), len(coins), *coins))
+
+        out.append(len(rules['bonus_coins']))
+        for bonus_type, coins in rules['bonus_coins'].items():
+            out += bytes((_BONUSES.index(bonus_type), len(coins), *coins))
+
+        out.append(len(self.player_names))
+        for name in self.player_names:
+            encoded = name.encode('utf-8')
+            out.append(len(encoded))
+            out += encoded
+
+        actions = array('H', self.actions)
+        if sys.byteorder == 'big':
+            actions.byteswap()
+        out += struct.pack('<I', len(actions))
+        out += actions.tobytes()
+
+        # optional trailing section: checkpoints
+        if self.checkpoints:
+            out += struct.pack('<HH', self.checkpoint_interval, len(self.checkpoints))
+            for turn, checkpoint in sorted(self.checkpoints.items()):
+                out += struct.pack('<IH', turn, len(checkpoint))
+                out += checkpoint
+        return bytes(out)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> 'GameRecord':
+        """
+        Deserialize a record produced by `to_bytes`.
+
+        Parameters
+        ----------
+        data : bytes
+            The binary record.
+
+        Returns
+        -------
+        GameRecord
+            The decoded record.
+
+        Raises
+        ------
+        ValueError
+            If the data is not a game record of a supported version.
+        """
+        data = memoryview(data)
+        if bytes(data[:3]) != _MAGIC:
+            raise ValueError("Not a Bazaar game record")
+
+        (version, seed, max_rounds, camel_bonus, max_goods_count,
+         max_player_goods_count, initial_player_goods_count) = struct.unpack_from('<BqHBBBB', data, 3)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported game record version: {version}")
+        pos = 3 + struct.calcsize('<BqHBBBB')
+
+        reserved_goods = []
+        for _ in range(data[pos]):
+            good, count = data[pos + 1], data[pos + 2]
+            reserved_goods += [_GOODS[good]] * count
+            pos += 2
+        pos += 1
+
+        goods_coins = {}
+        for _ in range(data[pos]):
+            good, length = data[pos + 1], data[pos + 2]
+            goods_coins[_GOODS[good]] = list(data[pos + 3:pos + 3 + length])
+            pos += 2 + length
+        pos += 1
+
+        bonus_coins = {}
+        for _ in range(data[pos]):
+            bonus, length = data[pos + 1], data[pos + 2]
+            bonus_coins[_BONUSES[bonus]] = list(data[pos + 3:pos + 3 + length])
+            pos += 2 + length
+        pos += 1
+
+        player_names = []
+        for _ in range(data[pos]):
+            length = data[pos + 1]
+            player_names.append(bytes(data[pos + 2:pos + 2 + length]).decode('utf-8'))
+            pos += 1 + length
+        pos += 1
+
+        (count,) = struct.unpack_from('<I', data, pos)
+        pos += 4
+        actions = array('H')
+        actions.frombytes(data[pos:pos + 2 * count])
+        if sys.byteorder == 'big':
+            actions.byteswap()
+        pos += 2 * count
+
+        checkpoint_interval = 0
+        checkpoints = {}
+        if pos < len(data):
+            checkpoint_interval, checkpoint_count = struct.unpack_from('<HH', data, pos)
+            pos += 4
+            for _ in range(checkpoint_count):
+                turn, length = struct.unpack_from('<IH', data, pos)
+                checkpoints[turn] = bytes(data[pos + 6:pos + 6 + length])
+                pos += 6 + length
+
+        rules = {
+            'reserved_goods': reserved_goods,
+            'goods_coins': goods_coins,
+            'bonus_coins': bonus_coins,
+            'camel_bonus': camel_bonus,
+            'max_goods_count': max_goods_count,
+            'max_player_goods_count': max_player_goods_count,
+            'initial_player_goods_count': initial_player_goods_count
+        }
+        record = GameRecord(rules, seed, player_names, max_rounds,
+                            checkpoint_interval=checkpoint_interval)
+        record.actions = actions
+        record.checkpoints = checkpoints
+        return record
+
+
+def replay(record: GameRecord,
+           turn: Optional[int] = None,
+           players: Optional[list[Trader]] = None) -> Bazaar:
+    """
+    Reconstruct a recorded game deterministically.
+
+    If the record has checkpoints, replay starts from the latest checkpoint
+    before `turn` rather than from the initial deal.
+
+    Parameters
+    ----------
+    record : GameRecord
+        The game record.
+    turn : int, optional
+        Number of recorded actions to apply (default: all of them).
+    players : list of Trader, optional
+        Players to seat, in record order. Defaults to plain Traders carrying
+        the recorded names.
+
+    Returns
+    -------
+    Bazaar
+        The game positioned after `turn` actions, with `round`, `state`
+        and `old_state` set as the live game loop would.
+    """
+    if players is None:
+        players = [Trader(seed=seat, name=name) for seat, name in enumerate(record.player_names)]
+    if turn is None:
+        turn = len(record.actions)
+    if not 0 <= turn <= len(record.actions):
+        raise ValueError(f"Turn {turn} is outside the record (0..{len(record.actions)})")
+
+    rules = record.rules
+
+    # latest checkpoint strictly before `turn`, so old_state is always set
+    start = max((t for t in record.checkpoints if t < turn), default=0)
+    if start:
+        game = Bazaar(players, Market.from_bytes(record.checkpoints[start], players),
+                      record.max_rounds, rules)
+        game.round = start
+        return _roll_forward(game, record, turn)
+
+    initial_state = Market(
+        seed=record.seed,
+        players=players,
+        actor=players[0],
+        action=None,
+        reserved_goods=list(rules['reserved_goods']),
+        goods_coins=rules['goods_coins'],
+        bonus_coins=rules['bonus_coins'],
+        camel_bonus=rules['camel_bonus'],
+        max_goods_count=rules['max_goods_count'],
+        max_player_goods_count=rules['max_player_goods_count'],
+        initial_player_goods_count=rules['initial_player_goods_count'])
+
+    game = Bazaar(players, initial_state, record.max_rounds, rules)
+    return _roll_forward(game, record, turn)
+
+
+def _roll_forward(game: Bazaar, record: GameRecord, turn: int) -> Bazaar:
+    for code in record.actions[game.round:turn]:
+        action = TraderAction.from_code(code, game.state.actor)
+        game.old_state = game.state
+        game.state = game.apply_action(game.state, action)
+        game.round += 1
+    return game
@@ -0,0 +1,51 @@
+"""
+Reward functions for `Bazaar.step`.
+
+A reward function is called once per turn with the game and the turn's
+`Transition`, and returns the reward of every player. Pass one as
+`Bazaar.reward_function` to change the environment reward given to
+`Trader.calculate_reward` (and recorded in `Transition.rewards`):
+
+    game = BasicBazaar(seed, players)
+    game.reward_function = rewards.win_loss
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from .bazaar import Bazaar, Transition
+    from .trader import Trader
+
+
+RewardFunction = Callable[['Bazaar', 'Transition'], dict['Trader', float]]
+
+
+def final_score(game: Bazaar, transition: Transition) -> dict[Trader, float]:
+    """Each player's coins once the game is over, 0 before (`Bazaar.calculate_reward`)."""
+    if not transition.terminal:
+        return {player: 0.0 for player in game.players}
+    return {
+        player: float(game.calculate_reward(player, transition.old_state, transition.new_state))
+        for player in game.players
+    }
+
+
+def coins_gained(game: Bazaar, transition: Transition) -> dict[Trader, float]:
+    """The coins won by the actor this turn (a dense reward), 0 for the other players."""
+    return {
+        player: float(transition.coins_gained) if player == transition.actor else 0.0
+        for player in game.players
+    }
+
+
+def win_loss(game: Bazaar, transition: Transition) -> dict[Trader, float]:
+    """1 for the winner and -1 for the others once the game is over (`Bazaar.score`); 0 on a tie or before the end."""
+    if not transition.terminal:
+        return {player: 0.0 for player in game.players}
+    scores = {player: game.score(player, transition.new_state) for player in game.players}
+    best = max(scores.values())
+    if list(scores.values()).count(best) > 1:
+        return {player: 0.0 for player in game.players}
+    return {player: 1.0 if score == best else -1.0 for player, score in scores.items()}
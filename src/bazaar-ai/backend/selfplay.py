@@ -0,0 +1,346 @@
+"""
+Parallel self-play data generation.
+
+`SelfPlay` runs BasicBazaar games in worker processes and streams each
+finished game to the consumer through a bounded queue. When the consumer
+(a trainer, or a TrajectoryWriter) falls behind, the queue fills up and the
+workers block on it instead of buffering games without limit.
+
+Every game's seeds are derived from the run seed and the game's index alone,
+so a run produces the same games whatever the number of workers; only the
+order in which they arrive depends on scheduling.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import multiprocessing as mp
+import os
+import queue as queue_module
+import traceback
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Union
+
+import numpy as np
+
+from .bazaar import BasicBazaar
+from .trader import Trader
+from .clock import TimeControl
+from .dataset import TrajectoryWriter, play_game
+
+
+# An agent is a Trader subclass, a "module:Class" / "path/to/file.py:Class"
+# string (resolved inside the worker), or either of those with constructor
+# keyword arguments as a (spec, kwargs) pair.
+AgentSpec = Union[type, str, tuple]
+
+_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class Trajectory:
+    """
+    One finished self-play game.
+
+    Attributes
+    ----------
+    index : int
+        Index of the game within the run.
+    seed : int
+        Seed the BasicBazaar was created with.
+    players : list of str
+        Names of the players, in seat order.
+    columns : dict[str, np.ndarray]
+        Encoded turns, as returned by `backend.dataset.play_game`.
+    """
+    index: int
+    seed: int
+    players: list[str]
+    columns: dict[str, np.ndarray]
+
+    def __len__(self):
+        return len(self.columns['actions'])
+
+
+@dataclass
+class _WorkerDone:
+    worker: int
+    error: Optional[str] = None
+
+
+def game_seeds(seed: int, index: int, count: int = 3) -> list[int]:
+    """
+    Derive the seeds of one game from the run seed.
+
+    Parameters
+    ----------
+    seed : int
+        Seed of the whole run.
+    index : int
+        Index of the game within the run.
+    count : int
+        Number of seeds to derive (the game's, then one per player).
+
+    Returns
+    -------
+    list of int
+        Independent 32-bit seeds.
+    """
+    sequence = np.random.SeedSequence(seed, spawn_key=(index,))
+    return [int(s) for s in sequence.generate_state(count)]
+
+
+def resolve_agent(spec: AgentSpec) -> tuple[type, dict]:
+    """
+    Turn an agent spec into a (Trader subclass, constructor kwargs) pair.
+
+    Parameters
+    ----------
+    spec : AgentSpec
+        See `AgentSpec`.
+
+    Returns
+    -------
+    tuple of (type, dict)
+        The agent class and the extra keyword arguments for its constructor.
+    """
+    kwargs = {}
+    if isinstance(spec, tuple):
+        spec, kwargs = spec
+
+    if isinstance(spec, str):
+        location, _, class_name = spec.rpartition(':')
+        if not location:
+            raise ValueError(f"Agent spec must look like 'module:Class', got {spec!r}")
+        if location.endswith('.py'):
+            path = Path(location)
+            module_spec = importlib.util.spec_from_file_location(path.stem, path)
+            module = importlib.util.module_from_spec(module_spec)
+            module_spec.loader.exec_module(module)
+        else:
+            module = importlib.import_module(location)
+        spec = getattr(module, class_name)
+
+    if not (isinstance(spec, type) and issubclass(spec, Trader)):
+        raise TypeError(f"{spec!r} is not a Trader subclass")
+    return spec, dict(kwargs)
+
+
+def play_selfplay_game(agents: Sequence[tuple[type, dict]],
+                       seed: int,
+                       index: int,
+                       swap_seats: bool = True,
+                       time_control: Optional[TimeControl] = None) -> Trajectory:
+    """
+    Play game `index` of a run and encode it.
+
+    Parameters
+    ----------
+    agents : sequence of (type, dict)
+        Resolved agents, as returned by `resolve_agent`.
+    seed : int
+        Seed of the whole run.
+    index : int
+        Index of the game within the run.
+    swap_seats : bool
+        Whether odd games swap which agent moves first.
+    time_control : TimeControl, optional
+        Clocks for the players (see `backend.dataset.play_game`).
+
+    Returns
+    -------
+    Trajectory
+        The finished game.
+    """
+    game_seed, *player_seeds = game_seeds(seed, index, 1 + len(agents))
+    seated = list(enumerate(agents))
+    if swap_seats and index % 2:
+        seated.reverse()
+
+    players = [
+        cls(seed=player_seed, name=f"{cls.__name__} {number + 1}", **kwargs)
+        for player_seed, (number, (cls, kwargs)) in zip(player_seeds, seated)
+    ]
+    game = BasicBazaar(seed=game_seed, players=players)
+    return Trajectory(index, game_seed, [p.name for p in players], play_game(game, time_control))
+
+
+def _run_worker(worker: int,
+                indices: range,
+                agent_specs: Sequence[AgentSpec],
+                seed: int,
+                swap_seats: bool,
+                time_control: Optional[TimeControl],
+                results,
+                stop):
+    error = None
+    try:
+        agents = [resolve_agent(spec) for spec in agent_specs]
+        for index in indices:
+            trajectory = play_selfplay_game(agents, seed, index, swap_seats, time_control)
+            # Blocks while the queue is full: this is the backpressure
+            while not stop.is_set():
+                try:
+                    results.put(trajectory, timeout=_POLL_INTERVAL)
+                    break
+                except queue_module.Full:
+                    pass
+            if stop.is_set():
+                return
+    except BaseException:
+        # SystemExit and KeyboardInterrupt from agent code included
+        error = traceback.format_exc()
+    finally:
+        results.put(_WorkerDone(worker, error))
+
+
+class SelfPlay:
+    """
+    Run self-play games in parallel worker processes.
+
+    Iterating over a SelfPlay starts the workers and yields each Trajectory
+    as soon as it is consumed from the queue. Games are split between the
+    workers by index (worker `w` plays games `w, w + workers, ...`).
+
+    Parameters
+    ----------
+    agents : sequence of AgentSpec
+        The two agents to seat, in seat order for even games.
+    games : int
+        Total number of games to play.
+    workers : int, optional
+        Number of worker processes (defaults to the CPU count).
+    seed : int
+        Seed of the run; with the same agents, the same seed replays the same games.
+    queue_size : int
+        Maximum number of finished games waiting for the consumer.
+    swap_seats : bool
+        Whether odd games swap which agent moves first.
+    time_control : TimeControl, optional
+        Clocks for the players of every game, so that agents that accept a
+        budget play at a controlled speed.
+
+    Examples
+    --------
+    >>> with TrajectoryWriter('data/selfplay') as writer:
+    ...     SelfPlay([SmartAgent, 'agents/random_agent.py:RandomAgent'], games=1000).write(writer)
+    """
+
+    def __init__(self,
+                 agents: Sequence[AgentSpec],
+                 games: int,
+                 workers: Optional[int] = None,
+                 seed: int = 0,
+                 queue_size: int = 64,
+                 swap_seats: bool = True,
+                 time_control: Optional[TimeControl] = None):
+        if len(agents) != 2:
+            raise ValueError("BasicBazaar is a two-player game")
+        self.agents = list(agents)
+        self.games = games
+        self.workers = max(1, min(workers or os.cpu_count() or 1, games))
+        self.seed = seed
+        self.queue_size = queue_size
+        self.swap_seats = swap_seats
+        self.time_control = time_control
+
+        self._context = mp.get_context()
+        self._processes = []
+        self._results = None
+        self._stop = None
+
+    def __iter__(self) -> Iterator[Trajectory]:
+        self._start()
+        try:
+            reported = set()
+            exited = set()
+            while len(reported) < len(self._processes):
+                try:
+                    item = self._results.get(timeout=_POLL_INTERVAL)
+                except queue_module.Empty:
+                    exited = self._check_workers(reported, exited)
+                    continue
+                if isinstance(item, _WorkerDone):
+                    reported.add(item.worker)
+                    if item.error:
+                        raise RuntimeError(f"Self-play worker {item.worker} failed:\n{item.error}")
+                    continue
+                yield item
+        finally:
+            self.close()
+
+    def _check_workers(self, reported: set[int], exited: set[int]) -> set[int]:
+        """
+        Raise if a worker exited without reporting (killed, or crashed
+        outside Python).
+
+        Anything a worker sent is in the queue before its process exits, so
+        a worker in `exited` (found exited at the previous empty poll) that
+        has still not reported never will. Returns the workers found exited
+        now.
+        """
+        lost = exited - reported
+        if lost:
+            worker = min(lost)
+            raise RuntimeError(f"Self-play worker {worker} died with exit code {self._processes[worker].exitcode}")
+        return {worker for worker, process in enumerate(self._processes)
+                if worker not in reported and process.exitcode is not None}
+
+    def _start(self):
+        if self._processes:
+            raise RuntimeError("SelfPlay is already running")
+        self._results = self._context.Queue(maxsize=self.queue_size)
+        self._stop = self._context.Event()
+        for worker in range(self.workers):
+            process = self._context.Process(
+                target=_run_worker,
+                args=(worker, range(worker, self.games, self.workers), self.agents,
+                      self.seed, self.swap_seats, self.time_control, self._results, self._stop),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+    def close(self):
+        """Stop the workers (dropping any games still in flight) and wait for them."""
+        if not self._processes:
+            return
+        self._stop.set()
+        # Drain so that workers blocked on a full queue can observe the stop
+        while any(p.is_alive() for p in self._processes):
+            try:
+                self._results.get(timeout=_POLL_INTERVAL)
+            except queue_module.Empty:
+                pass
+        for process in self._processes:
+            process.join()
+        self._results.close()
+        self._processes = []
+
+    def write(self, writer: TrajectoryWriter) -> int:
+        """
+        Run all games and append them to a dataset.
+
+        Parameters
+        ----------
+        writer : TrajectoryWriter
+            Destination dataset.
+
+        Returns
+        -------
+        int
+            Number of rows written.
+        """
+        rows = 0
+        for trajectory in self:
+            writer.append_episode(trajectory.columns)
+            rows += len(trajectory)
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,219 @@
+"""
+Cheap one-move lookahead for agents.
+
+`ActionSimulator` is the `simulate_action_fnc` given to `Trader.select_action`.
+Rather than cloning the whole state and applying the action, it keeps a
+reference to the current state and describes each simulated move by its
+effect on it. The resulting observation is a `SimulatedObservation`, whose
+fields are only computed when the agent reads them. Results are memoized by
+action code, so simulating the same action twice in a turn is free.
+"""
+
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Iterable
+
+from .market import Market, MarketObservation, _frozen_stacks
+from .trader import TraderAction, TraderActionType
+from .goods import GoodType, Goods, FrozenGoods
+from .coins import BonusType
+
+if TYPE_CHECKING:
+    from .trader import Trader
+
+
+_GOODS = list(GoodType)
+
+_LAZY_FIELDS = (
+    'actor_goods',
+    'actor_goods_coins',
+    'actor_bonus_coins_counts',
+    'market_goods',
+    'market_goods_coins',
+    'market_bonus_coins_counts',
+    'market_reserved_goods_count',
+)
+
+
+class SimulatedObservation(MarketObservation):
+    """
+    The observation the simulating trader would get after an action.
+
+    Behaves like the MarketObservation `Bazaar.observe` would return for the
+    state after the action, but each field is computed on first access from
+    the parent state and the action. Like those views it is read-only (goods
+    are FrozenGoods, coin stacks and bonus counts read-only mappings), since
+    it reads the parent state's data and is shared by every simulation of
+    the same action; `clone` returns an independent, modifiable copy.
+    """
+
+    def __init__(self, state: Market, observer: Trader, action: TraderAction):
+        self._state = state
+        self.observer = observer
+        self.action = action
+        self.actor = state.get_non_actor()
+        self.max_player_goods_count = state.max_player_goods_count
+        self.max_market_goods_count = state.max_goods_count
+
+    def __getattr__(self, name):
+        # Only called for attributes that have not been computed yet
+        if name not in _LAZY_FIELDS and name != 'actor_non_camel_goods_count':
+            raise AttributeError(name)
+        if name == 'actor_non_camel_goods_count':
+            value = self.actor_goods.count(include_camels=False)
+        else:
+            value = getattr(self, f'_compute_{name}')()
+        setattr(self, name, value)
+        return value
+
+    @property
+    def _sold(self) -> bool:
+        return self.action.trader_action_type == TraderActionType.SELL
+
+    def _compute_actor_goods(self) -> Goods:
+        goods = Goods()
+        goods._goods.update(self._state.player_goods[self.observer]._goods)
+        if self.action.actor == self.observer:
+            for good_type in _GOODS:
+                goods._goods[good_type] += (self.action.requested_goods[good_type]
+                                            - self.action.offered_goods[good_type])
+        return FrozenGoods(goods)
+
+    def _compute_market_goods(self) -> Goods:
+        state = self._state
+        goods = Goods()
+        goods._goods.update(state.goods._goods)
+        for good_type in _GOODS:
+            goods._goods[good_type] -= self.action.requested_goods[good_type]
+            if not self._sold:
+                goods._goods[good_type] += self.action.offered_goods[good_type]
+
+        # Market.refill_market draws from the end of the deck
+        missing = max(0, state.max_goods_count - goods.count())
+        for good_type in state.reserved_goods[max(0, len(state.reserved_goods) - missing):]:
+            goods.add(good_type)
+        return FrozenGoods(goods)
+
+    def _compute_market_reserved_goods_count(self) -> int:
+        state = self._state
+        before = state.goods.count() - self.action.requested_goods.count()
+        if not self._sold:
+            before += self.action.offered_goods.count()
+        missing = max(0, state.max_goods_count - before)
+        return max(0, len(state.reserved_goods) - missing)
+
+    def _sold_coins(self) -> tuple[GoodType, list[int], list[int]]:
+        """The sold good type, its remaining market coins and the coins won."""
+        good_type, count = self.action._sell, self.action._count
+        stack = self._state.coins.goods_coins[good_type]
+        kept = max(0, len(stack) - count)
+        return good_type, stack[:kept], stack[kept:]
+
+    def _compute_market_goods_coins(self) -> MappingProxyType:
+        coins = dict(self._state.coins.goods_coins)
+        if self._sold:
+            good_type, remaining, _ = self._sold_coins()
+            coins[good_type] = remaining
+        return _frozen_stacks(coins)
+
+    def _compute_actor_goods_coins(self) -> MappingProxyType:
+        coins = dict(self._state.player_coins[self.observer].goods_coins)
+        if self._sold and self.action.actor == self.observer:
+            good_type, _, won = self._sold_coins()
+            coins[good_type] = sorted(coins[good_type] + [coin for coin in won if coin])
+        return _frozen_stacks(coins)
+
+    def _bonus_won(self) -> BonusType | None:
+        """The bonus type won by the action, if any."""
+        if not self._sold or self.action._count not in BonusType._value2member_map_:
+            return None
+        bonus_type = BonusType(self.action._count)
+        return bonus_type if self._state.coins.bonus_coins[bonus_type] else None
+
+    def _compute_market_bonus_coins_counts(self) -> MappingProxyType:
+        counts = {bonus: len(self._state.coins.bonus_coins[bonus]) for bonus in BonusType}
+        bonus_type = self._bonus_won()
+        if bonus_type is not None:
+            counts[bonus_type] -= 1
+        return MappingProxyType(counts)
+
+    def _compute_actor_bonus_coins_counts(self) -> MappingProxyType:
+        bonus_coins = self._state.player_coins[self.observer].bonus_coins
+        counts = {bonus: len(bonus_coins[bonus]) for bonus in BonusType}
+        bonus_type = self._bonus_won()
+        if bonus_type is not None and self.action.actor == self.observer:
+            counts[bonus_type] += 1
+        return MappingProxyType(counts)
+
+    def clone(self) -> MarketObservation:
+        """A plain, independent MarketObservation with the same content."""
+        return MarketObservation(
+            self.observer,
+            self.actor,
+            self.action,
+            self.actor_goods,
+            self.actor_goods_coins,
+            self.actor_bonus_coins_counts,
+            self.market_goods,
+            self.market_goods_coins,
+            self.market_bonus_coins_counts,
+            self.market_reserved_goods_count,
+            self.max_player_goods_count,
+            self.max_market_goods_count
+        ).clone()
+
+
+class ActionSimulator:
+    """
+    Simulate actions from a fixed state, as seen by one trader.
+
+    Call it with one action, as `simulate_action_fnc(action)`, or use
+    `simulate` for a whole list. Only use it during the turn it was created
+    for: it reads the state it was given, which must not change meanwhile.
+
+    Parameters
+    ----------
+    state : Market
+        The state the actions are taken from.
+    observer : Trader
+        The trader whose observations are returned (usually the actor).
+    """
+
+    def __init__(self, state: Market, observer: Trader):
+        self.state = state
+        self.observer = observer
+        self._cache = {}
+
+    def __call__(self, action: TraderAction) -> MarketObservation:
+        """
+        Return the observation that would follow `action`.
+
+        Parameters
+        ----------
+        action : TraderAction
+            An action legal in the simulator's state.
+
+        Returns
+        -------
+        MarketObservation
+            A read-only SimulatedObservation.
+        """
+        key = _cache_key(action)
+        observation = self._cache.get(key)
+        if observation is None:
+            observation = self._cache[key] = SimulatedObservation(self.state, self.observer, action)
+        return observation
+
+    def simulate(self, actions: Iterable[TraderAction]) -> list[MarketObservation]:
+        """Return the observations that would follow each of `actions`, in order."""
+        return [self(action) for action in actions]
+
+
+def _cache_key(action: TraderAction):
+    try:
+        # the same move by either player has the same code
+        return action.code, action.actor
+    except ValueError:
+        # outside the canonical table (non-standard rules): fall back to identity
+        return id(action)
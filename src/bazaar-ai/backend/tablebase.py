@@ -0,0 +1,397 @@
+"""
+Disk-backed endgame tablebase.
+
+A `Tablebase` is a file of solved endgame positions (see `backend.endgame`)
+stored in an open-addressing hash table and read through `numpy.memmap`.
+Lookups hash the packed position and probe the mapped file directly, so
+opening a tablebase costs nothing and every process that opens the same file
+shares its pages through the OS page cache.
+
+Tablebases are built offline with `Tablebase.build`, which plays games with
+a random policy until few cards remain in the deck and solves the positions
+reached from there on. The file records how many games were played, so a
+later `build` on the same file carries on with new games and the table grows
+over several runs:
+
+    with Tablebase('data/endgame.tb', writable=True) as tablebase:
+        tablebase.build(games=1000)
+
+    solver = EndgameSolver(tablebase=Tablebase('data/endgame.tb'))
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import os
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from .bazaar import BasicBazaar
+from .market import Market
+from .trader import Trader, TraderAction, SellAction, TakeAction, TradeAction
+from .endgame import EndgameSolver, _points
+from .selfplay import game_seeds
+
+
+_MAGIC = b'BZRTBASE'
+_VERSION = 1
+_HEADER_SIZE = 64
+_MAX_LOAD = 0.5
+
+_HEADER = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('deck_threshold', '<u4'),
+    ('capacity', '<u8'),
+    ('count', '<u8'),
+    ('games', '<u8'),
+    ('rules', '<u8'),
+])
+
+# key 0 marks an empty slot
+_RECORD = np.dtype([
+    ('key', '<u8'),
+    ('value', '<f4'),
+    ('code', '<i4'),
+    ('depth', 'u1'),
+    ('exact', 'u1'),
+])
+
+
+@dataclass
+class TablebaseEntry:
+    """
+    A solved position.
+
+    Attributes
+    ----------
+    value : float
+        Future score difference (player to move minus opponent) under optimal
+        play, camel bonus included.
+    code : int
+        Action code of the best move (see `TraderAction.code`).
+    depth : int
+        Depth the position was searched to.
+    exact : bool
+        Whether `value` is the true value rather than a depth-limited estimate.
+    """
+    value: float
+    code: int
+    depth: int
+    exact: bool
+
+
+class Tablebase:
+    """
+    Memory-mapped hash table of solved endgame positions.
+
+    Parameters
+    ----------
+    path : str or Path
+        The tablebase file. Created if it does not exist and `writable` is set.
+    writable : bool
+        Open for building. A tablebase must have a single writer at a time;
+        readers opened before the writer grows the table keep seeing the old
+        version.
+    rules : dict, optional
+        Market keyword arguments of the game (defaults to BasicBazaar's). Must
+        match the rules the file was built with.
+    capacity : int
+        Initial number of slots of a new file, rounded up to a power of two.
+        The table doubles whenever it is half full.
+    deck_threshold : int
+        Positions are solved once the deck holds at most this many cards
+        (only used when creating the file).
+
+    Raises
+    ------
+    FileNotFoundError
+        If the file does not exist and `writable` is not set.
+    ValueError
+        If the file is not a tablebase or was built with other rules.
+    """
+
+    def __init__(self,
+                 path: Union[str, Path],
+                 writable: bool = False,
+                 rules: Optional[dict] = None,
+                 capacity: int = 1 << 16,
+                 deck_threshold: int = 2):
+        self.path = Path(path)
+        self.writable = writable
+        self.rules = rules or BasicBazaar.default_rules()
+        self._rules_hash = _rules_hash(self.rules)
+        self._packer = EndgameSolver(self.rules)
+
+        if not self.path.exists():
+            if not writable:
+                raise FileNotFoundError(self.path)
+            _create(self.path, _capacity(capacity), deck_threshold, self._rules_hash)
+        self._open()
+
+    def _open(self):
+        mode = 'r+' if self.writable else 'r'
+        self._header = np.memmap(self.path, dtype=_HEADER, mode=mode, shape=(1,))
+        header = self._header[0]
+        if header['magic'] != _MAGIC or header['version'] != _VERSION:
+            raise ValueError(f"{self.path} is not a tablebase")
+        if header['rules'] != self._rules_hash:
+            raise ValueError(f"{self.path} was built with other rules")
+
+        self.capacity = int(header['capacity'])
+        self.deck_threshold = int(header['deck_threshold'])
+        self._mask = self.capacity - 1
+        self._records = np.memmap(self.path, dtype=_RECORD, mode=mode,
+                                  offset=_HEADER_SIZE, shape=(self.capacity,))
+        self._keys = self._records['key']
+
+    def __len__(self):
+        return int(self._header[0]['count'])
+
+    def __contains__(self, position: tuple):
+        return self._slot(_key(position))[1]
+
+    @property
+    def games(self) -> int:
+        """Number of games played by the builds so far."""
+        return int(self._header[0]['games'])
+
+    def get(self, position: tuple) -> Optional[TablebaseEntry]:
+        """
+        Look up a packed position (see `EndgameSolver.position`).
+
+        Returns
+        -------
+        TablebaseEntry or None
+            The stored solution, or None if the position is not in the table.
+        """
+        index, found = self._slot(_key(position))
+        if not found:
+            return None
+        record = self._records[index]
+        return TablebaseEntry(float(record['value']), int(record['code']),
+                              int(record['depth']), bool(record['exact']))
+
+    def lookup(self, state: Market) -> Optional[TablebaseEntry]:
+        """Look up a complete state, from its actor's point of view."""
+        return self.get(self._packer.position(state))
+
+    def best_action(self, state: Market) -> Optional[TraderAction]:
+        """The stored best action of a state's actor, or None if the state is not in the table."""
+        entry = self.lookup(state)
+        if entry is None:
+            return None
+        return TraderAction.from_code(entry.code, state.actor)
+
+    def put(self, position: tuple, entry: TablebaseEntry):
+        """
+        Store a solved position, replacing any previous solution.
+
+        Parameters
+        ----------
+        position : tuple
+            A packed position (see `EndgameSolver.position`).
+        entry : TablebaseEntry
+            Its solution.
+        """
+        if not self.writable:
+            raise PermissionError(f"{self.path} is open read-only")
+
+        key = _key(position)
+        index, found = self._slot(key)
+        if not found:
+            if (len(self) + 1) > self.capacity * _MAX_LOAD:
+                self._grow()
+                index, _ = self._slot(key)
+            self._header[0]['count'] += 1
+
+        record = self._records[index:index + 1]
+        record['key'] = key
+        record['value'] = entry.value
+        record['code'] = entry.code
+        record['depth'] = entry.depth
+        record['exact'] = entry.exact
+
+    def build(self,
+              games: int,
+              solver: Optional[EndgameSolver] = None,
+              seed: int = 0,
+              positions_per_game: int = 8,
+              max_rounds: int = 500,
+              verbose: bool = False) -> int:
+        """
+        Play games and add the endgame positions they reach.
+
+        Each game is played with a random policy that picks an action type
+        (sell, take or trade) uniformly, then an action of that type. Once
+        the deck holds at most the tablebase's `deck_threshold` cards, every
+        position reached is solved and stored, up to `positions_per_game`.
+        Games are numbered from `games` so that successive builds play
+        different games; the count is saved after every game, so an
+        interrupted build loses at most one game.
+
+        Parameters
+        ----------
+        games : int
+            Number of games to play.
+        solver : EndgameSolver, optional
+            Solver used for the positions (one with the tablebase's rules and
+            default limits by default). It is given this tablebase, so new
+            positions reuse the ones already solved.
+        seed : int
+            Seed the game seeds are derived from.
+        positions_per_game : int
+            Maximum number of positions solved per game.
+        max_rounds : int
+            Games still running after this many rounds are abandoned.
+        verbose : bool
+            Print progress after each game.
+
+        Returns
+        -------
+        int
+            Number of positions added.
+        """
+        if not self.writable:
+            raise PermissionError(f"{self.path} is open read-only")
+        solver = solver or EndgameSolver(self.rules)
+        solver.tablebase = self
+
+        added = 0
+        start = self.games
+        for index in range(start, start + games):
+            game_seed, policy_seed = game_seeds(seed, index, 2)
+            added += self._build_game(solver, game_seed, random.Random(policy_seed),
+                                      positions_per_game, max_rounds)
+            self._header[0]['games'] = index + 1
+            self.flush()
+            if verbose:
+                print(f"game {index + 1}: {len(self)} positions ({added} new)")
+        return added
+
+    def _build_game(self, solver: EndgameSolver, seed: int, rng: random.Random,
+                    positions_per_game: int, max_rounds: int) -> int:
+        players = [Trader(None, "Trader 1"), Trader(None, "Trader 2")]
+        game = BasicBazaar(seed, players)
+        state = game.state
+
+        added = 0
+        for _ in range(max_rounds):
+            if game.terminal(state) or added >= positions_per_game:
+                break
+            if len(state.reserved_goods) <= self.deck_threshold:
+                position = solver.position(state)
+                stored = self.get(position)
+                if stored is None or not (stored.exact or stored.depth >= solver.max_depth):
+                    result = solver.solve(state)
+                    points = _points(state, state.actor) - _points(state, state.get_non_actor())
+                    self.put(position, TablebaseEntry(result.value - points, result.action.code,
+                                                      result.depth, result.exact))
+                    added += stored is None
+            game.apply_action_inplace(state, _policy_action(game, state, rng))
+        return added
+
+    def _slot(self, key: int) -> tuple[int, bool]:
+        """Index of `key`'s slot, or of the empty slot where it would go, and whether it was found."""
+        keys = self._keys
+        index = key & self._mask
+        while True:
+            slot_key = int(keys[index])
+            if slot_key == key:
+                return index, True
+            if slot_key == 0:
+                return index, False
+            index = (index + 1) & self._mask
+
+    def _grow(self):
+        """Double the capacity, rehashing into a new file that replaces the old one."""
+        occupied = self._records[self._keys != 0].copy()
+        header = self._header[0]
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        _create(tmp_path, self.capacity * 2, int(header['deck_threshold']), self._rules_hash)
+
+        new_header = np.memmap(tmp_path, dtype=_HEADER, mode='r+', shape=(1,))
+        new_records = np.memmap(tmp_path, dtype=_RECORD, mode='r+',
+                                offset=_HEADER_SIZE, shape=(self.capacity * 2,))
+        mask = self.capacity * 2 - 1
+        new_keys = new_records['key']
+        for record in occupied:
+            index = int(record['key']) & mask
+            while new_keys[index] != 0:
+                index = (index + 1) & mask
+            new_records[index] = record
+        new_header[0]['count'] = len(occupied)
+        new_header[0]['games'] = header['games']
+        new_records.flush()
+        new_header.flush()
+        del new_records, new_header, new_keys
+
+        self.close()
+        os.replace(tmp_path, self.path)
+        self._open()
+
+    def flush(self):
+        """Write pending changes to disk."""
+        if self.writable:
+            self._records.flush()
+            self._header.flush()
+
+    def close(self):
+        """Flush and unmap the file."""
+        self.flush()
+        del self._keys, self._records, self._header
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __reduce__(self):
+        # Worker processes map the file themselves, read-only
+        return (Tablebase, (self.path, False, self.rules))
+
+
+def _policy_action(game: BasicBazaar, state: Market, rng: random.Random) -> TraderAction:
+    """Random action of a uniformly random available type."""
+    observation = game.observe(state.actor, state)
+    counts = [
+        (action_class, action_class.count_actions(observation))
+        for action_class in (SellAction, TakeAction, TradeAction)
+    ]
+    action_class, count = rng.choice([(cls, count) for cls, count in counts if count])
+    return action_class.sample_action(observation, rng.randrange(count))
+
+
+def _key(position: tuple) -> int:
+    # every count fits in a byte
+    data = bytes(itertools.chain.from_iterable(position))
+    key = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+    return key or 1
+
+
+def _rules_hash(rules: dict) -> int:
+    data = repr(sorted((key, repr(value)) for key, value in rules.items())).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+
+def _capacity(capacity: int) -> int:
+    return 1 << max(4, (capacity - 1).bit_length())
+
+
+def _create(path: Path, capacity: int, deck_threshold: int, rules_hash: int):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = np.zeros(1, dtype=_HEADER)
+    header['magic'] = _MAGIC
+    header['version'] = _VERSION
+    header['deck_threshold'] = deck_threshold
+    header['capacity'] = capacity
+    header['rules'] = rules_hash
+    with open(path, 'wb') as f:
+        f.write(header.tobytes().ljust(_HEADER_SIZE, b'\0'))
+        f.truncate(_HEADER_SIZE + capacity * _RECORD.itemsize)
@@ -0,0 +1,185 @@
+"""
+Incremental tracking of the cards a player cannot see.
+
+`CardTracker` follows one player's view of a game from the stream of
+actions and observations: the cards the opponent is known to hold (taken
+from the market in plain sight), the multiset of unseen cards (the deck and
+the rest of the opponent's hand) and which bonus coins each player won.
+Every update costs a constant amount of work, so an agent can keep a tracker
+for the whole game and query it every move instead of rescanning the
+history:
+
+    tracker = CardTracker(self)
+
+    def select_action(self, actions, observation, simulate_action_fnc):
+        self.tracker.observe(observation)
+        probabilities = self.tracker.draw_probabilities()
+        ...
+        self.tracker.record(action)
+        return action
+
+A CardTracker is a `PublicHistory`, so it can be passed wherever one is
+expected (`Determinizer.sample`, `ISMCTS.search`, `EndgameSolver`).
+"""
+
+from __future__ import annotations
+
+from math import comb
+from typing import Optional
+
+from .bazaar import BasicBazaar
+from .market import MarketObservation
+from .trader import Trader, TraderAction, TraderActionType
+from .goods import GoodType, Goods
+from .coins import BonusType
+from .determinization import PublicHistory, _unseen_goods
+
+
+_GOODS = list(GoodType)
+
+
+class CardTracker(PublicHistory):
+    """
+    What one player knows about the hidden cards of a game.
+
+    Feed the tracker every observation received (`observe`, which records the
+    opponent's move it reveals) and every action played by the observer
+    (`record`). A new game is detected automatically.
+
+    Parameters
+    ----------
+    observer : Trader
+        The player whose knowledge this is.
+    rules : dict, optional
+        Market keyword arguments of the game (defaults to BasicBazaar's).
+
+    Attributes
+    ----------
+    composition : Goods
+        All the cards of the game.
+    unseen : Goods
+        Cards the observer cannot see as of the last observation: the deck
+        and the unknown part of the opponent's hand.
+    deck_size : int or None
+        Number of cards in the deck as of the last observation.
+    observation : MarketObservation or None
+        The last observation.
+    own_bonus_coins, opponent_bonus_coins : dict
+        Bonus coins won by the observer and by the opponent, by bonus type.
+    """
+
+    def __init__(self, observer: Trader, rules: Optional[dict] = None):
+        self.rules = rules or BasicBazaar.default_rules()
+        super().__init__(observer, self.rules['initial_player_goods_count'])
+        self.composition = Goods.from_list(self.rules['reserved_goods'])
+        self._bonus_stacks = {bonus: sorted(coins) for bonus, coins in self.rules['bonus_coins'].items()}
+        self._reset()
+
+    def _reset(self):
+        PublicHistory.__init__(self, self.observer, self.rules['initial_player_goods_count'])
+        self.unseen = Goods()
+        self.deck_size = None
+        self.observation = None
+        self._bonus_left = {bonus: list(stack) for bonus, stack in self._bonus_stacks.items()}
+        self.own_bonus_coins = {bonus: [] for bonus in BonusType}
+        self.opponent_bonus_coins = {bonus: [] for bonus in BonusType}
+
+    def observe(self, observation: MarketObservation):
+        """
+        Update the tracker with the observer's latest observation.
+
+        Starts over if the observation belongs to a new game (the deck grew,
+        or no action has been played yet), records the opponent's move it
+        reveals, and recounts the unseen cards.
+
+        Parameters
+        ----------
+        observation : MarketObservation
+            The observation given to `select_action`.
+
+        Raises
+        ------
+        ValueError
+            If the observation contradicts the rules' deck.
+        """
+        deck_size = observation.market_reserved_goods_count
+        action = observation.action
+        if self.deck_size is None or deck_size > self.deck_size or action is None:
+            self._reset()
+        if action is not None and action.actor != self.observer:
+            self.record(action)
+
+        self.unseen = _unseen_goods(self.composition, observation, self.sold_goods, self.opponent_known)
+        self.deck_size = deck_size
+        self.observation = observation
+
+    def record(self, action: TraderAction):
+        """
+        Update the tracker with the next action of the game.
+
+        Parameters
+        ----------
+        action : TraderAction
+            The action, by either player.
+        """
+        super().record(action)
+        if action.trader_action_type == TraderActionType.SELL and action._count in BonusType._value2member_map_:
+            bonus = BonusType(action._count)
+            stack = self._bonus_left.get(bonus)
+            if stack:
+                won = self.own_bonus_coins if action.actor == self.observer else self.opponent_bonus_coins
+                won[bonus].append(stack.pop())
+
+    @property
+    def opponent_hidden_count(self) -> int:
+        """Number of cards in the opponent's hand that the observer has not seen."""
+        return self.opponent_hand_size - self.opponent_known.count()
+
+    def draw_probabilities(self) -> dict[GoodType, float]:
+        """
+        Probability of each good type for the next card drawn from the deck.
+
+        Every unseen card is equally likely to be in the deck or in the
+        opponent's hand, so this is also the distribution of any single
+        unseen card.
+        """
+        total = self.unseen.count()
+        if not total:
+            return {good_type: 0.0 for good_type in _GOODS}
+        return {good_type: self.unseen[good_type] / total for good_type in _GOODS}
+
+    def expected_opponent_goods(self) -> dict[GoodType, float]:
+        """Expected number of cards of each type in the opponent's hand."""
+        hidden = self.opponent_hidden_count
+        return {
+            good_type: self.opponent_known[good_type] + hidden * probability
+            for good_type, probability in self.draw_probabilities().items()
+        }
+
+    def opponent_holds_probability(self, good_type: GoodType) -> float:
+        """
+        Probability that the opponent holds at least one card of a type.
+
+        Parameters
+        ----------
+        good_type : GoodType
+            The good type.
+        """
+        if self.opponent_known[good_type]:
+            return 1.0
+        total = self.unseen.count()
+        hidden = self.opponent_hidden_count
+        if hidden <= 0 or not total:
+            return 0.0
+        # hypergeometric: none of the hidden cards are of this type
+        return 1.0 - comb(total - self.unseen[good_type], hidden) / comb(total, hidden)
+
+    def unseen_goods(self, observation: MarketObservation, composition: Goods) -> Goods:
+        if observation is self.observation and composition._goods == self.composition._goods:
+            return self.unseen
+        return super().unseen_goods(observation, composition)
+
+    def bonus_coins(self, bonus_coins: dict[BonusType, list[int]]) -> tuple[dict, dict]:
+        if bonus_coins != self._bonus_stacks:
+            return super().bonus_coins(bonus_coins)
+        return self.own_bonus_coins, self.opponent_bonus_coins
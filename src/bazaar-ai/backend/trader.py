@@ -1,6 +1,10 @@
 from __future__ import annotations
-from typing import Optional, Callable
+import inspect
+from collections.abc import Sequence
+from typing import Iterable, Optional, Callable, Union
+from copy import deepcopy
 from enum import Enum
+from itertools import combinations_with_replacement, product
 
 from arelai.player import Player, Action
 
@@ -12,21 +16,118 @@ class TraderActionType(Enum):
     SELL    = "Sell"
     TRADE   = "Trade"
 
+_GOODS = list(GoodType)
+_NO_GOODS = (0,) * len(_GOODS)
+
+
 class TraderAction(Action):
+    """
+    A move by a trader: take, sell or trade goods.
+
+    Actions are immutable. Everything but the actor lives in a shape shared
+    by all equal actions (interned by type, requested and offered goods), so
+    building an action allocates no Goods and actions compare and hash by
+    (shape, actor), which makes them usable as dict keys. Treat
+    `requested_goods` and `offered_goods` as read-only: they are shared.
+    """
+
     def __init__(self,
                  trader_action_type: TraderActionType,
                  actor: Trader,
                  requested_goods: Goods,
                  offered_goods: Goods
                  ):
-        self._trader_action_type = trader_action_type
-        self.requested_goods = requested_goods
-        self.offered_goods = offered_goods
+        self._shape = _intern(
+            trader_action_type,
+            tuple(requested_goods[gt] for gt in _GOODS),
+            tuple(offered_goods[gt] for gt in _GOODS)
+        )
         super().__init__(actor)
 
     @property
     def trader_action_type(self):
-        return self._trader_action_type
+        return self._shape.action_type
+
+    @property
+    def requested_goods(self) -> Goods:
+        return self._shape.requested_goods
+
+    @property
+    def offered_goods(self) -> Goods:
+        return self._shape.offered_goods
+
+    @property
+    def _count(self) -> int:
+        return self._shape.count
+
+    @property
+    def code(self) -> int:
+        """
+        Index of this action in the canonical action table.
+
+        The code identifies the action independently of its actor and always
+        fits in 16 bits.
+
+        Raises
+        ------
+        ValueError
+            If the action falls outside the BasicBazaar limits covered by the table.
+        """
+        code = self._shape.code
+        if code is None:
+            code = self._shape.code = _action_table()[1].get(self._shape.key, -1)
+        if code < 0:
+            raise ValueError(f"{self._shape.action_type.value} action has no canonical code")
+        return code
+
+    @staticmethod
+    def code_count() -> int:
+        """Number of canonical action codes (codes range over 0..code_count()-1)."""
+        return len(_action_table()[0])
+
+    @staticmethod
+    def from_code(code: int, actor: Trader) -> 'TraderAction':
+        """
+        Rebuild the action with the given canonical code for an actor.
+
+        Parameters
+        ----------
+        code : int
+            A code produced by `TraderAction.code`.
+        actor : Trader
+            The trader performing the action.
+
+        Returns
+        -------
+        TraderAction
+            A SellAction, TakeAction or TradeAction.
+        """
+        shape = _CODE_SHAPES.get(code)
+        if shape is None:
+            shape = _CODE_SHAPES[code] = _intern(*_action_table()[0][code])
+            shape.code = code
+        return _bind(shape, actor)
+
+    def for_actor(self, actor: Trader) -> 'TraderAction':
+        """The same action performed by another trader."""
+        return _bind(self._shape, actor)
+
+    def __eq__(self, other):
+        if not isinstance(other, TraderAction):
+            return NotImplemented
+        return self._shape is other._shape and _same_actor(self.actor, other.actor)
+
+    def __hash__(self):
+        return hash((self._shape.hash, self.actor))
+
+    def __deepcopy__(self, memo):
+        # the shape is immutable and shared; only the actor is copied
+        action = _bind(self._shape, deepcopy(self.actor, memo))
+        memo[id(self)] = action
+        return action
+
+    def __reduce__(self):
+        return (_unpickle_action, (self._shape.key, self.actor))
 
 
 class SellAction(TraderAction):
@@ -41,20 +142,41 @@ class SellAction(TraderAction):
     }
     
     def __init__(self, actor: Trader, sell: GoodType, count: int):
-        
-        self._sell = sell
-        self._count = count
+        shape = _SELL_SHAPES.get((sell, count))
+        if shape is None:
+            offered = tuple(count if gt == sell else 0 for gt in _GOODS)
+            shape = _SELL_SHAPES[(sell, count)] = _intern(TraderActionType.SELL, _NO_GOODS, offered)
+        self._shape = shape
+        Action.__init__(self, actor)
 
-        requested_goods = Goods()
-        offered_goods = Goods.from_dict({sell: count})
-        
-        super().__init__(
-            TraderActionType.SELL,
-            actor,
-            requested_goods,
-            offered_goods
-            )
+    @property
+    def _sell(self) -> GoodType:
+        return self._shape.good
     
+    @staticmethod
+    def count_actions(observation: MarketObservation) -> int:
+        """Number of actions `SellAction.all_actions` would return."""
+        if observation.market_goods.count() < 5:
+            return 0
+        actor_goods = observation.actor_goods
+        return sum(
+            max(0, actor_goods[good_type] - SellAction.MIN_SELL_COUNT[good_type] + 1)
+            for good_type in GoodType if good_type != GoodType.CAMEL
+        )
+
+    @staticmethod
+    def sample_action(observation: MarketObservation, index: int) -> 'SellAction':
+        """Build the `index`-th action of `SellAction.all_actions` without the others."""
+        actor_goods = observation.actor_goods
+        for good_type in GoodType:
+            if good_type == GoodType.CAMEL:
+                continue
+            count = max(0, actor_goods[good_type] - SellAction.MIN_SELL_COUNT[good_type] + 1)
+            if index < count:
+                return SellAction(observation.actor, good_type, SellAction.MIN_SELL_COUNT[good_type] + index)
+            index -= count
+        raise IndexError("Sell action index out of range")
+
     def all_actions(observation: MarketObservation) -> list['SellAction']:
         actor = observation.actor
         actions = []
@@ -74,18 +196,40 @@ class SellAction(TraderAction):
     
 class TakeAction(TraderAction):
     def __init__(self, actor: Trader, take: GoodType, count: int):
-        
-        self._take = take
-        self._count = count
+        shape = _TAKE_SHAPES.get((take, count))
+        if shape is None:
+            requested = tuple(count if gt == take else 0 for gt in _GOODS)
+            shape = _TAKE_SHAPES[(take, count)] = _intern(TraderActionType.TAKE, requested, _NO_GOODS)
+        self._shape = shape
+        Action.__init__(self, actor)
 
-        offered_goods = Goods()
-        requested_goods = Goods.from_dict({take: count})
+    @property
+    def _take(self) -> GoodType:
+        return self._shape.good
 
-        super().__init__(
-            TraderActionType.TAKE,
-            actor,
-            requested_goods,
-            offered_goods)
+    @staticmethod
+    def _choices(observation: MarketObservation) -> list[tuple[GoodType, int]]:
+        market_goods = observation.market_goods
+        if market_goods.count() < 5:
+            return []
+        choices = []
+        if market_goods[GoodType.CAMEL] > 0:
+            choices.append((GoodType.CAMEL, market_goods[GoodType.CAMEL]))
+        if observation.actor_goods.count(include_camels=False) < observation.max_player_goods_count:
+            choices += [(good_type, 1) for good_type in GoodType
+                        if good_type != GoodType.CAMEL and market_goods[good_type] > 0]
+        return choices
+
+    @staticmethod
+    def count_actions(observation: MarketObservation) -> int:
+        """Number of actions `TakeAction.all_actions` would return."""
+        return len(TakeAction._choices(observation))
+
+    @staticmethod
+    def sample_action(observation: MarketObservation, index: int) -> 'TakeAction':
+        """Build the `index`-th action of `TakeAction.all_actions` without the others."""
+        good_type, count = TakeAction._choices(observation)[index]
+        return TakeAction(observation.actor, good_type, count)
 
     def all_actions(observation: MarketObservation) -> list['TakeAction']:
         actions = []
@@ -112,27 +256,121 @@ class TakeAction(TraderAction):
 
 class TradeAction(TraderAction):
     def __init__(self, actor: Trader, net: Goods):
-
-        requested_goods = Goods()
-        offered_goods = Goods()
-
-        for good_type in GoodType:
-            if net[good_type] > 0:
-                for _ in range(net[good_type]):
-                    requested_goods.add(good_type)
-            elif net[good_type] < 0:
-                for _ in range(abs(net[good_type])):
-                    offered_goods.add(good_type)
-
-        super().__init__(
-            TraderActionType.TRADE,
-            actor,
-            requested_goods,
-            offered_goods)
+        self._shape = _trade_shape(tuple(net[gt] for gt in _GOODS))
+        Action.__init__(self, actor)
+
+    @staticmethod
+    def _completions(observation: MarketObservation) -> tuple[list, list, int]:
+        """
+        Count legal trades by dynamic programming over good types.
+
+        A trade is a net vector over GoodType whose entries lie between minus
+        the actor's count and the market's (non-camel) count, whose positive
+        and negative parts have the same size k, with 2 <= k and room in the
+        actor's hand for k more goods. `ways[i][p][n]` is the number of ways
+        to choose the entries of good types i onwards so that their positive
+        parts sum to p and negative parts to n.
+
+        Returns
+        -------
+        tuple of (list, list, int)
+            The per-good (lowest, highest) entry, the `ways` table and the
+            largest allowed k.
+        """
+        actor_goods = observation.actor_goods
+        market_goods = observation.market_goods
+        goods = list(GoodType)
+        bounds = [
+            (-actor_goods[gt], 0 if gt == GoodType.CAMEL else market_goods[gt])
+            for gt in goods
+        ]
+        max_size = min(
+            market_goods.count(include_camels=False),
+            observation.max_player_goods_count - actor_goods.count(include_camels=False)
+        )
+        max_size = max(max_size, 0)
+
+        size = max_size + 1
+        ways = [[[0] * size for _ in range(size)] for _ in range(len(goods) + 1)]
+        ways[len(goods)][0][0] = 1
+        for i in range(len(goods) - 1, -1, -1):
+            low, high = bounds[i]
+            after, here = ways[i + 1], ways[i]
+            for p in range(size):
+                for n in range(size):
+                    total = 0
+                    for v in range(max(low, -n), min(high, p) + 1):
+                        total += after[p - v][n] if v >= 0 else after[p][n + v]
+                    here[p][n] = total
+        return bounds, ways, max_size
+
+    @staticmethod
+    def count_actions(observation: MarketObservation) -> int:
+        """Number of actions `TradeAction.all_actions` would return, without building them."""
+        if observation.market_goods.count() < 5:
+            return 0
+        actor_goods = observation.actor_goods
+        market_goods = observation.market_goods
+        bounds = [
+            (-actor_goods[gt], 0 if gt == GoodType.CAMEL else market_goods[gt])
+            for gt in _GOODS
+        ]
+        max_size = min(
+            market_goods.count(include_camels=False),
+            observation.max_player_goods_count - actor_goods.count(include_camels=False)
+        )
+        if max_size < 2:
+            return 0
+
+        # Same recurrence as `_completions`, run forward over the reachable
+        # (taken, given) sizes only
+        counts = {(0, 0): 1}
+        for low, high in bounds:
+            if low == high:
+                continue
+            reached = {}
+            for (p, n), ways in counts.items():
+                for v in range(max(low, n - max_size), min(high, max_size - p) + 1):
+                    key = (p + v, n) if v >= 0 else (p, n - v)
+                    reached[key] = reached.get(key, 0) + ways
+            counts = reached
+        return sum(counts.get((k, k), 0) for k in range(2, max_size + 1))
+
+    @staticmethod
+    def sample_action(observation: MarketObservation, index: int) -> 'TradeAction':
+        """
+        Build one legal trade without enumerating the others.
+
+        Every `index` in `range(TradeAction.count_actions(observation))` maps
+        to a distinct trade, so a uniformly random index gives a uniformly
+        random trade. (The mapping does not follow the order of `all_actions`.)
+        """
+        bounds, ways, max_size = TradeAction._completions(observation)
+        for k in range(2, max_size + 1):
+            if index < ways[0][k][k]:
+                break
+            index -= ways[0][k][k]
+        else:
+            raise IndexError("Trade action index out of range")
+
+        net = {}
+        p = n = k
+        for i, good_type in enumerate(GoodType):
+            low, high = bounds[i]
+            after = ways[i + 1]
+            for v in range(max(low, -n), min(high, p) + 1):
+                count = after[p - v][n] if v >= 0 else after[p][n + v]
+                if index < count:
+                    break
+                index -= count
+            net[good_type] = v
+            if v >= 0:
+                p -= v
+            else:
+                n += v
+        return _bind(_trade_shape(tuple(net[gt] for gt in _GOODS)), observation.actor)
 
     def all_actions(observation: MarketObservation) -> list['TradeAction']:
-        from itertools import product
-
         actor_goods = observation.actor_goods
         market_goods = observation.market_goods
 
@@ -141,60 +379,274 @@ class TradeAction(TraderAction):
         if market_goods.count() < 5:
             return []
 
-        max_take = {gt: market_goods[gt] for gt in GoodType if gt != GoodType.CAMEL}
-        max_give = {gt: actor_goods[gt] for gt in GoodType}
-
-        # Generate all combinations of give/take from -max_give to +max_take
-        ranges = {gt: range(-max_give[gt], max_take.get(gt, 0)+1) for gt in GoodType}
-        all_possible = product(*[ranges[gt] for gt in GoodType])
+        # Every net vector (in GoodType order) that gives at most what the
+        # actor has and takes at most what the market has, camels excluded
+        ranges = [
+            range(-actor_goods[gt], (0 if gt == GoodType.CAMEL else market_goods[gt]) + 1)
+            for gt in _GOODS
+        ]
+        room = observation.max_player_goods_count - actor_goods.count(include_camels=False)
 
         actions = []
-        for combo in all_possible:
-            action = TradeAction(actor, Goods.from_dict(dict(zip(GoodType, combo))))
-            
-            requested_goods = action.requested_goods
-            offered_goods = action.offered_goods
-
-            # no camels can be taken
-            if requested_goods[GoodType.CAMEL] > 0:
-                continue
-
-            # the number of goods taken must equal the number of goods given
-            if requested_goods.count() != offered_goods.count():
+        for net in product(*ranges):
+            # as many goods given as taken, at least two, and room in the hand
+            if sum(net) != 0:
                 continue
+            taken = sum(v for v in net if v > 0)
+            if 2 <= taken <= room:
+                actions.append(_bind(_trade_shape(net), actor))
+        return actions
 
-            # at least two goods must be taken
-            if requested_goods.count() < 2:
-                continue
 
-            # cannot take and give cards of the same type
-            same_type_trade = False
-            for gt in GoodType:
-                if requested_goods[gt] > 0 and offered_goods[gt] > 0:
-                    same_type_trade = True
-                    break
-            if same_type_trade:
-                continue
-            
-            # cannot take more than the actor can hold
-            requested_non_camels_count = requested_goods.count(include_camels=False)
-            if actor_goods.count(include_camels=False) + requested_non_camels_count > observation.max_player_goods_count:
-                continue 
-
-            # cannot give more than actor has or take more than market has
-            violates = False
-            if market_goods.count() < 5 and requested_goods.count() >= 1:
-                violates = True
-            for gt in GoodType:
-                if requested_goods[gt] > market_goods[gt]:
-                    violates = True
-                if offered_goods[gt] > actor_goods[gt]:
-                    violates = True
-            if violates:
-                continue
-            actions.append(action)
+_ACTION_CLASSES = {
+    TraderActionType.SELL: SellAction,
+    TraderActionType.TAKE: TakeAction,
+    TraderActionType.TRADE: TradeAction,
+}
+
+# Order of the kinds in Bazaar.all_actions
+_ACTION_ORDER = (TradeAction, SellAction, TakeAction)
+
+
+class ActionSequence(Sequence):
+    """
+    The legal actions of an observation, enumerated lazily by kind.
+
+    A read-only sequence in the order of `Bazaar.all_actions` (trades, then
+    sales, then takes). `len` only counts the actions, and each kind is
+    enumerated the first time one of its actions is needed, so an agent
+    that looks at the sales first (`actions.of_kind(SellAction)`) or picks
+    a random action never pays for building the trades.
+
+    The actions are generated from the observation when first needed: do
+    not modify the state in place before enumerating them.
+    """
+
+    __slots__ = ('_observation', '_classes', '_counts', '_lists')
+
+    def __init__(self, observation: MarketObservation, kinds: Optional[Iterable] = None):
+        self._observation = observation
+        self._classes = _action_classes(kinds)
+        self._counts = {}
+        self._lists = {}
+
+    def of_kind(self, *kinds: Union[TraderActionType, type]) -> 'ActionSequence':
+        """
+        The actions of the given kinds only, in the same order.
+
+        Parameters
+        ----------
+        *kinds : TraderActionType or TraderAction subclass
+            The kinds to keep, e.g. `SellAction` or `TraderActionType.SELL`.
+
+        Returns
+        -------
+        ActionSequence
+            A sequence sharing the actions already enumerated.
+        """
+        sequence = ActionSequence.__new__(ActionSequence)
+        sequence._observation = self._observation
+        sequence._classes = tuple(cls for cls in _action_classes(kinds) if cls in self._classes)
+        sequence._counts = self._counts
+        sequence._lists = self._lists
+        return sequence
+
+    def _count(self, cls: type) -> int:
+        actions = self._lists.get(cls)
+        if actions is not None:
+            return len(actions)
+        count = self._counts.get(cls)
+        if count is None:
+            count = self._counts[cls] = cls.count_actions(self._observation)
+        return count
+
+    def _actions(self, cls: type) -> list[TraderAction]:
+        actions = self._lists.get(cls)
+        if actions is None:
+            actions = self._lists[cls] = cls.all_actions(self._observation)
         return actions
 
+    def __len__(self):
+        return sum(self._count(cls) for cls in self._classes)
+
+    def to_list(self) -> list[TraderAction]:
+        """
+        All the actions as a list.
+
+        Cheaper than `list(actions)`, which counts the actions before
+        enumerating them.
+        """
+        return [action for cls in self._classes for action in self._actions(cls)]
+
+    def __iter__(self):
+        for cls in self._classes:
+            yield from self._actions(cls)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= 0:
+            for cls in self._classes:
+                count = self._count(cls)
+                if index < count:
+                    return self._actions(cls)[index]
+                index -= count
+        raise IndexError("action index out of range")
+
+    def __contains__(self, action):
+        cls = type(action)
+        return cls in self._classes and action in self._actions(cls)
+
+    def __eq__(self, other):
+        if isinstance(other, ActionSequence):
+            other = other.to_list()
+        elif not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return self.to_list() == list(other)
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return self.to_list() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.to_list()
+
+    def __repr__(self):
+        return f"ActionSequence({self.to_list()!r})"
+
+    def __reduce__(self):
+        return (list, (self.to_list(),))
+
+
+def _action_classes(kinds: Optional[Iterable]) -> tuple:
+    """Action classes of the given kinds (all by default), in `_ACTION_ORDER`."""
+    if kinds is None:
+        return _ACTION_ORDER
+    if isinstance(kinds, (type, TraderActionType)):
+        kinds = (kinds,)
+    classes = {_ACTION_CLASSES.get(kind, kind) for kind in kinds}
+    unknown = classes.difference(_ACTION_ORDER)
+    if unknown:
+        raise ValueError(f"Unknown action kinds: {unknown}")
+    return tuple(cls for cls in _ACTION_ORDER if cls in classes)
+
+
+class _ActionShape:
+    """The actor-independent part of an action, shared by all equal actions."""
+
+    __slots__ = ('key', 'hash', 'action_type', 'requested_goods', 'offered_goods',
+                 'good', 'count', 'code', 'cls')
+
+    def __init__(self, key: tuple):
+        action_type, requested, offered = key
+        self.key = key
+        self.hash = hash(key)
+        self.action_type = action_type
+        self.requested_goods = Goods.from_dict(dict(zip(_GOODS, requested)))
+        self.offered_goods = Goods.from_dict(dict(zip(_GOODS, offered)))
+        self.code = None
+        self.cls = _ACTION_CLASSES[action_type]
+
+        # the good type and count of a take or a sale
+        self.good, self.count = None, None
+        if action_type != TraderActionType.TRADE:
+            moved = offered if action_type == TraderActionType.SELL else requested
+            self.good, self.count = next(((gt, c) for gt, c in zip(_GOODS, moved) if c), (None, 0))
+
+
+# Interned shapes, by (type, requested counts, offered counts) and by the
+# arguments of each action constructor
+_SHAPES = {}
+_SELL_SHAPES = {}
+_TAKE_SHAPES = {}
+_TRADE_SHAPES = {}
+_CODE_SHAPES = {}
+
+
+def _intern(action_type: TraderActionType, requested: tuple, offered: tuple) -> _ActionShape:
+    key = (action_type, requested, offered)
+    shape = _SHAPES.get(key)
+    if shape is None:
+        shape = _SHAPES[key] = _ActionShape(key)
+    return shape
+
+
+def _trade_shape(net: tuple) -> _ActionShape:
+    shape = _TRADE_SHAPES.get(net)
+    if shape is None:
+        requested = tuple(max(v, 0) for v in net)
+        offered = tuple(max(-v, 0) for v in net)
+        shape = _TRADE_SHAPES[net] = _intern(TraderActionType.TRADE, requested, offered)
+    return shape
+
+
+def _bind(shape: _ActionShape, actor: Trader) -> TraderAction:
+    action = shape.cls.__new__(shape.cls)
+    action._shape = shape
+    action.actor = actor
+    return action
+
+
+def _unpickle_action(key: tuple, actor: Trader) -> TraderAction:
+    return _bind(_intern(*key), actor)
+
+
+def _same_actor(a: Trader, b: Trader) -> bool:
+    return a is b or (a is not None and b is not None and a == b)
+
+
+# Limits covered by the canonical action table (those of BasicBazaar).
+# The table order is part of the game record format: only ever append to it.
+MAX_MARKET_GOODS = 5
+MAX_TRADER_GOODS = 7
+
+_ACTION_TABLE = None
+
+
+def _action_table():
+    """
+    Build (once) the canonical action table.
+
+    Returns
+    -------
+    tuple of (list, dict)
+        The (type, requested counts, offered counts) key of every action, in
+        code order, and the reverse mapping from key to code.
+    """
+    global _ACTION_TABLE
+    if _ACTION_TABLE is not None:
+        return _ACTION_TABLE
+
+    goods = list(GoodType)
+    no_goods = (0,) * len(goods)
+    non_camels = [i for i, gt in enumerate(goods) if gt != GoodType.CAMEL]
+
+    def counts(indices):
+        lst = [0] * len(goods)
+        for i in indices:
+            lst[i] += 1
+        return tuple(lst)
+
+    keys = []
+    for i, good_type in enumerate(goods):
+        take_counts = range(1, MAX_MARKET_GOODS + 1) if good_type == GoodType.CAMEL else (1,)
+        for count in take_counts:
+            keys.append((TraderActionType.TAKE, counts([i] * count), no_goods))
+    for i in non_camels:
+        for count in range(1, MAX_TRADER_GOODS + 1):
+            keys.append((TraderActionType.SELL, no_goods, counts([i] * count)))
+    for size in range(2, MAX_MARKET_GOODS + 1):
+        for requested in combinations_with_replacement(non_camels, size):
+            for offered in combinations_with_replacement(range(len(goods)), size):
+                if set(requested).isdisjoint(offered):
+                    keys.append((TraderActionType.TRADE, counts(requested), counts(offered)))
+
+    _ACTION_TABLE = (keys, {key: code for code, key in enumerate(keys)})
+    return _ACTION_TABLE
+
 
 class Trader(Player):
     def __init__(self,
@@ -203,7 +655,7 @@ class Trader(Player):
         super().__init__(seed, name)
 
     def select_action(self,
-                      actions: list[TraderAction],
+                      actions: Sequence[TraderAction],
                       observation: MarketObservation,
                       simulate_action_fnc: Callable[[TraderAction], MarketObservation]):
         return self.rng.choice(actions)
@@ -213,4 +665,29 @@ class Trader(Player):
                          new_observation: MarketObservation,
                          has_acted: bool,
                          environment_reward: Optional[float]):
-        pass
\ No newline at end of file
+        pass
+
+    @classmethod
+    def uses_rewards(cls) -> bool:
+        """
+        Whether the trader overrides `calculate_reward`.
+
+        `Bazaar.step` skips the callback, and the observations it would be
+        given, for traders that do not.
+        """
+        return cls.calculate_reward is not Trader.calculate_reward
+
+    @classmethod
+    def accepts_budget(cls) -> bool:
+        """
+        Whether the trader's `select_action` takes a `budget` keyword.
+
+        Games played under a time control (see `backend.clock`) pass such
+        traders the `MoveBudget` of each move.
+        """
+        accepts = cls.__dict__.get('_accepts_budget')
+        if accepts is None:
+            parameters = inspect.signature(cls.select_action).parameters.values()
+            accepts = any(p.name == 'budget' or p.kind == p.VAR_KEYWORD for p in parameters)
+            cls._accepts_budget = accepts
+        return accepts
\ No newline at end of file
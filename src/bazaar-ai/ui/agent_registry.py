@@ -0,0 +1,239 @@
+"""
+Lazy, cached discovery of agent classes in the agents folder
+
+Agent files are scanned with `ast` (nothing is executed) and the result is
+cached in a manifest keyed by file mtime, so startup only parses files that
+changed since the last run. A module is imported the first time one of its
+agents is selected, and re-imported whenever its file changes on disk.
+
+Without importing anything, a class is recognised as an agent when one of its
+bases is `Trader`, or a class recognised in the same file or in another file
+of the agents folder (imported as `from simple_agent import SmartAgent` or
+`import simple_agent`). Agents that only subclass Trader through a class from
+outside the agents folder (other than Trader itself) are not found.
+"""
+
+import ast
+import importlib.util
+import json
+import sys
+from collections.abc import Mapping
+from threading import Lock
+
+from backend.trader import Trader
+
+MANIFEST_VERSION = 2
+
+
+def scan_classes(source):
+    """
+    Return the bases of the top-level classes in `source`, by class name.
+
+    Each base is given as 'module:Name', where module is the module the name
+    was imported from, or empty for a name of the file itself.
+    """
+    tree = ast.parse(source)
+    imported = {}  # local name -> 'module:Name'
+    modules = {}  # local name -> module
+    classes = {}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                imported[alias.asname or alias.name] = f"{node.module or ''}:{alias.name}"
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                modules[alias.asname or alias.name] = alias.name
+        elif isinstance(node, ast.ClassDef):
+            bases = []
+            for base in node.bases:
+                if isinstance(base, ast.Name):
+                    bases.append(imported.get(base.id, f":{base.id}"))
+                elif isinstance(base, ast.Attribute):
+                    module = ast.unparse(base.value)
+                    bases.append(f"{modules.get(module, module)}:{base.attr}")
+            classes[node.name] = bases
+    return classes
+
+
+def find_trader_classes(entries):
+    """
+    Return the names of the Trader subclasses of every scanned file.
+
+    Parameters
+    ----------
+    entries : dict
+        Manifest entries by file name, with the `scan_classes` of each file.
+
+    Returns
+    -------
+    dict
+        File name -> names of its classes that subclass Trader, through
+        classes of the same file or of the other files.
+    """
+    known = {}
+
+    def is_trader(module, class_name, visiting):
+        key = (module, class_name)
+        if key not in known:
+            entry = entries.get(module + '.py')
+            bases = entry['classes'].get(class_name) if entry and not entry['error'] else None
+            if bases is None or key in visiting:
+                return False
+            visiting.add(key)
+            known[key] = any(
+                base_class == 'Trader'
+                # an agent file is imported under its file name
+                or is_trader(base_module.rpartition('.')[2] or module, base_class, visiting)
+                for base_module, _, base_class in (base.rpartition(':') for base in bases)
+            )
+        return known[key]
+
+    return {
+        file_name: [class_name for class_name in entry['classes'] if is_trader(file_name[:-3], class_name, set())]
+        for file_name, entry in entries.items()
+        if not entry['error']
+    }
+
+
+def display_name(class_name):
+    return class_name.replace('Agent', '').replace('_', ' ').title()
+
+
+class AgentRegistry(Mapping):
+    """
+    Mapping from agent id (module name) to agent info.
+
+    Iterating or checking membership only uses the manifest; indexing imports
+    the agent's module on demand and fills in the info's 'class' entry.
+    """
+
+    def __init__(self, agents_dir, manifest_path):
+        self.agents_dir = agents_dir
+        self.manifest_path = manifest_path
+        self.lock = Lock()
+        self._entries = self._read_manifest()  # file name -> manifest entry
+        self._loaded = {}  # module name -> (mtime_ns, class)
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest['agents']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def _write_manifest(self):
+        try:
+            with open(self.manifest_path, 'w') as f:
+                json.dump({'version': MANIFEST_VERSION, 'agents': self._entries}, f, indent=2)
+        except OSError as e:
+            print(f"⚠️  Could not write agent manifest: {e}")
+
+    def _scan_file(self, agent_file, stat):
+        entry = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'classes': {}, 'error': None}
+        try:
+            entry['classes'] = scan_classes(agent_file.read_text(encoding='utf-8'))
+        except (OSError, SyntaxError, ValueError) as e:
+            entry['error'] = str(e)
+            print(f"  ✗ Error loading {agent_file.name}: {e}")
+        return entry
+
+    def refresh(self):
+        """Re-stat the agents folder, parsing only new or modified files"""
+        with self.lock:
+            if not self.agents_dir.exists():
+                if self._entries:
+                    self._entries = {}
+                    self._write_manifest()
+                return
+
+            changed = []
+            seen = set()
+            for agent_file in sorted(self.agents_dir.glob('*.py')):
+                if agent_file.name.startswith('_'):
+                    continue
+                seen.add(agent_file.name)
+
+                stat = agent_file.stat()
+                entry = self._entries.get(agent_file.name)
+                if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                    continue
+
+                self._entries[agent_file.name] = self._scan_file(agent_file, stat)
+                changed.append(agent_file.name)
+
+            for file_name in set(self._entries) - seen:
+                del self._entries[file_name]
+                self._loaded.pop(file_name[:-3], None)
+                changed.append(file_name)
+
+            if changed:
+                self._write_manifest()
+                trader_classes = find_trader_classes(self._entries)
+                for file_name in changed:
+                    for class_name in trader_classes.get(file_name, []):
+                        print(f"  ✓ Found agent: {display_name(class_name)} ({class_name})")
+
+    def _info(self, file_name, classes):
+        # As with a full module scan, the last agent class (by name) wins
+        class_name = sorted(classes)[-1]
+        module_name = file_name[:-3]
+        return {
+            'name': display_name(class_name),
+            'module': module_name,
+            'file': file_name,
+            'class_name': class_name
+        }
+
+    def _agents(self):
+        return {
+            file_name[:-3]: (file_name, classes)
+            for file_name, classes in find_trader_classes(self._entries).items()
+            if classes
+        }
+
+    def __iter__(self):
+        return iter(self._agents())
+
+    def __len__(self):
+        return len(self._agents())
+
+    def __contains__(self, agent_id):
+        return agent_id in self._agents()
+
+    def __getitem__(self, agent_id):
+        """Return the agent's info, importing (or re-importing) its module if needed"""
+        self.refresh()
+        file_name, classes = self._agents()[agent_id]
+        info = self._info(file_name, classes)
+        info['class'] = self._load_class(info)
+        return info
+
+    def items(self):
+        """Agent infos without importing any module ('class' is not filled in)"""
+        return [(agent_id, self._info(*value)) for agent_id, value in self._agents().items()]
+
+    def _load_class(self, info):
+        agent_file = self.agents_dir / info['file']
+        module_name = info['module']
+
+        with self.lock:
+            mtime_ns = agent_file.stat().st_mtime_ns
+            loaded = self._loaded.get(module_name)
+            if loaded and loaded[0] == mtime_ns:
+                return loaded[1]
+
+            print(f"📦 Importing agent module {info['file']}")
+            spec = importlib.util.spec_from_file_location(module_name, agent_file)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+
+            item = getattr(module, info['class_name'], None)
+            if not (isinstance(item, type) and issubclass(item, Trader) and item is not Trader):
+                raise ImportError(f"{info['class_name']} in {info['file']} is not a Trader subclass")
+
+            self._loaded[module_name] = (mtime_ns, item)
+            return item
@@ -0,0 +1,577 @@
+"""
+Asyncio serving mode for Bazaar
+
+Serves the same /api/* surface as app.py from a single event loop (Quart on
+Hypercorn), so idle polling connections cost no threads. Bot pacing and player
+heartbeat expiry run as async timers, and agent decisions are offloaded to a
+thread pool so a slow agent never blocks the loop. Scanning the agents folder
+and importing agent modules run in threads too.
+"""
+
+import asyncio
+import io
+import time
+
+from quart import Quart, send_file, jsonify, request
+from quart_cors import cors
+
+from game_session import BASE_DIR, AVAILABLE_AGENTS, GameState, HumanPlayer, action_to_dict, load_agent
+from backend.record import GameRecord
+from backend.clock import TimeControl, select_action_with_budget
+
+app = Quart(__name__)
+app = cors(app)
+
+# Seconds between heartbeat expiry checks
+HEARTBEAT_INTERVAL = 1.0
+
+
+class AsyncGameState(GameState):
+    """Game state whose bot loops run as asyncio tasks instead of threads"""
+
+    def __init__(self, max_workers=4):
+        super().__init__(max_workers)
+        self.bot_task = None
+        self.heartbeat_task = None
+
+    def _start_bot_game(self):
+        self.bot_task = asyncio.get_running_loop().create_task(self.run_bot_game_async())
+
+    def _schedule_bot_turn(self):
+        asyncio.get_running_loop().create_task(self._execute_bot_turn_async())
+
+    def _stop_bot_game(self):
+        if self.bot_running:
+            self.bot_running = False
+            if self.bot_task:
+                self.bot_task.cancel()
+
+    async def expire_stale_players_periodically(self):
+        """Heartbeat timer: expire players that stopped pinging"""
+        while True:
+            self.expire_stale_players()
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def _select_action_async(self, current_player, actions, observation, simulate_action):
+        """
+        Run the agent's select_action in the executor, under the time control.
+
+        A bot still busy with a move it ran out of time for is not called
+        again until that call returns, which counts against the new move.
+
+        Returns the chosen action, or None if the bot timed out or raised (in
+        which case bot_timeout_player and game_over are set).
+        """
+        clock = self.clock
+        budget = clock.start_move(current_player) if clock else None
+        previous = self.agent_futures.get(current_player.name)
+        if previous is not None and not previous.done():
+            await asyncio.wait([asyncio.wrap_future(previous)], timeout=budget.remaining() if budget else None)
+            if not previous.done():
+                return self._finish_move(clock, current_player, budget, None, timed_out=True)
+        future = self.executor.submit(
+            select_action_with_budget, current_player, actions, observation, simulate_action, budget
+        )
+        self.agent_futures[current_player.name] = future
+        try:
+            action = await asyncio.wait_for(asyncio.wrap_future(future),
+                                            timeout=budget.remaining() if budget else None)
+        except asyncio.TimeoutError:
+            return self._finish_move(clock, current_player, budget, None, timed_out=True)
+        except Exception as e:
+            print(f"❌ Bot {current_player.name} error: {e}")
+            self.bot_timeout_player = current_player.name
+            self.game_over = True
+            return None
+        return self._finish_move(clock, current_player, budget, action)
+
+    async def run_bot_game_async(self):
+        """Run the game automatically with bot players"""
+        print("🤖 Bot game task started")
+
+        try:
+            while self.bot_running and not self.game_over:
+                # Check if paused (wait until unpaused or step requested)
+                while self.bot_paused and not self.bot_step_requested and self.bot_running:
+                    await asyncio.sleep(0.1)  # Check every 100ms
+
+                # If we're exiting due to stop, break
+                if not self.bot_running:
+                    break
+
+                # If step was requested, clear the flag
+                if self.bot_step_requested:
+                    self.bot_step_requested = False
+
+                with self.lock:
+                    if not self.game or self.game.terminal(self.game.state):
+                        self.game_over = True
+                        print("🏁 Bot game finished")
+                        break
+
+                    game = self.game
+                    state = game.state
+                    current_player = state.actor
+                    actions = game.all_actions(current_player, state)
+
+                    if not actions:
+                        print(f"⚠️  No legal actions for {current_player.name}")
+                        break
+
+                    observation = game.observe(current_player, state)
+
+                    simulate_action = game.simulator(current_player, state)
+
+                # The lock is released while the agent thinks in the executor
+                action = await self._select_action_async(current_player, actions, observation, simulate_action)
+
+                if self.game_over:
+                    break
+
+                if not action:
+                    print(f"⚠️  Bot {current_player.name} returned no action")
+                    break
+
+                with self.lock:
+                    if self.game is not game or game.state is not state:
+                        break  # Game was reset while the agent was thinking
+
+                    # Execute the action and update rewards
+                    self._apply_turn(action)
+
+                    print(f"🎮 Round {game.round}: {current_player.name} played {action.trader_action_type.value}")
+
+                # Wait between moves to make it watchable (only if not paused)
+                if not self.bot_paused:
+                    # Apply speed multiplier: lower speed = longer delay
+                    await asyncio.sleep(self.bot_delay / self.bot_speed)
+
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"❌ Error in bot game: {e}")
+            import traceback
+            traceback.print_exc()
+
+        self.bot_running = False
+        print("🤖 Bot game task stopped")
+
+    async def _execute_bot_turn_async(self):
+        """Execute a bot turn (used in human-vs-bot mode)"""
+        await asyncio.sleep(0.5)  # Small delay for visual effect
+
+        with self.lock:
+            if not self.game or self.game.terminal(self.game.state):
+                return
+
+            game = self.game
+            state = game.state
+            current_player = state.actor
+            if isinstance(current_player, HumanPlayer):
+                return  # Don't execute if it's a human's turn
+
+            actions = game.all_actions(current_player, state)
+
+            if not actions:
+                print(f"⚠️  No legal actions for {current_player.name}")
+                return
+
+            observation = game.observe(current_player, state)
+
+            simulate_action = game.simulator(current_player, state)
+
+        chosen_action = await self._select_action_async(
+            current_player, actions, observation, simulate_action
+        )
+
+        if not chosen_action:
+            if self.game_over:
+                self.waiting_for_player = None
+            return
+
+        with self.lock:
+            if self.game is not game or game.state is not state:
+                return  # Game was reset while the agent was thinking
+
+            print(f"🤖 Bot {current_player.name} chose: {chosen_action.trader_action_type.value}")
+
+            # Execute the action
+            self._apply_turn(chosen_action)
+
+            if game.terminal(game.state):
+                self.game_over = True
+                self.waiting_for_player = None
+                print("🏁 Game Over!")
+            else:
+                # Check if next turn is also bot (shouldn't happen in human-vs-bot)
+                next_actor = game.state.actor
+                if isinstance(next_actor, HumanPlayer):
+                    self.waiting_for_player = next_actor.player_id
+                else:
+                    # Chain bot turns if needed
+                    self._schedule_bot_turn()
+
+
+# Global game state
+game_state = AsyncGameState()
+
+
+@app.before_serving
+async def start_timers():
+    game_state.heartbeat_task = asyncio.get_running_loop().create_task(
+        game_state.expire_stale_players_periodically()
+    )
+
+
+@app.after_serving
+async def stop_timers():
+    game_state.reset()
+    if game_state.heartbeat_task:
+        game_state.heartbeat_task.cancel()
+    game_state.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _send_page(name):
+    page_path = BASE_DIR / name
+    page_orig_path = BASE_DIR / f'{name}.original'
+
+    if page_path.exists():
+        return await send_file(page_path)
+    elif page_orig_path.exists():
+        return await send_file(page_orig_path)
+    else:
+        return f"Error: {name} not found in {BASE_DIR}", 404
+
+
+@app.route('/')
+async def index():
+    return await _send_page('host.html')
+
+
+@app.route('/host.html')
+async def host():
+    return await _send_page('host.html')
+
+
+@app.route('/player.html')
+async def player():
+    return await _send_page('player.html')
+
+
+@app.route('/shared.js')
+async def shared_js():
+    shared_path = BASE_DIR / 'shared.js'
+
+    if shared_path.exists():
+        return await send_file(shared_path, mimetype='application/javascript')
+    else:
+        return f"Error: shared.js not found in {BASE_DIR}", 404
+
+
+@app.route('/api/agents')
+async def get_agents():
+    """Get list of available agents (picks up new or changed agent files)"""
+    await asyncio.to_thread(AVAILABLE_AGENTS.refresh)
+    agents_list = [
+        {
+            'id': agent_id,
+            'name': info['name'],
+            'module': info['module'],
+            'file': info['file']
+        }
+        for agent_id, info in AVAILABLE_AGENTS.items()
+    ]
+    return jsonify({'agents': agents_list})
+
+
+@app.route('/api/set_mode', methods=['POST'])
+async def set_mode():
+    """Set the pending game mode (called when user selects a mode on setup screen)"""
+    data = await request.get_json()
+    mode = data.get('mode')
+
+    if mode in ['human-vs-human', 'human-vs-bot', 'bot-vs-bot']:
+        game_state.pending_mode = mode
+        print(f"Pending mode set to: {mode}")
+        return jsonify({'success': True})
+
+    return jsonify({'error': 'Invalid mode'}), 400
+
+
+@app.route('/api/connect', methods=['POST'])
+async def connect():
+    data = await request.get_json()
+    client_type = data.get('clientType')
+
+    print(f"Connection request: clientType={client_type}")
+
+    if client_type == 'player':
+        # If bot-vs-bot mode is selected, reject all player connections
+        if game_state.pending_mode == 'bot-vs-bot':
+            return jsonify({'error': 'Bot vs Bot mode - human players cannot connect'}), 400
+
+        # If human-vs-bot mode is selected, only allow player 1 to connect
+        if game_state.pending_mode == 'human-vs-bot':
+            if not game_state.player1_connected:
+                game_state.player1_connected = True
+                game_state.last_player1_ping = time.time()
+                print("Assigned as Player 1 (Human vs Bot mode)")
+                return jsonify({'playerId': 'player1', 'playerName': 'Player 1', 'sessionId': 'player1'})
+            else:
+                return jsonify({'error': 'Human vs Bot mode - only one player can connect'}), 400
+
+        # Human-vs-human mode (default) - allow both players
+        if not game_state.player1_connected:
+            game_state.player1_connected = True
+            game_state.last_player1_ping = time.time()
+            print("Assigned as Player 1")
+            return jsonify({'playerId': 'player1', 'playerName': 'Player 1', 'sessionId': 'player1'})
+        elif not game_state.player2_connected:
+            game_state.player2_connected = True
+            game_state.last_player2_ping = time.time()
+            print("Assigned as Player 2")
+            return jsonify({'playerId': 'player2', 'playerName': 'Player 2', 'sessionId': 'player2'})
+        else:
+            return jsonify({'error': 'Game is full'}), 400
+
+    return jsonify({'success': True})
+
+
+@app.route('/api/ping', methods=['POST'])
+async def ping():
+    data = await request.get_json()
+    player_id = data.get('playerId') or data.get('sessionId')
+
+    if player_id == 'player1':
+        game_state.last_player1_ping = time.time()
+    elif player_id == 'player2':
+        game_state.last_player2_ping = time.time()
+
+    return jsonify({'success': True})
+
+
+@app.route('/api/debug')
+async def debug():
+    """Debug endpoint to check connection state"""
+    return jsonify({
+        'player1_connected': game_state.player1_connected,
+        'player2_connected': game_state.player2_connected,
+        'last_player1_ping': game_state.last_player1_ping,
+        'last_player2_ping': game_state.last_player2_ping,
+        'current_time': time.time()
+    })
+
+
+@app.route('/api/state')
+async def get_state():
+    # Disconnected players are expired by the heartbeat timer
+    return jsonify(game_state.get_public_state())
+
+
+@app.route('/api/player_state')
+async def get_player_state():
+    player_id = request.args.get('playerId')
+
+    if player_id == 'player1' and game_state.player1:
+        player_state = game_state.get_player_state(game_state.player1)
+    elif player_id == 'player2' and game_state.player2:
+        player_state = game_state.get_player_state(game_state.player2)
+    else:
+        player_state = {'type': 'private', 'gameStarted': False, 'myTurn': False, 'goods': {}}
+
+    return jsonify(player_state)
+
+
+@app.route('/api/legal_actions')
+async def get_legal_actions():
+    player_id = request.args.get('playerId')
+
+    if player_id == 'player1' and game_state.player1:
+        player = game_state.player1
+    elif player_id == 'player2' and game_state.player2:
+        player = game_state.player2
+    else:
+        return jsonify({'error': 'Invalid player'}), 400
+
+    legal_actions = game_state.legal_actions(player)
+    return jsonify({
+        'round': game_state.game.round if game_state.game else 0,
+        'legalActions': [action_to_dict(action) for action in legal_actions.values()]
+    })
+
+
+@app.route('/api/start', methods=['POST'])
+async def start_game():
+    data = await request.get_json()
+    mode = data.get('mode', 'human')
+    agent1_id = data.get('agent1')
+    agent2_id = data.get('agent2')
+
+    # Import the agents' modules off the loop; create_game then finds them loaded
+    for agent_id in {agent1_id, agent2_id}:
+        if agent_id in AVAILABLE_AGENTS:
+            await asyncio.to_thread(load_agent, agent_id)
+
+    if game_state.create_game(mode=mode, agent1_id=agent1_id, agent2_id=agent2_id):
+        return jsonify({'success': True})
+    return jsonify({'error': 'Cannot start game'}), 400
+
+
+@app.route('/api/action', methods=['POST'])
+async def submit_action():
+    data = await request.get_json()
+    player_id = data.get('playerId')
+    action_dict = data.get('action')
+
+    player = None
+    if player_id == 'player1' and game_state.player1:
+        player = game_state.player1
+    elif player_id == 'player2' and game_state.player2:
+        player = game_state.player2
+
+    if not player:
+        return jsonify({'error': 'Invalid player'}), 400
+
+    if game_state.game.state.actor != player:
+        return jsonify({'error': 'Not your turn'}), 400
+
+    action = game_state.legal_action(player, action_dict)
+    if not action:
+        return jsonify({'error': 'Invalid action: not a legal move'}), 400
+
+    if game_state.execute_turn(action):
+        return jsonify({'success': True})
+
+    return jsonify({'error': 'Failed to execute action'}), 400
+
+
+@app.route('/api/reset', methods=['POST'])
+async def reset_game():
+    game_state.reset()
+    return jsonify({'success': True})
+
+
+@app.route('/api/record')
+async def download_record():
+    """Download the binary GameRecord of the current (or last) game"""
+    if not game_state.record:
+        return jsonify({'error': 'No game recorded'}), 404
+
+    return await send_file(
+        io.BytesIO(game_state.record.to_bytes()),
+        mimetype='application/octet-stream',
+        as_attachment=True,
+        download_name=f'bazaar-{game_state.record.seed}.bzr'
+    )
+
+
+@app.route('/api/replay/load', methods=['POST'])
+async def load_replay():
+    """Load a stored game for scrubbing: a raw record body, or the current game's record"""
+    try:
+        if request.mimetype == 'application/octet-stream':
+            loaded = game_state.load_replay(GameRecord.from_bytes(await request.get_data()))
+        else:
+            loaded = game_state.load_replay()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid game record: {e}'}), 400
+
+    if not loaded:
+        return jsonify({'error': 'No game recorded'}), 404
+    return jsonify({'success': True, 'turns': len(game_state.replay_record)})
+
+
+@app.route('/api/replay/seek')
+async def seek_replay():
+    """Get the board of the loaded replay after `turn` actions"""
+    if not game_state.replay_record:
+        return jsonify({'error': 'No replay loaded'}), 404
+
+    turn = request.args.get('turn', type=int, default=0)
+    if not 0 <= turn <= len(game_state.replay_record):
+        return jsonify({'error': f'Turn must be between 0 and {len(game_state.replay_record)}'}), 400
+
+    return jsonify(game_state.seek_replay(turn))
+
+
+@app.route('/api/bot/pause', methods=['POST'])
+async def pause_bot():
+    """Pause the bot game"""
+    if game_state.game_mode == 'bot':
+        game_state.bot_paused = True
+        print("⏸️  Bot game paused")
+        return jsonify({'success': True, 'paused': True})
+    return jsonify({'error': 'Not in bot mode'}), 400
+
+
+@app.route('/api/bot/resume', methods=['POST'])
+async def resume_bot():
+    """Resume the bot game"""
+    if game_state.game_mode == 'bot':
+        game_state.bot_paused = False
+        print("▶️  Bot game resumed")
+        return jsonify({'success': True, 'paused': False})
+    return jsonify({'error': 'Not in bot mode'}), 400
+
+
+@app.route('/api/bot/step', methods=['POST'])
+async def step_bot():
+    """Execute one step in the bot game"""
+    if game_state.game_mode == 'bot':
+        if not game_state.bot_paused:
+            game_state.bot_paused = True
+            print("⏸️  Bot game paused (for step)")
+        game_state.bot_step_requested = True
+        print("👣 Bot step requested")
+        return jsonify({'success': True})
+    return jsonify({'error': 'Not in bot mode'}), 400
+
+
+@app.route('/api/bot/speed', methods=['POST'])
+async def set_bot_speed():
+    """Set the bot game speed"""
+    if game_state.game_mode == 'bot':
+        data = await request.get_json()
+        speed = data.get('speed', 1.0)
+        # Clamp speed between 0.25x and 4x
+        game_state.bot_speed = max(0.25, min(4.0, float(speed)))
+        print(f"⚡ Bot speed set to {game_state.bot_speed}x")
+        return jsonify({'success': True, 'speed': game_state.bot_speed})
+    return jsonify({'error': 'Not in bot mode'}), 400
+
+
+@app.route('/api/bot/timeout', methods=['POST'])
+async def set_bot_timeout():
+    """Set the bot timeout in seconds (0 = disabled)"""
+    data = await request.get_json()
+    timeout = data.get('timeout', 30.0)
+    # Clamp timeout between 0 (disabled) and 300 seconds (5 minutes)
+    timeout = max(0, min(300.0, float(timeout)))
+    game_state.set_time_control(TimeControl.fixed(timeout) if timeout > 0 else None)
+    print(f"⏱️  Bot timeout set to {game_state.bot_timeout}s {'(disabled)' if game_state.bot_timeout == 0 else ''}")
+    return jsonify({'success': True, 'timeout': game_state.bot_timeout})
+
+
+@app.route('/api/bot/time_control', methods=['POST'])
+async def set_time_control():
+    """Set the bots' clocks: {perMove, total, increment} in seconds (all empty = unlimited)"""
+    try:
+        time_control = TimeControl.from_dict(await request.get_json() or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid time control: {e}'}), 400
+    game_state.set_time_control(time_control)
+    print(f"⏱️  Time control set to {time_control or 'unlimited'}")
+    return jsonify({'success': True, 'timeControl': time_control.to_dict() if time_control else None})
+
+
+@app.route('/api/get_player_url', methods=['GET'])
+async def get_player_url():
+    """Get the player URL for QR code generation"""
+    host = request.host.split(':')[0]
+    port = request.host.split(':')[1] if ':' in request.host else '5000'
+    player_url = f"http://{host}:{port}/player.html"
+    return jsonify({'playerUrl': player_url})
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5000, debug=False)
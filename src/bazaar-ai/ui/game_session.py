@@ -0,0 +1,736 @@
+"""
+Game state shared by the Bazaar servers
+
+Holds everything app.py (Flask) and async_app.py (Quart) have in common: the
+agent registry, the human player stand-in and the GameState that runs games.
+Importing it creates no web application.
+"""
+
+import time
+import sys
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from threading import Lock, Thread
+from pathlib import Path
+
+# Get the directory where this script is located
+BASE_DIR = Path(__file__).parent.absolute()
+
+# Add the parent folder to sys.path to enable importing backend as a package
+sys.path.insert(0, str(BASE_DIR.parent))
+
+# Now import from local backend package
+from backend.bazaar import BasicBazaar
+from backend.trader import Trader, SellAction, TakeAction, TradeAction
+from backend.goods import GoodType, Goods
+from backend.coins import BonusType
+from backend.record import GameRecord
+from backend.clock import TimeControl, GameClock, select_action_with_budget
+
+from agent_registry import AgentRegistry
+
+# Seconds without a ping before a player is considered disconnected
+PLAYER_TIMEOUT = 10
+
+# Turns between the Market checkpoints embedded in game records
+REPLAY_CHECKPOINT_INTERVAL = 8
+
+
+def discover_agents():
+    """Build the lazy agent registry for the agents folder"""
+    # Look for agents folder at the repository root level
+    agents_dir = BASE_DIR.parent.parent.parent / 'agents'
+    
+    # Ensure backend is in sys.path for agent imports
+    # (Already added earlier but ensure it's there for agent loading)
+    backend_parent = BASE_DIR.parent
+    if str(backend_parent) not in sys.path:
+        sys.path.insert(0, str(backend_parent))
+    
+    if not agents_dir.exists():
+        print(f"⚠️  Agents folder not found: {agents_dir}")
+    else:
+        print(f"\n🔍 Searching for agents in: {agents_dir}")
+    
+    agents = AgentRegistry(agents_dir, BASE_DIR / '.agent_manifest.json')
+    agents.refresh()
+    
+    if agents:
+        print(f"\n✅ Found {len(agents)} agent(s)")
+    else:
+        print("\n⚠️  No agents found")
+    
+    return agents
+
+
+# Discover available agents (modules are imported when first selected)
+AVAILABLE_AGENTS = discover_agents()
+
+
+def load_agent(agent_id):
+    """Get an agent's info (including its class), or None if it cannot be loaded"""
+    if not agent_id or agent_id not in AVAILABLE_AGENTS:
+        print(f"Invalid agent id: {agent_id}")
+        return None
+    try:
+        return AVAILABLE_AGENTS[agent_id]
+    except Exception as e:
+        print(f"  ✗ Error loading agent {agent_id}: {e}")
+        return None
+
+
+class HumanPlayer(Trader):
+    """A human player that waits for actions from the web interface"""
+    
+    def __init__(self, seed, name, player_id):
+        super().__init__(seed, name)
+        self.player_id = player_id  # "player1" or "player2"
+        self.pending_action = None
+    
+    def select_action(self, actions, observation, simulate_action_fnc):
+        """Wait for action to be received from web client"""
+        return None
+
+
+class GameState:
+    def __init__(self, max_workers=4):
+        self.game = None
+        self.record = None  # GameRecord of the current (or last) game
+        self.replay_record = None  # GameRecord loaded for scrubbing
+        self.player1_connected = False
+        self.player2_connected = False
+        self.player1 = None
+        self.player2 = None
+        self.game_started = False
+        self.game_over = False
+        self.waiting_for_player = None
+        self.lock = Lock()
+        self.last_player1_ping = 0
+        self.last_player2_ping = 0
+        self.game_mode = None  # 'human', 'human-vs-bot', or 'bot'
+        self.pending_mode = None  # Mode selected before game starts
+        self.bot_thread = None
+        self.bot_running = False
+        self.bot_paused = False  # New: pause control
+        self.bot_step_requested = False  # New: step control
+        self.bot_delay = 1.5  # Delay between bot moves in seconds
+        self.bot_speed = 1.0  # Speed multiplier (0.5 = slow, 1.0 = normal, 2.0 = fast)
+        self.time_control = TimeControl.fixed(30.0)  # Bots' thinking time (None = unlimited)
+        self.clock = None  # GameClock of the current game
+        self.bot_timeout_player = None  # Player who timed out
+        self.legal_index = None  # Legal actions of the current turn, by action code
+        # Agents think in these threads, so that a slow one can be abandoned
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bazaar-agent')
+        self.agent_futures = {}  # Last select_action call of each bot, by name
+    
+    @property
+    def bot_timeout(self):
+        """Seconds allowed per bot move (0 = no per-move limit)"""
+        return (self.time_control.per_move or 0) if self.time_control else 0
+    
+    def set_time_control(self, time_control):
+        """Set the bots' time control (None = unlimited), restarting the clocks of the current game"""
+        self.time_control = time_control
+        self.clock = GameClock(time_control, self.game.state.players) if self.game and time_control else None
+        
+    def check_players_ready(self):
+        if self.game_mode == 'bot':
+            return True  # Bots are always ready
+        return self.player1_connected and self.player2_connected
+    
+    def create_game(self, mode='human', agent1_id=None, agent2_id=None):
+        with self.lock:
+            self.game_mode = mode
+            
+            if mode == 'human':
+                if not self.check_players_ready():
+                    return False
+                    
+                self.player1 = HumanPlayer(seed=356, name="Player 1", player_id="player1")
+                self.player2 = HumanPlayer(seed=789, name="Player 2", player_id="player2")
+                print("Game created with two human players")
+            
+            elif mode == 'human-vs-bot':
+                # Human vs Bot mode
+                if not self.player1_connected:
+                    print("Player 1 not connected")
+                    return False
+                agent2_info = load_agent(agent2_id)
+                if not agent2_info:
+                    return False
+                
+                self.player1 = HumanPlayer(seed=356, name="Player 1", player_id="player1")
+                self.player2 = agent2_info['class'](seed=789, name=f"{agent2_info['name']}")
+                
+                print(f"Game created with human vs bot: Player 1 vs {self.player2.name}")
+            
+            elif mode == 'bot':
+                # Create bot players
+                agent1_info = load_agent(agent1_id)
+                agent2_info = load_agent(agent2_id)
+                if not agent1_info or not agent2_info:
+                    return False
+                
+                self.player1 = agent1_info['class'](seed=356, name=f"{agent1_info['name']} 1")
+                self.player2 = agent2_info['class'](seed=789, name=f"{agent2_info['name']} 2")
+                
+                print(f"Game created with bot players: {self.player1.name} vs {self.player2.name}")
+            
+            else:
+                print(f"Unknown game mode: {mode}")
+                return False
+            
+            players = [self.player1, self.player2]
+            seed = int(time.time() * 1000)
+            self.game = BasicBazaar(seed=seed, players=players)
+            self.record = GameRecord.for_game(self.game, REPLAY_CHECKPOINT_INTERVAL)
+            self.clock = GameClock(self.time_control, players) if self.time_control else None
+            self.legal_index = None
+            self.game_started = True
+            self.game_over = False
+            
+            # Set waiting_for_player based on who starts
+            if mode in ['human', 'human-vs-bot']:
+                starting_actor = self.game.state.actor
+                if isinstance(starting_actor, HumanPlayer):
+                    self.waiting_for_player = starting_actor.player_id
+                else:
+                    # Bot goes first in human-vs-bot mode
+                    self.waiting_for_player = None
+                    if mode == 'human-vs-bot':
+                        self._schedule_bot_turn()
+            else:
+                self.waiting_for_player = None
+            
+            # Start bot thread if in bot mode
+            if mode == 'bot':
+                self.bot_running = True
+                self.bot_paused = True  # Start paused by default
+                self._start_bot_game()
+                print("🤖 Bot game starting in PAUSED state")
+            
+            return True
+    
+    def _start_bot_game(self):
+        """Start the bot-vs-bot game loop in a background thread"""
+        self.bot_thread = Thread(target=self.run_bot_game, daemon=True)
+        self.bot_thread.start()
+    
+    def _schedule_bot_turn(self):
+        """Play the bot's turn (human-vs-bot mode) in a background thread"""
+        Thread(target=self._execute_bot_turn, daemon=True).start()
+    
+    def _stop_bot_game(self):
+        """Stop the bot-vs-bot game loop and wait briefly for it to exit"""
+        if self.bot_running:
+            self.bot_running = False
+            if self.bot_thread:
+                self.bot_thread.join(timeout=2)
+    
+    def reset(self):
+        """Stop any running bot game and clear the current game"""
+        self._stop_bot_game()
+        
+        self.game = None
+        self.clock = None
+        self.legal_index = None
+        self.game_started = False
+        self.game_over = False
+        self.waiting_for_player = None
+        self.game_mode = None
+        self.pending_mode = None
+        self.bot_paused = False
+        self.bot_step_requested = False
+        self.bot_timeout_player = None  # Reset timeout info
+    
+    def expire_stale_players(self, current_time=None):
+        """Mark players as disconnected if they have not pinged for PLAYER_TIMEOUT seconds"""
+        if current_time is None:
+            current_time = time.time()
+        
+        # Only check if player was connected and has a last ping time
+        if self.player1_connected:
+            if self.last_player1_ping == 0:
+                # Player 1 connected but never pinged - just connected
+                pass
+            elif current_time - self.last_player1_ping > PLAYER_TIMEOUT:
+                self.player1_connected = False
+                print(f"Player 1 disconnected (timeout) - last ping was {current_time - self.last_player1_ping:.1f}s ago")
+        
+        if self.player2_connected:
+            if self.last_player2_ping == 0:
+                # Player 2 connected but never pinged - just connected
+                pass
+            elif current_time - self.last_player2_ping > PLAYER_TIMEOUT:
+                self.player2_connected = False
+                print(f"Player 2 disconnected (timeout) - last ping was {current_time - self.last_player2_ping:.1f}s ago")
+    
+    def _select_action(self, player, actions, observation, simulate_action):
+        """
+        Let a bot choose its move in the executor, under the time control.
+        
+        A bot still busy with a move it ran out of time for is not called
+        again until that call returns, which counts against the new move.
+        
+        Returns the action to play, or None if the bot timed out or raised (in
+        which case bot_timeout_player and game_over are set).
+        """
+        clock = self.clock
+        budget = clock.start_move(player) if clock else None
+        previous = self.agent_futures.get(player.name)
+        if previous is not None and not previous.done():
+            done, _ = wait([previous], timeout=budget.remaining() if budget else None)
+            if not done:
+                return self._finish_move(clock, player, budget, None, timed_out=True)
+        future = self.executor.submit(
+            select_action_with_budget, player, actions, observation, simulate_action, budget
+        )
+        self.agent_futures[player.name] = future
+        try:
+            return self._finish_move(clock, player, budget,
+                                     future.result(timeout=budget.remaining() if budget else None))
+        except FutureTimeoutError:
+            return self._finish_move(clock, player, budget, None, timed_out=True)
+        except Exception as e:
+            print(f"❌ Bot {player.name} error: {e}")
+            self.bot_timeout_player = player.name
+            self.game_over = True
+            return None
+    
+    def _finish_move(self, clock, player, budget, action, timed_out=False):
+        """
+        Stop the player's clock and settle the move.
+        
+        A bot that did not return in time plays the best action it offered to
+        its budget, if any. Otherwise it loses: bot_timeout_player and
+        game_over are set and None is returned.
+        """
+        if budget is None:
+            return action
+        on_time = clock.stop_move(player, budget) and not timed_out
+        if on_time:
+            return action
+        if budget.best is not None:
+            print(f"⏱️  Bot {player.name} ran out of time, playing its best action so far")
+            return budget.best
+        print(f"⏱️  Bot {player.name} exceeded timeout: {budget.elapsed():.2f}s > {budget.seconds:.2f}s")
+        self.bot_timeout_player = player.name
+        self.game_over = True
+        return None
+    
+    def _apply_turn(self, action):
+        """Apply an action to the game and let every player observe the transition (caller holds the lock)"""
+        self.game.step(action)
+        self.record.append(action, self.game.state)
+        self.legal_index = None
+    
+    def run_bot_game(self):
+        """Run the game automatically with bot players"""
+        print("🤖 Bot game thread started")
+        
+        while self.bot_running and not self.game_over:
+            try:
+                # Check if paused (wait until unpaused or step requested)
+                while self.bot_paused and not self.bot_step_requested:
+                    if not self.bot_running:
+                        break
+                    time.sleep(0.1)  # Check every 100ms
+                    continue
+                
+                # If we're exiting due to stop, break
+                if not self.bot_running:
+                    break
+                
+                # If step was requested, clear the flag
+                if self.bot_step_requested:
+                    self.bot_step_requested = False
+                
+                with self.lock:
+                    if not self.game or self.game.terminal(self.game.state):
+                        self.game_over = True
+                        print("🏁 Bot game finished")
+                        break
+                    
+                    # Get current player
+                    current_player = self.game.state.actor
+                    
+                    # Get legal actions
+                    actions = self.game.all_actions(current_player, self.game.state)
+                    
+                    if not actions:
+                        print(f"⚠️  No legal actions for {current_player.name}")
+                        break
+                    
+                    # Get observation
+                    observation = self.game.observe(current_player, self.game.state)
+                    
+                    # Let the bot select an action
+                    simulate_action = self.game.simulator(current_player)
+                    
+                    action = self._select_action(current_player, actions, observation, simulate_action)
+                    
+                    if self.game_over:
+                        break
+                    
+                    if not action:
+                        print(f"⚠️  Bot {current_player.name} returned no action")
+                        break
+                    
+                    # Execute the action and update rewards
+                    self._apply_turn(action)
+                    
+                    print(f"🎮 Round {self.game.round}: {current_player.name} played {action.trader_action_type.value}")
+                
+                # Sleep between moves to make it watchable (only if not paused)
+                if not self.bot_paused:
+                    # Apply speed multiplier: lower speed = longer delay
+                    actual_delay = self.bot_delay / self.bot_speed
+                    time.sleep(actual_delay)
+                
+            except Exception as e:
+                print(f"❌ Error in bot game: {e}")
+                import traceback
+                traceback.print_exc()
+                break
+        
+        self.bot_running = False
+        print("🤖 Bot game thread stopped")
+    
+    def get_public_state(self):
+        """Get state visible to everyone"""
+        if not self.game:
+            return {
+                'type': 'public',
+                'gameStarted': False,
+                'gameMode': self.game_mode,
+                'pendingMode': self.pending_mode,
+                'playersReady': self.check_players_ready(),
+                'player1Connected': self.player1_connected,
+                'player2Connected': self.player2_connected,
+                'round': 0,
+                'market': {},
+                'marketCoins': {},
+                'marketBonusTokens': {'THREE': 0, 'FOUR': 0, 'FIVE': 0},
+                'deckSize': 0,
+                'players': [
+                    {'name': 'Player 1', 'score': 0, 'camelCount': 0, 'goods': {}, 'coins': {}, 'bonusCounts': {}},
+                    {'name': 'Player 2', 'score': 0, 'camelCount': 0, 'goods': {}, 'coins': {}, 'bonusCounts': {}}
+                ],
+                'currentPlayer': None,
+                'isTerminal': False,
+                'lastAction': None,
+                'waitingForPlayer': None,
+                'botPaused': False,
+                'botRunning': False,
+                'botSpeed': 1.0,
+                'botTimeout': self.bot_timeout,
+                'timeControl': self.time_control.to_dict() if self.time_control else None,
+                'clocks': None,
+                'botTimeoutPlayer': None
+            }
+        
+        is_terminal = self.game.terminal(self.game.state) or self.bot_timeout_player is not None
+        
+        return {
+            'type': 'public',
+            'gameStarted': self.game_started,
+            'gameMode': self.game_mode,
+            'playersReady': self.check_players_ready(),
+            'player1Connected': self.player1_connected,
+            'player2Connected': self.player2_connected,
+            **self.describe_game(self.game, is_terminal),
+            'waitingForPlayer': self.waiting_for_player,
+            'botPaused': self.bot_paused if self.game_mode == 'bot' else None,
+            'botRunning': self.bot_running if self.game_mode == 'bot' else None,
+            'botSpeed': self.bot_speed if self.game_mode == 'bot' else None,
+            'botTimeout': self.bot_timeout,
+            'timeControl': self.time_control.to_dict() if self.time_control else None,
+            'clocks': self.clock.remaining if self.clock and self.time_control.total else None,
+            'botTimeoutPlayer': self.bot_timeout_player
+        }
+    
+    def describe_game(self, game, is_terminal):
+        """Describe the board of a game (market, players, last action) for the UI"""
+        state = game.state
+        
+        # Market goods
+        market_goods = {good_type.name: state.goods[good_type] 
+                       for good_type in GoodType if state.goods[good_type] > 0}
+        
+        # Market coins
+        market_coins = {good_type.name: state.coins.goods_coins[good_type]
+                       for good_type in GoodType if good_type != GoodType.CAMEL 
+                       and state.coins.goods_coins[good_type]}
+        
+        # Market bonus tokens remaining
+        market_bonus_tokens = {bonus_type.name: len(state.coins.bonus_coins[bonus_type])
+                              for bonus_type in BonusType}
+        
+        # Player data
+        players_data = []
+        for player in game.players:
+            player_goods = {good_type.name: state.player_goods[player][good_type]
+                          for good_type in GoodType if state.player_goods[player][good_type] > 0}
+            
+            player_coins = {good_type.name: state.player_coins[player].goods_coins[good_type]
+                          for good_type in GoodType 
+                          if state.player_coins[player].goods_coins[good_type]}
+            
+            bonus_counts = {bonus_type.name: len(state.player_coins[player].bonus_coins[bonus_type])
+                          for bonus_type in BonusType 
+                          if len(state.player_coins[player].bonus_coins[bonus_type]) > 0}
+            
+            # Calculate score components
+            raw_score = sum(sum(coins) for coins in state.player_coins[player].goods_coins.values())
+            score = raw_score
+            camel_bonus = 0
+            bonus_3x = 0
+            bonus_4x = 0
+            bonus_5x = 0
+            
+            if is_terminal:
+                # Add bonus tokens
+                bonus_3x = sum(state.player_coins[player].bonus_coins[BonusType.THREE])
+                bonus_4x = sum(state.player_coins[player].bonus_coins[BonusType.FOUR])
+                bonus_5x = sum(state.player_coins[player].bonus_coins[BonusType.FIVE])
+                score += bonus_3x + bonus_4x + bonus_5x
+                
+                # Add camel bonus
+                other_player = state.get_non_actor() if player == state.actor else state.actor
+                if state.player_goods[player][GoodType.CAMEL] > state.player_goods[other_player][GoodType.CAMEL]:
+                    camel_bonus = state.camel_bonus
+                    score += camel_bonus
+            
+            players_data.append({
+                'name': player.name,
+                'score': score,
+                'rawScore': raw_score,
+                'camelBonus': camel_bonus,
+                'bonus3x': bonus_3x,
+                'bonus4x': bonus_4x,
+                'bonus5x': bonus_5x,
+                'camelCount': state.player_goods[player][GoodType.CAMEL],
+                'goods': player_goods,
+                'coins': player_coins,
+                'bonusCounts': bonus_counts
+            })
+        
+        # Last action
+        last_action = None
+        if state.action:
+            last_action = {
+                'player': game.old_state.actor.name if game.old_state else 'Unknown',
+                **action_to_dict(state.action)
+            }
+        
+        return {
+            'round': game.round,
+            'market': market_goods,
+            'marketCoins': market_coins,
+            'marketBonusTokens': market_bonus_tokens,
+            'deckSize': len(state.reserved_goods),
+            'players': players_data,
+            'currentPlayer': state.actor.name if state.actor else None,
+            'isTerminal': is_terminal,
+            'lastAction': last_action
+        }
+    
+    def load_replay(self, record=None):
+        """Load a GameRecord for scrubbing (defaults to a snapshot of the current game's record)"""
+        if record is None:
+            if not self.record:
+                return False
+            record = GameRecord.from_bytes(self.record.to_bytes())
+        
+        if not record.checkpoints:
+            record.add_checkpoints(REPLAY_CHECKPOINT_INTERVAL)
+        
+        self.replay_record = record
+        return True
+    
+    def seek_replay(self, turn):
+        """Describe the loaded replay after `turn` actions"""
+        game = self.replay_record.seek(turn)
+        return {
+            'type': 'replay',
+            'turn': turn,
+            'turns': len(self.replay_record),
+            **self.describe_game(game, game.terminal(game.state))
+        }
+    
+    def get_player_state(self, player):
+        """Get private state for a specific player"""
+        if not self.game:
+            return {'type': 'private', 'gameStarted': False, 'myTurn': False, 'goods': {}, 'legalActions': []}
+        
+        state = self.game.state
+        is_my_turn = (state.actor == player)
+        
+        # Player's goods (including camels)
+        player_goods = {good_type.name: state.player_goods[player][good_type]
+                       for good_type in GoodType if state.player_goods[player][good_type] > 0}
+        
+        return {
+            'type': 'private',
+            'gameStarted': self.game_started,
+            'myTurn': is_my_turn,
+            'goods': player_goods
+        }
+    
+    def legal_actions(self, player):
+        """
+        Legal actions of `player` this turn, indexed by action code.
+
+        The index is built on first use and reused until the next turn is
+        applied; it is empty when it is not `player`'s turn.
+        """
+        with self.lock:
+            return self._legal_index(player)
+    
+    def _legal_index(self, player):
+        """`legal_actions` for a caller that holds the lock"""
+        if not self.game or self.game.terminal(self.game.state) or self.game.state.actor != player:
+            return {}
+        if self.legal_index is None:
+            actions = self.game.all_actions(player, self.game.state)
+            self.legal_index = {action.code: action for action in actions}
+        return self.legal_index
+    
+    def legal_action(self, player, action_dict):
+        """The legal action described by `action_dict`, or None if it is not a legal move for `player` now"""
+        action = self.action_from_dict(player, action_dict)
+        if not action:
+            return None
+        try:
+            code = action.code
+        except ValueError:
+            return None  # Outside the canonical action table, so never legal
+        return self.legal_actions(player).get(code)
+    
+    def is_action_valid(self, player, action_dict):
+        """Check that an action dict is a legal move for `player` this turn"""
+        return self.legal_action(player, action_dict) is not None
+    
+    def action_from_dict(self, player, action_dict):
+        """Convert action dict to action object (None if the dict is malformed)"""
+        if not isinstance(action_dict, dict):
+            return None
+        action_type = action_dict.get('type')
+        offered = action_dict.get('offered') or {}
+        requested = action_dict.get('requested') or {}
+        
+        try:
+            offered = {GoodType[good_name]: count for good_name, count in offered.items()}
+            requested = {GoodType[good_name]: count for good_name, count in requested.items()}
+        except (AttributeError, KeyError, TypeError):
+            return None
+        if not all(isinstance(count, int) and count > 0 for count in [*offered.values(), *requested.values()]):
+            return None
+        
+        if action_type == "Sell" and len(offered) == 1 and not requested:
+            good_type, count = next(iter(offered.items()))
+            return SellAction(player, good_type, count)
+        elif action_type == "Take" and len(requested) == 1 and not offered:
+            good_type, count = next(iter(requested.items()))
+            return TakeAction(player, good_type, count)
+        elif action_type == "Trade":
+            net = Goods()
+            for good_type in GoodType:
+                net._goods[good_type] = requested.get(good_type, 0) - offered.get(good_type, 0)
+            return TradeAction(player, net)
+        
+        return None
+    
+    def execute_turn(self, action):
+        """Execute a turn, if `action` is still a legal move of the current actor (False otherwise)"""
+        with self.lock:
+            # Checked again under the lock: another request may have played
+            # a turn since the action was validated
+            action = self._legal_index(action.actor).get(action.code)
+            if action is None:
+                return False
+            
+            actor = self.game.state.actor
+            print(f"Processing action from {actor.name}: {action.trader_action_type.value}")
+            
+            self._apply_turn(action)
+            
+            if self.game.terminal(self.game.state):
+                self.game_over = True
+                self.waiting_for_player = None
+                print("Game Over!")
+            else:
+                # In human-vs-bot mode, if it's the bot's turn, play it automatically
+                if self.game_mode == 'human-vs-bot':
+                    next_actor = self.game.state.actor
+                    if not isinstance(next_actor, HumanPlayer):
+                        # It's the bot's turn - execute it automatically
+                        self._schedule_bot_turn()
+                        self.waiting_for_player = None
+                    else:
+                        self.waiting_for_player = next_actor.player_id
+                elif self.game_mode == 'human':
+                    self.waiting_for_player = self.game.state.actor.player_id
+                else:
+                    self.waiting_for_player = None
+            
+            return True
+    
+    def _execute_bot_turn(self):
+        """Execute a bot turn (used in human-vs-bot mode)"""
+        time.sleep(0.5)  # Small delay for visual effect
+        
+        with self.lock:
+            if not self.game or self.game.terminal(self.game.state):
+                return
+            
+            current_player = self.game.state.actor
+            if isinstance(current_player, HumanPlayer):
+                return  # Don't execute if it's a human's turn
+            
+            # Get legal actions
+            actions = self.game.all_actions(current_player, self.game.state)
+            
+            if not actions:
+                print(f"⚠️  No legal actions for {current_player.name}")
+                return
+            
+            # Get observation for the bot
+            observation = self.game.observe(current_player, self.game.state)
+            
+            # Let bot select action under the time control
+            chosen_action = self._select_action(
+                current_player, actions, observation,
+                self.game.simulator(current_player)
+            )
+            if self.game_over:
+                self.waiting_for_player = None
+                return
+            
+            if chosen_action:
+                print(f"🤖 Bot {current_player.name} chose: {chosen_action.trader_action_type.value}")
+                
+                # Execute the action
+                self._apply_turn(chosen_action)
+                
+                if self.game.terminal(self.game.state):
+                    self.game_over = True
+                    self.waiting_for_player = None
+                    print("🏁 Game Over!")
+                else:
+                    # Check if next turn is also bot (shouldn't happen in human-vs-bot)
+                    next_actor = self.game.state.actor
+                    if isinstance(next_actor, HumanPlayer):
+                        self.waiting_for_player = next_actor.player_id
+                    else:
+                        # Chain bot turns if needed
+                        self._execute_bot_turn()
+
+
+def action_to_dict(action):
+    """JSON description of an action, in the format `/api/action` accepts"""
+    return {
+        'code': action.code,
+        'type': action.trader_action_type.value,
+        'offered': {gt.name: action.offered_goods[gt] for gt in GoodType if action.offered_goods[gt] > 0},
+        'requested': {gt.name: action.requested_goods[gt] for gt in GoodType if action.requested_goods[gt] > 0}
+    }
@@ -3,18 +3,23 @@
 Launch script for Bazaar
 """
 
+import argparse
 import subprocess
 import socket
 import webbrowser
 import sys
 
-def check_dependencies():
+def check_dependencies(use_async=False):
     """Check for required dependencies"""
     required = {
         'flask': 'flask',
         'flask_cors': 'flask-cors',
-        'arelai': 'arelai'
+        'arelai': 'arelai',
+        'numpy': 'numpy'
     }
+    if use_async:
+        required['quart'] = 'quart'
+        required['quart_cors'] = 'quart-cors'
     
     missing_required = []
     for module, pip_name in required.items():
@@ -45,8 +50,17 @@ def get_local_ip():
     except:
         return "127.0.0.1"
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Launch the Bazaar server")
+    parser.add_argument(
+        '--async', dest='use_async', action='store_true',
+        help="serve from a single asyncio event loop (Quart) instead of Flask's threaded server"
+    )
+    return parser.parse_args()
+
 def main():
-    check_dependencies()
+    args = parse_args()
+    check_dependencies(args.use_async)
     
     ip = get_local_ip()
     port = 5000
@@ -71,10 +85,13 @@ def main():
     except:
         pass
     
-    print("\n🟢 Starting server...\n")
+    print(f"\n🟢 Starting {'asyncio ' if args.use_async else ''}server...\n")
     print("Press Ctrl+C to stop\n")
     
-    from app import app
+    if args.use_async:
+        from async_app import app
+    else:
+        from app import app
     app.run(host='0.0.0.0', port=port, debug=False)
 
 if __name__ == "__main__":